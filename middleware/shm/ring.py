@@ -0,0 +1,371 @@
+"""Same-host market-data transport over a shared-memory ring buffer.
+
+``ShmPublisher`` and ``ShmSubscriber`` carry the messages of
+``middleware.zmq.pub`` (topic, header and records, decoded by
+``middleware.zmq.sub.decode``) through a ``multiprocessing.shared_memory``
+segment instead of a socket, and otherwise behave like
+``MarketDataPublisher`` and ``MarketDataSubscriber``: subscriptions are
+topic prefixes, ``recv(zmq.NOBLOCK)`` raises ``zmq.Again`` when nothing is
+waiting, and ``gaps`` counts lost messages. ``publisher`` and
+``subscriber`` pick the transport from the endpoint, ``shm://<name>`` or
+any ZeroMQ endpoint.
+
+There is one writer and any number of readers, and nobody takes a lock.
+Message ``n`` goes into slot ``n % slots``, guarded by the slot's sequence
+word: the writer sets it to ``2n + 1`` before copying the message in and to
+``2n + 2`` afterwards, and a reader copies the message out only while it
+reads ``2n + 2`` before and after. Like a PUB socket, the writer never
+waits: a reader that falls a whole ring behind finds newer sequence words,
+skips ahead to the oldest message still in the ring and sees the loss in
+its ``gaps``. Each reader mirrors its cursor into the segment so that
+``ShmPublisher.lag`` can tell how far behind it is.
+
+Segment layout, in 8-byte words::
+
+    header   MAGIC, slot count, slot size in bytes, reader entries, head
+             (messages written), 3 unused
+    readers  reader entries * 8 words: owner, cursor, 6 unused
+    slots    slot count * slot size bytes: sequence word, topic length
+             (4 bytes), frame length (4 bytes), topic, HEADER, records
+"""
+
+import os
+import struct
+import sys
+import time
+from itertools import count
+
+import numpy as np
+import zmq
+
+from middleware.zmq.pub import HEADER, VERSION, MarketDataPublisher, topic
+from middleware.zmq.sub import MarketDataSubscriber
+from quant_research.order_research import shm as segments
+
+MAGIC = 0x52494E47  # "RING"
+HEADER_WORDS = 8
+READER_WORDS = 8
+HEAD = 4
+# Topic and frame lengths, after the sequence word.
+LENGTHS = struct.Struct("<II")
+SLOT_BYTES = 8 + LENGTHS.size
+SCHEME = "shm://"
+
+# ``poll`` yields the CPU between its first ``SPINS`` checks, then sleeps
+# ``BACKOFF`` seconds between checks until a message arrives.
+SPINS = 100
+BACKOFF = 0.0001
+
+# Owner words of the reader entries claimed by this process.
+_owners = count((os.getpid() << 20) + 1)
+
+
+def _segment_size(slots, slot_size, readers):
+    return 8 * (HEADER_WORDS + READER_WORDS * readers) + slots * slot_size
+
+
+class _Ring:
+    """Word views over a ring segment."""
+
+    __slots__ = ()
+
+    def _map(self, shm, slots, slot_size, readers):
+        self.shm = shm
+        self.slots = slots
+        self.slot_size = slot_size
+        self.readers = readers
+        self._q = shm.buf.cast("q")
+        self._slots = 8 * (HEADER_WORDS + READER_WORDS * readers)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _reader_word(self, index):
+        return HEADER_WORDS + READER_WORDS * index
+
+    def _slot(self, n):
+        """Byte offset of the slot of message ``n``."""
+        return self._slots + (n & (self.slots - 1)) * self.slot_size
+
+    def _unmap(self):
+        self._q.release()
+        self.shm.close()
+
+
+class ShmPublisher(_Ring, MarketDataPublisher):
+    """Creates a ring of ``slots`` (a power of two) slots of ``slot_size``
+    bytes with room for ``readers`` reader cursors, and publishes to it like
+    a ``MarketDataPublisher``. Messages are cut to fit a slot as well as to
+    ``batch`` records. Closing the publisher removes the segment; attached
+    readers keep their mapping."""
+
+    __slots__ = "shm", "slots", "slot_size", "readers", "_q", "_slots"
+
+    def __init__(self, name=None, slots=4096, slot_size=4096, readers=16, batch=4096):
+        if slots & (slots - 1) or slots <= 0:
+            raise ValueError(f"slot count must be a power of two, not {slots}")
+        if slot_size % 8:
+            raise ValueError(f"slot size must be a multiple of 8, not {slot_size}")
+        shm = segments.create(name, _segment_size(slots, slot_size, readers))
+        self._map(shm, slots, slot_size, readers)
+        self.socket = None
+        self.batch = batch
+        self.sent = 0
+        self._seq = {}
+        self._cursors = {}
+        self._own = True
+        q = self._q
+        q[1], q[2], q[3], q[HEAD] = slots, slot_size, readers, 0
+        q[0] = MAGIC
+
+    def send(self, symbol, kind, records):
+        """Write ``records`` of ``kind`` for ``symbol`` to the ring, split
+        into messages that fit a slot."""
+        prefix = topic(symbol, kind)
+        room = self.slot_size - SLOT_BYTES - len(prefix) - HEADER.size
+        per_message = min(self.batch, room // records.dtype.itemsize)
+        if per_message <= 0:
+            raise ValueError(f"a {kind!r} record for {symbol!r} does not fit a slot")
+        records = np.ascontiguousarray(records)
+        q, buf = self._q, self.shm.buf
+        seq, n = self._seq.get(prefix, 0), q[HEAD]
+        for start in range(0, len(records), per_message):
+            chunk = records[start : start + per_message].view(np.uint8)
+            header = HEADER.pack(VERSION, kind, 0, len(chunk) // records.itemsize, seq)
+            offset = self._slot(n)
+            word = offset // 8
+            q[word] = 2 * n + 1
+            LENGTHS.pack_into(buf, offset + 8, len(prefix), HEADER.size + len(chunk))
+            offset += SLOT_BYTES
+            buf[offset : offset + len(prefix)] = prefix
+            offset += len(prefix)
+            buf[offset : offset + HEADER.size] = header
+            offset += HEADER.size
+            buf[offset : offset + len(chunk)] = chunk
+            q[word] = 2 * n + 2
+            n += 1
+            q[HEAD] = n
+            seq += 1
+        self._seq[prefix] = seq
+        self.sent += len(records)
+
+    def lag(self):
+        """Messages each attached reader has yet to read."""
+        q, head = self._q, self._q[HEAD]
+        lags = []
+        for index in range(self.readers):
+            word = self._reader_word(index)
+            if q[word]:
+                lags.append(head - q[word + 1])
+        return lags
+
+    def close(self):
+        self._unmap()
+        segments.unlink(self.shm)
+
+
+def _alive(owner):
+    try:
+        os.kill(owner >> 20, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ShmSubscriber(_Ring, MarketDataSubscriber):
+    """Attaches to the ring ``name`` of a ``ShmPublisher`` and reads it like
+    a ``MarketDataSubscriber``, from the next message written on.
+
+    The reader claims a free cursor entry of the segment (or one left by a
+    dead process) with a plain store, so two readers attaching at the same
+    instant may share an entry; that only blurs ``ShmPublisher.lag``, since
+    each reader keeps its own cursor.
+    """
+
+    __slots__ = (
+        "shm",
+        "slots",
+        "slot_size",
+        "readers",
+        "_q",
+        "_slots",
+        "_prefixes",
+        "_cursor",
+        "_entry",
+    )
+
+    def __init__(self, name, symbols=None, kinds=None):
+        shm = segments.attach(name)
+        q = shm.buf.cast("q")
+        magic, slots, slot_size, readers = q[0], q[1], q[2], q[3]
+        q.release()
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"{name!r} is not a ring segment")
+        self._map(shm, slots, slot_size, readers)
+        self.socket = None
+        self.gaps = 0
+        self._next = {}
+        self._own = False
+        if symbols is None:
+            self._prefixes = (b"",)
+        else:
+            self._prefixes = tuple(
+                topic(symbol, kind) for symbol in symbols for kind in kinds or [b""]
+            )
+        q = self._q
+        self._cursor = q[HEAD]
+        self._entry = None
+        for index in range(readers):
+            word = self._reader_word(index)
+            if not q[word] or not _alive(q[word]):
+                q[word + 1] = self._cursor
+                q[word] = next(_owners)
+                self._entry = word
+                break
+
+    def _ready(self):
+        return self._q[self._slot(self._cursor) // 8] >= 2 * self._cursor + 2
+
+    def poll(self, timeout=None):
+        """Whether a message arrives within ``timeout`` milliseconds. Spins
+        on the ring for a burst of checks, then backs off to short sleeps
+        so that an idle feed costs no CPU."""
+        if self._ready():
+            return True
+        deadline = None if timeout is None else time.perf_counter() + timeout / 1000
+        spins = 0
+        while not self._ready():
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            spins += 1
+            time.sleep(0 if spins < SPINS else BACKOFF)
+        return True
+
+    def _frames(self, flags):
+        q, buf, prefixes = self._q, self.shm.buf, self._prefixes
+        while True:
+            n = self._cursor
+            offset = self._slot(n)
+            word = offset // 8
+            seq = q[word]
+            if seq == 2 * n + 2:
+                size, length = LENGTHS.unpack_from(buf, offset + 8)
+                start = offset + SLOT_BYTES
+                data = bytes(buf[start : start + size + length])
+                if q[word] == seq:
+                    self._advance(n + 1)
+                    if data[:size].startswith(prefixes):
+                        view = memoryview(data)
+                        return [
+                            view[:size],
+                            view[size : size + HEADER.size],
+                            view[size + HEADER.size :],
+                        ]
+                    continue
+                seq = q[word]
+            if seq > 2 * n + 2:
+                # Lapped by the writer: resume at the oldest message left.
+                self._advance(max(n + 1, q[HEAD] - self.slots))
+            elif flags & zmq.NOBLOCK:
+                raise zmq.Again()
+            else:
+                self.poll()
+
+    def _advance(self, cursor):
+        self._cursor = cursor
+        if self._entry is not None:
+            self._q[self._entry + 1] = cursor
+
+    def close(self):
+        if self._entry is not None:
+            self._q[self._entry] = 0
+        self._unmap()
+
+
+def publisher(endpoint, **kwargs):
+    """``ShmPublisher`` for a ``shm://<name>`` endpoint, otherwise a
+    ``MarketDataPublisher`` bound to it."""
+    if endpoint.startswith(SCHEME):
+        return ShmPublisher(endpoint[len(SCHEME) :], **kwargs)
+    return MarketDataPublisher(endpoint, **kwargs)
+
+
+def subscriber(endpoint, symbols=None, kinds=None, **kwargs):
+    """``ShmSubscriber`` for a ``shm://<name>`` endpoint, otherwise a
+    ``MarketDataSubscriber`` connected to it."""
+    if endpoint.startswith(SCHEME):
+        return ShmSubscriber(endpoint[len(SCHEME) :], symbols, kinds, **kwargs)
+    return MarketDataSubscriber(endpoint, symbols, kinds, **kwargs)
+
+
+def _endpoints(transport):
+    """Bind and connect endpoints of the ping and pong feeds."""
+    if transport == "shm":
+        return ("shm://ping",) * 2, ("shm://pong",) * 2
+    return (
+        ("tcp://*:5601", "tcp://127.0.0.1:5601"),
+        ("tcp://*:5602", "tcp://127.0.0.1:5602"),
+    )
+
+
+def _echo(transport, n):
+    from middleware.zmq.pub import TRADES
+
+    requests, replies = _endpoints(transport)
+    with publisher(replies[0]) as out:
+        time.sleep(0.25)
+        with subscriber(requests[1]) as inp:
+            for _ in range(n):
+                out.send("PONG", TRADES, inp.recv().records)
+
+
+def _percentiles(name, latency):
+    p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+    print(f"{name}: p50 {p50:.1f}us p99 {p99:.1f}us", file=sys.stderr)
+
+
+def main(transport="shm", n=20_000):
+    """Time a one-record hop over ``transport`` (``shm`` or ``tcp``): send
+    and receive within this process, then half the round trip to an echo
+    process."""
+    import subprocess
+
+    from middleware.zmq.pub import TRADE_DTYPE, TRADES
+
+    requests, replies = _endpoints(transport)
+    record = np.zeros(1, TRADE_DTYPE)
+    latency = np.empty(n)
+    with publisher(requests[0]) as out:
+        with subscriber(requests[1]) as inp:
+            time.sleep(0.25)
+            for i in range(n):
+                start = time.perf_counter()
+                out.send("PING", TRADES, record)
+                inp.recv()
+                latency[i] = time.perf_counter() - start
+        _percentiles(f"{transport} in-process hop", latency)
+
+        echo = subprocess.Popen(
+            [sys.executable, "-m", __spec__.name, "echo", transport, str(n)]
+        )
+        time.sleep(1)
+        with subscriber(replies[1]) as inp:
+            time.sleep(0.25)
+            for i in range(n):
+                start = time.perf_counter()
+                out.send("PING", TRADES, record)
+                inp.recv()
+                latency[i] = time.perf_counter() - start
+        echo.wait()
+    _percentiles(f"{transport} one-way to another process", latency / 2)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["echo"]:
+        _echo(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*sys.argv[1:2])
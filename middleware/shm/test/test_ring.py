@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import zmq
+
+from middleware.shm.ring import (
+    ShmPublisher,
+    ShmSubscriber,
+    publisher,
+    subscriber,
+)
+from middleware.zmq.pub import (
+    LEVEL_DTYPE,
+    LEVELS,
+    TRADE_DTYPE,
+    TRADES,
+    MarketDataPublisher,
+)
+from middleware.zmq.sub import MarketDataSubscriber
+
+
+def trades(n, start=0):
+    records = np.zeros(n, TRADE_DTYPE)
+    records["ts"] = np.arange(start, start + n)
+    records["size"] = 1
+    return records
+
+
+@pytest.fixture
+def ring():
+    ring = ShmPublisher(slots=8, slot_size=512)
+    yield ring
+    ring.close()
+
+
+def test_publish_and_recv(ring):
+    reader = ShmSubscriber(ring.name)
+    # 512-byte slots hold 14 trades, so 40 take three messages.
+    ring.send("ES", TRADES, trades(40))
+    messages = [reader.recv(zmq.NOBLOCK) for _ in range(3)]
+    assert [(m.symbol, m.kind, m.seq) for m in messages] == [
+        ("ES", TRADES, 0),
+        ("ES", TRADES, 1),
+        ("ES", TRADES, 2),
+    ]
+    assert [len(m.records) for m in messages] == [14, 14, 12]
+    ts = np.concatenate([m.records["ts"] for m in messages])
+    assert ts.tolist() == list(range(40))
+    with pytest.raises(zmq.Again):
+        reader.recv(zmq.NOBLOCK)
+    assert not reader.poll(10)
+    assert ring.lag() == [0]
+    reader.close()
+    assert ring.lag() == []
+
+
+def test_prefix_filtering(ring):
+    everything = ShmSubscriber(ring.name)
+    nq = ShmSubscriber(ring.name, ["NQ"])
+    nq_trades = ShmSubscriber(ring.name, ["NQ"], [TRADES])
+    ring.send("ES", TRADES, trades(1))
+    ring.send("NQ", LEVELS, np.zeros(2, LEVEL_DTYPE))
+    ring.send("NQ", TRADES, trades(3))
+
+    def drain(reader):
+        received = []
+        while reader.poll(0):
+            try:
+                data = reader.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            received.append((data.symbol, data.kind, len(data.records)))
+        return received
+
+    assert drain(everything) == [
+        ("ES", TRADES, 1),
+        ("NQ", LEVELS, 2),
+        ("NQ", TRADES, 3),
+    ]
+    assert drain(nq) == [("NQ", LEVELS, 2), ("NQ", TRADES, 3)]
+    assert drain(nq_trades) == [("NQ", TRADES, 3)]
+    for reader in (everything, nq, nq_trades):
+        reader.close()
+
+
+def test_lapped_reader_counts_gaps(ring):
+    reader = ShmSubscriber(ring.name)
+    ring.send("ES", TRADES, trades(1))
+    assert reader.recv().seq == 0
+    for i in range(1, 21):
+        ring.send("ES", TRADES, trades(1, i))
+    assert ring.lag() == [20]
+    # Only the last 8 messages are still in the ring.
+    data = reader.recv(zmq.NOBLOCK)
+    assert data.seq == 13
+    assert reader.gaps == 12
+    assert [reader.recv().seq for _ in range(7)] == list(range(14, 21))
+    reader.close()
+
+
+def test_blocking_recv_waits_for_the_writer(ring):
+    reader = ShmSubscriber(ring.name)
+    timer = threading.Timer(0.05, ring.send, ("ES", TRADES, trades(2)))
+    timer.start()
+    assert reader.poll(2000)
+    assert len(reader.recv().records) == 2
+    timer.join()
+    reader.close()
+
+
+def test_records_that_do_not_fit_a_slot_are_refused():
+    ring = ShmPublisher(slots=2, slot_size=64)
+    try:
+        with pytest.raises(ValueError):
+            ring.send("A-LONG-SYMBOL", TRADES, trades(1))
+        with pytest.raises(ValueError):
+            ShmPublisher(slots=3)
+    finally:
+        ring.close()
+
+
+def test_factories_pick_the_transport(tmp_path):
+    endpoint = f"shm://ring-test-{os.getpid()}"
+    with publisher(endpoint, slots=16) as pub:
+        assert isinstance(pub, ShmPublisher)
+        with subscriber(endpoint, ["ES"]) as sub:
+            assert isinstance(sub, ShmSubscriber)
+            pub.send("NQ", TRADES, trades(1))
+            pub.send("ES", TRADES, trades(2))
+            data = sub.recv()
+            assert (data.symbol, len(data.records)) == ("ES", 2)
+
+    address = f"ipc://{tmp_path}/feed"
+    with publisher(address) as pub, subscriber(address) as sub:
+        assert type(pub) is MarketDataPublisher
+        assert type(sub) is MarketDataSubscriber
+        time.sleep(0.1)
+        pub.send("ES", TRADES, trades(1))
+        assert sub.poll(1000)
+        assert sub.recv().symbol == "ES"
@@ -0,0 +1,194 @@
+"""Conflation of the ``middleware.zmq.pub`` feed for slow consumers.
+
+A ``Conflator`` applies every message of the feed to a per-symbol state
+(the full set of price levels and the trades since the last delivery) and
+hands out at most one ``ConflatedUpdate`` per changed symbol each time the
+consumer calls ``tick``. Level deltas carry the absolute size of each
+level, so applying them is idempotent and the state never grows beyond
+the levels of the book.
+
+With ``thread=True`` a background thread keeps reading the socket, so the
+feed is drained at its own pace however long the consumer spends between
+ticks; otherwise ``tick`` drains whatever has queued first.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+import zmq
+
+from middleware.zmq.pub import LEVELS
+from middleware.zmq.sub import MarketDataSubscriber
+from quant_research.order_research.level import Depth
+
+
+class ConflatedUpdate(NamedTuple):
+    """Latest state of ``symbol``: the best ``depth`` levels, the last trade
+    price, and the volume and number of trades and feed messages since its
+    previous update. ``gap`` is set when messages were lost in between."""
+
+    symbol: str
+    depth: Depth
+    last_price: float
+    volume: int
+    trades: int
+    messages: int
+    ts: int
+    gap: bool
+
+
+class _SymbolState:
+    __slots__ = "bids", "asks", "last_price", "volume", "trades", "messages", "ts"
+
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+        self.last_price = float("nan")
+        self.reset()
+
+    def reset(self):
+        self.volume = 0
+        self.trades = 0
+        self.messages = 0
+        self.ts = 0
+
+    def apply(self, kind, records):
+        self.messages += 1
+        if not len(records):
+            return
+        self.ts = int(records["ts"][-1])
+        if kind == LEVELS:
+            for side, price, size, count in zip(
+                records["side"].tolist(),
+                records["price"].tolist(),
+                records["size"].tolist(),
+                records["count"].tolist(),
+            ):
+                levels = self.asks if side else self.bids
+                if size:
+                    levels[price] = size, count
+                else:
+                    levels.pop(price, None)
+        else:
+            self.last_price = float(records["price"][-1])
+            self.volume += int(records["size"].sum())
+            self.trades += len(records)
+
+    def depth(self, n):
+        sides = []
+        for levels, reverse in ((self.bids, True), (self.asks, False)):
+            prices = sorted(levels, reverse=reverse)[:n]
+            sizes = [levels[price] for price in prices]
+            sides += [
+                np.array(prices, np.float64),
+                np.array([size for size, _ in sizes], np.int64),
+                np.array([count for _, count in sizes], np.int64),
+            ]
+        return Depth(*sides)
+
+
+class Conflator:
+    """Coalesces the messages of ``subscriber`` (a ``MarketDataSubscriber``)
+    into one update per symbol per ``tick``, with the best ``depth``
+    levels."""
+
+    def __init__(self, subscriber, depth=10, thread=False):
+        self.subscriber = subscriber
+        self.depth = depth
+        self._states = {}
+        self._dirty = {}
+        self._gaps = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if thread:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _apply(self, data):
+        state = self._states.get(data.symbol)
+        if state is None:
+            state = self._states[data.symbol] = _SymbolState()
+        state.apply(data.kind, data.records)
+        self._dirty[data.symbol] = state
+
+    def drain(self):
+        """Apply every message already received by the socket; return how
+        many there were."""
+        subscriber, n = self.subscriber, 0
+        while True:
+            gaps = subscriber.gaps
+            try:
+                data = subscriber.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                return n
+            with self._lock:
+                if subscriber.gaps != gaps:
+                    self._gaps[data.symbol] = True
+                self._apply(data)
+            n += 1
+
+    def _run(self):
+        subscriber = self.subscriber
+        while not self._stop.is_set():
+            if subscriber.poll(100):
+                self.drain()
+
+    def tick(self):
+        """Updates of the symbols that changed since the previous tick."""
+        if self._thread is None:
+            self.drain()
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            gaps, self._gaps = self._gaps, {}
+            updates = []
+            for symbol, state in dirty.items():
+                updates.append(
+                    ConflatedUpdate(
+                        symbol,
+                        state.depth(self.depth),
+                        state.last_price,
+                        state.volume,
+                        state.trades,
+                        state.messages,
+                        state.ts,
+                        gaps.get(symbol, False),
+                    )
+                )
+                state.reset()
+        return updates
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.subscriber.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(endpoint="tcp://127.0.0.1:1234", interval=0.25):
+    """Print one conflated update per symbol every ``interval`` seconds."""
+    with Conflator(MarketDataSubscriber(endpoint), depth=5, thread=True) as feed:
+        while True:
+            time.sleep(interval)
+            for update in feed.tick():
+                depth = update.depth
+                bid = depth.bid_price[0] if len(depth.bid_price) else float("nan")
+                ask = depth.ask_price[0] if len(depth.ask_price) else float("nan")
+                print(
+                    f"{update.symbol:6} {bid:>8.2f} / {ask:<8.2f} "
+                    f"last {update.last_price:>8.2f} vol {update.volume:>8} "
+                    f"from {update.messages} messages"
+                    + (" (gap)" if update.gap else "")
+                )
+
+
+if __name__ == "__main__":
+    main()
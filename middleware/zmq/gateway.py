@@ -0,0 +1,295 @@
+"""Asyncio order-entry gateway in front of one order book.
+
+Clients connect DEALER sockets to the gateway's ROUTER and send messages
+of one or more packed ``ORDER_DTYPE`` rows. The gateway collects whatever
+arrives within a micro-batch ``window`` (up to ``max_batch`` orders), runs
+it through ``OrderBook.process_orders`` in one call and replies to each
+client with:
+
+    [b"A", ACK_DTYPE rows]   one per order of each message, once processed
+    [b"F", FILL_DTYPE rows]  the client's fills of the batch, as taker or
+                             maker
+
+A trailing partial row of a message is ignored, and messages that are not
+a single payload frame are dropped. Rows are acked as ``REJECTED`` when
+they have a negative or too large id, an unknown type, a side other than
+0 or 1 on a limit or market order, a limit price that is not finite, an
+infinite modify price or a size below 1 on anything but a cancel. If the
+book still raises, the batch's orders are acked as ``FAILED`` (their state
+is unknown), the fills it made are sent and the gateway carries on. Order
+ids are the client's own; the gateway keeps clients apart by putting the
+client's index in the top bits of the ids the book sees, so a fill's owner
+is a shift away. At most ``max_pending`` messages wait to be matched:
+beyond that the gateway stops reading its socket, so ZeroMQ's high-water
+marks push back on the clients.
+
+Run ``python -m middleware.zmq.gateway`` to start a gateway on a fresh
+book and ``python -m middleware.zmq.gateway client`` to load it with
+synthetic flow.
+"""
+
+import asyncio
+import sys
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+import zmq
+import zmq.asyncio
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType
+
+ACK, FILL = b"A", b"F"
+ACCEPTED, REJECTED, FAILED = 0, 1, 2
+
+# Client order ids must fit below the client index bits.
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+
+ACK_DTYPE = np.dtype([("order_id", "<i8"), ("status", "u1")])
+
+# ``side`` is the client's side of the trade and ``maker`` is 1 when its
+# order was resting.
+FILL_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("order_id", "<i8"),
+        ("price", "<f8"),
+        ("size", "<i8"),
+        ("side", "u1"),
+        ("maker", "u1"),
+    ]
+)
+
+_VALID_TYPES = np.array(
+    [OrderType.LIMIT, OrderType.MARKET, OrderType.CANCEL, OrderType.MODIFY]
+)
+
+
+class OrderGateway:
+    """ROUTER socket bound to ``endpoint`` feeding micro-batches into
+    ``book``; see the module docstring."""
+
+    def __init__(
+        self,
+        book,
+        endpoint="tcp://*:5555",
+        window=0.0005,
+        max_batch=8192,
+        max_pending=1024,
+        context=None,
+    ):
+        self.book = book
+        self.window = window
+        self.max_batch = max_batch
+        context = context or zmq.asyncio.Context.instance()
+        self.socket = context.socket(zmq.ROUTER)
+        self.socket.bind(endpoint)
+        self.batches = 0
+        self.orders = 0
+        self.dropped = 0
+        self.errors = 0
+        self._pending = asyncio.Queue(max_pending)
+        self._clients = []
+        self._index = {}
+
+    async def run(self):
+        """Serve until cancelled."""
+        await asyncio.gather(self._receive(), self._match())
+
+    async def _receive(self):
+        socket, pending = self.socket, self._pending
+        while True:
+            message = await socket.recv_multipart()
+            if self._wellformed(message):
+                await pending.put(message)
+            # Drain what has queued up without a trip through the event
+            # loop per message.
+            while not pending.full():
+                try:
+                    message = await socket.recv_multipart(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                if self._wellformed(message):
+                    pending.put_nowait(message)
+
+    def _wellformed(self, message):
+        """Whether ``message`` is an identity and one payload frame."""
+        if len(message) == 2:
+            return True
+        self.dropped += 1
+        return False
+
+    def _client(self, identity):
+        index = self._index.get(identity)
+        if index is None:
+            index = self._index[identity] = len(self._clients)
+            self._clients.append(identity)
+        return index
+
+    async def _match(self):
+        pending = self._pending
+        while True:
+            messages = [await pending.get()]
+            # Under load the queue already holds the next batch; only wait
+            # for more when it does not.
+            if self.window and pending.empty():
+                await asyncio.sleep(self.window)
+            count = len(messages[0][1]) // ORDER_DTYPE.itemsize
+            while count < self.max_batch and not pending.empty():
+                message = pending.get_nowait()
+                messages.append(message)
+                count += len(message[1]) // ORDER_DTYPE.itemsize
+            try:
+                self._process(messages)
+            except Exception:
+                # One bad batch must not stop the gateway for every client.
+                traceback.print_exc()
+                self.errors += 1
+
+    def _process(self, messages):
+        """Match the orders of ``messages`` in one batch, then ack every
+        message and send the fills to their owners."""
+        item = ORDER_DTYPE.itemsize
+        counts = [len(payload) // item for _, payload in messages]
+        data = b"".join(
+            payload[: n * item] for (_, payload), n in zip(messages, counts)
+        )
+        rows = np.frombuffer(data, ORDER_DTYPE).copy()
+        ids, kind, price = rows["order_id"], rows["type"], rows["price"]
+        limit = kind == OrderType.LIMIT
+        valid = (ids >= 0) & (ids <= ID_MASK) & np.isin(kind, _VALID_TYPES)
+        valid &= ~(limit | (kind == OrderType.MARKET)) | (rows["side"] <= 1)
+        valid &= ~limit | np.isfinite(price)
+        valid &= (kind != OrderType.MODIFY) | ~np.isinf(price)
+        valid &= (kind == OrderType.CANCEL) | (rows["size"] > 0)
+        acks = np.empty(len(rows), ACK_DTYPE)
+        acks["order_id"] = ids
+        acks["status"] = np.where(valid, ACCEPTED, REJECTED)
+        owners = [self._client(identity) for identity, _ in messages]
+        ids |= np.repeat(owners, counts) << ID_BITS
+        batch = rows[valid]
+        start = self.book.trades.count
+        try:
+            fills = self.book.process_orders(batch)
+        except Exception:
+            traceback.print_exc()
+            self.errors += 1
+            acks["status"][valid] = FAILED
+            fills = self.book.trades.fills(start)
+        self.batches += 1
+        self.orders += len(batch)
+
+        # A ROUTER never blocks on send (replies to a client over its
+        # high-water mark are dropped), so the sends complete immediately.
+        send, start = self.socket.send_multipart, 0
+        for (identity, _), n in zip(messages, counts):
+            send([identity, ACK, acks[start : start + n]])
+            start += n
+        if len(fills.size):
+            for identity, rows in self._route(fills):
+                send([identity, FILL, rows])
+
+    def _route(self, fills):
+        """Split ``fills`` into ``FILL_DTYPE`` rows per owning client, two
+        rows per trade: the taker's and the maker's."""
+        n = len(fills.size)
+        rows = np.empty(2 * n, FILL_DTYPE)
+        ids = np.concatenate((fills.order_id, fills.book_order_id))
+        rows["ts"] = np.tile(fills.ts, 2)
+        rows["order_id"] = ids & ID_MASK
+        rows["price"] = np.tile(fills.price, 2)
+        rows["size"] = np.tile(fills.size, 2)
+        rows["side"] = np.concatenate((fills.side, 1 - fills.side))
+        rows["maker"] = np.repeat([0, 1], n)
+        owner = ids >> ID_BITS
+        order = np.argsort(owner, kind="stable")
+        owner, rows = owner[order], rows[order]
+        clients, starts = np.unique(owner, return_index=True)
+        bounds = np.append(starts, len(owner))
+        for client, start, stop in zip(clients.tolist(), bounds[:-1], bounds[1:]):
+            yield self._clients[client], rows[start:stop]
+
+    def close(self):
+        self.socket.close(linger=0)
+
+
+class OrderClient:
+    """DEALER connection to an ``OrderGateway``."""
+
+    def __init__(self, endpoint="tcp://127.0.0.1:5555", context=None):
+        context = context or zmq.asyncio.Context.instance()
+        self.socket = context.socket(zmq.DEALER)
+        self.socket.connect(endpoint)
+
+    async def send(self, orders):
+        """Send an array of ``ORDER_DTYPE`` rows as one message."""
+        await self.socket.send(np.ascontiguousarray(orders, ORDER_DTYPE), copy=False)
+
+    async def recv(self):
+        """Next reply as ``(kind, rows)``, with ``kind`` ``ACK`` or
+        ``FILL``."""
+        kind, payload = await self.socket.recv_multipart()
+        return kind, np.frombuffer(payload, ACK_DTYPE if kind == ACK else FILL_DTYPE)
+
+    def close(self):
+        self.socket.close(linger=0)
+
+
+async def _serve(endpoint):
+    from quant_research.order_research.orderbook import OrderBook
+
+    gateway = OrderGateway(OrderBook(), endpoint)
+    print(f"Gateway listening on {endpoint}")
+    task = asyncio.ensure_future(gateway.run())
+    last = 0
+    while True:
+        await asyncio.sleep(1)
+        print(
+            f"{gateway.orders - last:,} orders/s in {gateway.batches} batches",
+            file=sys.stderr,
+        )
+        last = gateway.orders
+        if task.done():
+            return task.result()
+
+
+async def _load(endpoint, n=1_000_000, per_message=64, window=256):
+    """Send synthetic flow with at most ``window`` messages unacknowledged
+    and report the ack round-trip percentiles."""
+    from quant_research.order_research.flow import order_flow
+
+    client = OrderClient(endpoint)
+    events = order_flow(n)
+    messages = range(0, n, per_message)
+    credit = asyncio.Semaphore(window)
+    # Acks come back in the order the messages were sent.
+    sent, latency = deque(), []
+
+    async def receive():
+        while len(latency) < len(messages):
+            kind, _ = await client.recv()
+            if kind == ACK:
+                latency.append(time.perf_counter() - sent.popleft())
+                credit.release()
+
+    receiver = asyncio.ensure_future(receive())
+    start = time.perf_counter()
+    for i in messages:
+        await credit.acquire()
+        sent.append(time.perf_counter())
+        await client.send(events[i : i + per_message])
+    await receiver
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+    print(f"{n / elapsed:,.0f} orders/s, ack p50 {p50:.0f}us p99 {p99:.0f}us")
+    client.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["client"]:
+        asyncio.run(_load("tcp://127.0.0.1:5555"))
+    else:
+        asyncio.run(_serve("tcp://*:5555"))
@@ -1,18 +1,168 @@
-import zmq
+"""Binary market-data publisher for order book deltas and trades.
+
+Every message is three frames:
+
+    topic    symbol, NUL, kind (b"L" level deltas, b"T" trades)
+    header   HEADER: version, kind, record count, sequence number
+    records  packed little-endian LEVEL_DTYPE or TRADE_DTYPE rows
+
+Subscribers filter on the socket by prefix: b"AAPL\\0" gives every message
+for AAPL and b"AAPL\\0T" only its trades. The sequence number counts the
+messages of each symbol and kind, so a subscriber can tell when the
+high-water mark dropped some. Record arrays are handed to ZeroMQ with
+``copy=False``.
+
+Run ``python -m middleware.zmq.pub`` to publish synthetic flow for a few
+symbols and ``python -m middleware.zmq.sub`` to receive it.
+"""
+
+import struct
+import sys
 import time
 
-ctx = zmq.Context()
-sock = ctx.socket(zmq.PUB)
-sock.bind("tcp://*:1234")
-
-print("Starting loop...")
-i = 1
-while True:
-    msg = "Hi for the %d:th time..." % i
-    sock.send_string(msg)
-    print("Sent string: %s ..." % msg)
-    i += 1
-    time.sleep(1)
-
-sock.close()
-ctx.term()
+import numpy as np
+import zmq
+
+VERSION = 1
+LEVELS, TRADES = b"L", b"T"
+HEADER = struct.Struct("<BcHIQ")
+
+# A changed price level; ``size`` and ``count`` are zero for removed levels.
+LEVEL_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("price", "<f8"),
+        ("size", "<i8"),
+        ("count", "<u4"),
+        ("side", "u1"),
+        ("_pad", "V3"),
+    ]
+)
+
+# A trade; ``side`` is the aggressor's.
+TRADE_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("price", "<f8"),
+        ("size", "<i8"),
+        ("side", "u1"),
+        ("_pad", "V7"),
+    ]
+)
+
+
+def topic(symbol, kind=b""):
+    return symbol.encode() + b"\0" + kind
+
+
+def encode_levels(changes, ts):
+    """``LEVEL_DTYPE`` rows of a ``LevelChanges``, all stamped ``ts``."""
+    records = np.zeros(len(changes.price), LEVEL_DTYPE)
+    records["ts"] = ts
+    records["price"] = changes.price
+    records["size"] = changes.size
+    records["count"] = changes.count
+    records["side"] = changes.side
+    return records
+
+
+def encode_trades(fills):
+    """``TRADE_DTYPE`` rows of a ``Fills``."""
+    records = np.zeros(len(fills.price), TRADE_DTYPE)
+    records["ts"] = fills.ts
+    records["price"] = fills.price
+    records["size"] = fills.size
+    records["side"] = fills.side
+    return records
+
+
+class MarketDataPublisher:
+    """Publishes per-symbol level deltas and trades on a PUB socket bound
+    to ``endpoint``.
+
+    Records are sent in messages of at most ``batch`` rows. ``publish_book``
+    sends everything a book changed since its previous call for the same
+    symbol.
+    """
+
+    __slots__ = "socket", "batch", "sent", "_seq", "_cursors", "_own"
+
+    def __init__(self, endpoint="tcp://*:1234", batch=4096, context=None, sndhwm=None):
+        self._own = context is None
+        context = context or zmq.Context()
+        self.socket = context.socket(zmq.PUB)
+        if sndhwm is not None:
+            self.socket.sndhwm = sndhwm
+        self.socket.bind(endpoint)
+        self.batch = batch
+        self.sent = 0
+        self._seq = {}
+        self._cursors = {}
+
+    def send(self, symbol, kind, records):
+        """Send ``records`` of ``kind`` for ``symbol``, split into messages
+        of at most ``batch`` rows."""
+        socket, prefix = self.socket, topic(symbol, kind)
+        seq = self._seq.get(prefix, 0)
+        for start in range(0, len(records), self.batch):
+            chunk = records[start : start + self.batch]
+            header = HEADER.pack(VERSION, kind, 0, len(chunk), seq)
+            socket.send_multipart([prefix, header, chunk], copy=False)
+            seq += 1
+        self._seq[prefix] = seq
+        self.sent += len(records)
+
+    def send_levels(self, symbol, changes, ts):
+        if len(changes.price):
+            self.send(symbol, LEVELS, encode_levels(changes, ts))
+
+    def send_trades(self, symbol, fills):
+        if len(fills.price):
+            self.send(symbol, TRADES, encode_trades(fills))
+
+    def publish_book(self, symbol, book, ts):
+        """Send the trades of ``book`` since the last call for ``symbol`` and
+        its ``changed_levels``, stamped ``ts``."""
+        start = self._cursors.get(symbol, 0)
+        self._cursors[symbol] = book.trades.count
+        self.send_trades(symbol, book.trades.fills(start))
+        self.send_levels(symbol, book.changed_levels(), ts)
+
+    def close(self):
+        self.socket.close(linger=0)
+        if self._own:
+            self.socket.context.term()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(endpoint="tcp://*:1234", symbols=("AAPL", "MSFT", "GOOG"), chunk=2000):
+    from quant_research.order_research.flow import order_flow
+    from quant_research.order_research.orderbook import OrderBook
+
+    books = {symbol: OrderBook() for symbol in symbols}
+    flows = {symbol: order_flow(1_000_000, symbol=symbol) for symbol in symbols}
+    print("Publishing synthetic flow for", ", ".join(symbols))
+    with MarketDataPublisher(endpoint) as publisher:
+        start, last, position = time.perf_counter(), 0, 0
+        while True:
+            for symbol, book in books.items():
+                batch = flows[symbol][position : position + chunk]
+                if not len(batch):
+                    return
+                book.process_orders(batch)
+                publisher.publish_book(symbol, book, int(batch["ts"][-1]))
+            position += chunk
+            elapsed = time.perf_counter() - start
+            if elapsed >= 1:
+                rate = (publisher.sent - last) / elapsed
+                print(f"{rate:,.0f} updates/s", file=sys.stderr)
+                start, last = time.perf_counter(), publisher.sent
+
+
+if __name__ == "__main__":
+    main()
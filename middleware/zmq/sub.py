@@ -1,15 +1,118 @@
-import zmq
+"""Decoder and subscriber for the binary feed of ``middleware.zmq.pub``."""
+
+import sys
 import time
+from typing import NamedTuple
+
+import numpy as np
+import zmq
+
+from middleware.zmq.pub import (
+    HEADER,
+    LEVEL_DTYPE,
+    LEVELS,
+    TRADE_DTYPE,
+    TRADES,
+    VERSION,
+    topic,
+)
+
+DTYPES = {LEVELS: LEVEL_DTYPE, TRADES: TRADE_DTYPE}
+
+
+class MarketData(NamedTuple):
+    """One decoded message; ``records`` is a read-only view of the received
+    frame."""
+
+    symbol: str
+    kind: bytes
+    seq: int
+    records: np.ndarray
+
+
+def decode(frames):
+    """Decode the three frames of a message, without copying the
+    records."""
+    prefix, header, payload = frames
+    version, kind, _, count, seq = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError(f"unsupported feed version {version}")
+    symbol = bytes(prefix).split(b"\0", 1)[0].decode()
+    records = np.frombuffer(payload, DTYPES[kind], count)
+    return MarketData(symbol, kind, seq, records)
+
+
+class MarketDataSubscriber:
+    """Subscribes to ``symbols`` (all when None) on ``endpoint`` and decodes
+    messages; with ``symbols``, ``kinds`` can narrow the subscription to
+    ``LEVELS`` or ``TRADES``.
+
+    ``gaps`` counts the messages missed according to the sequence numbers,
+    e.g. dropped at the publisher's high-water mark.
+    """
+
+    __slots__ = "socket", "gaps", "_next", "_own"
+
+    def __init__(
+        self, endpoint="tcp://127.0.0.1:1234", symbols=None, kinds=None, context=None
+    ):
+        self._own = context is None
+        context = context or zmq.Context()
+        self.socket = context.socket(zmq.SUB)
+        self.socket.connect(endpoint)
+        for symbol in [None] if symbols is None else symbols:
+            for kind in kinds or [b""]:
+                if symbol is None:
+                    self.socket.subscribe(b"")
+                else:
+                    self.socket.subscribe(topic(symbol, kind))
+        self.gaps = 0
+        self._next = {}
+
+    def _frames(self, flags):
+        return [frame.buffer for frame in self.socket.recv_multipart(flags, copy=False)]
+
+    def poll(self, timeout=None):
+        """Whether a message arrives within ``timeout`` milliseconds."""
+        return bool(self.socket.poll(timeout))
+
+    def recv(self, flags=0):
+        """Next ``MarketData`` message; with ``zmq.NOBLOCK``, raises
+        ``zmq.Again`` if there is none."""
+        data = decode(self._frames(flags))
+        key = data.symbol, data.kind
+        expected = self._next.get(key)
+        if expected is not None and data.seq > expected:
+            self.gaps += data.seq - expected
+        self._next[key] = data.seq + 1
+        return data
+
+    def close(self):
+        self.socket.close(linger=0)
+        if self._own:
+            self.socket.context.term()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
-ctx = zmq.Context()
-sock = ctx.socket(zmq.SUB)
-sock.connect("tcp://127.0.0.1:1234")
-sock.subscribe("")  # Subscribe to all topics
+def main(endpoint="tcp://127.0.0.1:1234", symbols=None):
+    print("Starting receiver loop ...")
+    with MarketDataSubscriber(endpoint, symbols) as subscriber:
+        start, updates = time.perf_counter(), 0
+        while True:
+            updates += len(subscriber.recv().records)
+            elapsed = time.perf_counter() - start
+            if elapsed >= 1:
+                print(
+                    f"{updates / elapsed:,.0f} updates/s, {subscriber.gaps} gaps",
+                    file=sys.stderr,
+                )
+                start, updates = time.perf_counter(), 0
 
-print("Starting receiver loop ...")
-while True:
-    msg = sock.recv_string()
-    print("Received string: %s ..." % msg)
 
-sock.close()
-ctx.term()
+if __name__ == "__main__":
+    main(symbols=sys.argv[1:] or None)
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pytest
+import zmq
+
+from middleware.zmq.conflate import Conflator
+from middleware.zmq.pub import (
+    HEADER,
+    TRADE_DTYPE,
+    TRADES,
+    VERSION,
+    MarketDataPublisher,
+    topic,
+)
+from middleware.zmq.sub import MarketDataSubscriber
+from quant_research.order_research.flow import order_flow
+from quant_research.order_research.orderbook import OrderBook
+
+
+@pytest.fixture(params=[False, True], ids=["inline", "thread"])
+def feed(request):
+    context = zmq.Context()
+    publisher = MarketDataPublisher("inproc://conflate", batch=64, context=context)
+    subscriber = MarketDataSubscriber("inproc://conflate", context=context)
+    conflator = Conflator(subscriber, depth=5, thread=request.param)
+    time.sleep(0.1)
+    yield publisher, conflator
+    conflator.close()
+    publisher.close()
+    context.term()
+
+
+def settle():
+    """Give inproc delivery and the reader thread time to catch up."""
+    time.sleep(0.3)
+
+
+def test_one_update_per_symbol_per_tick(feed):
+    publisher, conflator = feed
+    books = {symbol: OrderBook() for symbol in ("ES", "NQ")}
+    flows = {symbol: order_flow(2000, seed=i) for i, symbol in enumerate(books)}
+    for start in range(0, 2000, 200):
+        for symbol, book in books.items():
+            batch = flows[symbol][start : start + 200]
+            book.process_orders(batch)
+            publisher.publish_book(symbol, book, int(batch["ts"][-1]))
+    settle()
+
+    updates = conflator.tick()
+    assert sorted(update.symbol for update in updates) == ["ES", "NQ"]
+    for update in updates:
+        book = books[update.symbol]
+        assert update.messages > 10
+        assert update.volume == book.trades.fills().size.sum()
+        assert update.trades == book.trades.count
+        assert not update.gap
+        for ours, theirs in zip(update.depth, book.depth(5)):
+            np.testing.assert_array_equal(ours, theirs)
+    assert conflator.tick() == []
+
+
+def test_lost_messages_are_flagged(feed):
+    publisher, conflator = feed
+    records = np.zeros(1, TRADE_DTYPE)
+    records["price"], records["size"] = 100.0, 3
+    for seq in (0, 3):
+        publisher.socket.send_multipart(
+            [topic("ES", TRADES), HEADER.pack(VERSION, TRADES, 0, 1, seq), records]
+        )
+    settle()
+    (update,) = conflator.tick()
+    assert (update.symbol, update.gap, update.volume, update.last_price) == (
+        "ES",
+        True,
+        6,
+        100.0,
+    )
+    assert len(update.depth.bid_price) == 0
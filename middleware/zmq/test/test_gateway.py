@@ -0,0 +1,137 @@
+import asyncio
+
+import numpy as np
+import zmq
+import zmq.asyncio
+
+from middleware.zmq.gateway import (
+    ACCEPTED,
+    ACK,
+    FAILED,
+    FILL,
+    ID_BITS,
+    REJECTED,
+    OrderClient,
+    OrderGateway,
+)
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.order import OrderType
+from quant_research.order_research.orderbook import OrderBook
+
+LIMIT, MARKET, CANCEL = OrderType.LIMIT, OrderType.MARKET, OrderType.CANCEL
+NAN = float("nan")
+
+
+def orders(*rows):
+    """``ORDER_DTYPE`` rows from ``(order_id, type, side, price, size)``."""
+    return np.array([row + (0,) for row in rows], ORDER_DTYPE)
+
+
+def serve(book, session, n_clients=1):
+    """Run ``session(gateway, clients)`` against a gateway on ``book``."""
+
+    async def main():
+        context = zmq.asyncio.Context()
+        gateway = OrderGateway(book, "inproc://gateway", window=0, context=context)
+        clients = [OrderClient("inproc://gateway", context) for _ in range(n_clients)]
+        task = asyncio.ensure_future(gateway.run())
+        try:
+            return await session(gateway, clients)
+        finally:
+            task.cancel()
+            for client in clients:
+                client.close()
+            gateway.close()
+            context.term()
+
+    return asyncio.run(main())
+
+
+async def reply(client):
+    return await asyncio.wait_for(client.recv(), 1)
+
+
+def test_acks_and_rejections():
+    async def session(gateway, clients):
+        (client,) = clients
+        await client.send(
+            orders(
+                (1, LIMIT, 0, 99.0, 10),
+                (2, LIMIT, 7, 99.0, 10),
+                (3, LIMIT, 0, NAN, 10),
+                (4, LIMIT, 1, np.inf, 10),
+                (5, LIMIT, 1, 101.0, 0),
+                (6, MARKET, 1, 0.0, -5),
+                (-7, LIMIT, 0, 99.0, 10),
+                (8, 42, 0, 99.0, 10),
+                (9, CANCEL, 0, 0.0, 0),
+            )
+        )
+        kind, acks = await reply(client)
+        assert kind == ACK
+        return acks
+
+    book = OrderBook()
+    acks = serve(book, session)
+    assert acks["order_id"].tolist() == [1, 2, 3, 4, 5, 6, -7, 8, 9]
+    assert acks["status"].tolist() == [ACCEPTED] + [REJECTED] * 7 + [ACCEPTED]
+    assert len(book) == 1
+
+
+def test_fills_are_routed_to_both_clients_with_their_own_ids():
+    async def session(gateway, clients):
+        seller, buyer = clients
+        await seller.send(orders((1, LIMIT, 1, 100.0, 10)))
+        assert (await reply(seller))[0] == ACK
+        # Both clients use order id 1.
+        await buyer.send(orders((1, LIMIT, 0, 100.0, 4)))
+        replies = {}
+        for client, name in ((buyer, "buyer"), (buyer, "buyer"), (seller, "seller")):
+            kind, rows = await reply(client)
+            replies.setdefault(name, {})[kind] = rows
+        return replies
+
+    book = OrderBook()
+    replies = serve(book, session, n_clients=2)
+    taker, maker = replies["buyer"][FILL], replies["seller"][FILL]
+    assert taker[["order_id", "price", "size", "side", "maker"]].tolist() == [
+        (1, 100.0, 4, 0, 0)
+    ]
+    assert maker[["order_id", "price", "size", "side", "maker"]].tolist() == [
+        (1, 100.0, 4, 1, 1)
+    ]
+    # The seller's order rests under its client index in the top bits.
+    assert book.get_best_ask().order_id == 1
+    assert book.get_best_ask().remaining == 6
+    assert replies["buyer"][ACK]["status"].tolist() == [ACCEPTED]
+
+
+def test_client_ids_are_namespaced():
+    async def session(gateway, clients):
+        for client in clients:
+            await client.send(orders((5, LIMIT, 0, 99.0, 1)))
+            await reply(client)
+        return None
+
+    book = OrderBook()
+    serve(book, session, n_clients=2)
+    assert sorted(book._orders) == [5, (1 << ID_BITS) | 5]
+
+
+def test_bad_messages_do_not_stop_the_gateway():
+    async def session(gateway, clients):
+        (client,) = clients
+        await client.socket.send_multipart([b"one", b"too many"])
+        # Valid for the gateway, but outside the ladder's price band.
+        await client.send(orders((1, LIMIT, 0, 500.0, 10)))
+        kind, failed = await reply(client)
+        await client.send(orders((2, LIMIT, 0, 99.0, 10)))
+        _, accepted = await reply(client)
+        return gateway, failed, accepted
+
+    gateway, failed, accepted = serve(LadderOrderBook(1, 90, 110), session)
+    assert gateway.dropped == 1
+    assert gateway.errors == 1
+    assert failed["status"].tolist() == [FAILED]
+    assert accepted["status"].tolist() == [ACCEPTED]
@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+import pytest
+import zmq
+
+from middleware.zmq.pub import (
+    HEADER,
+    LEVEL_DTYPE,
+    LEVELS,
+    TRADE_DTYPE,
+    TRADES,
+    VERSION,
+    MarketDataPublisher,
+    encode_levels,
+    encode_trades,
+    topic,
+)
+from middleware.zmq.sub import MarketDataSubscriber, decode
+from quant_research.order_research.level import LevelChanges
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.order import LimitOrder, Side
+
+
+def trades(n, start=0):
+    records = np.zeros(n, TRADE_DTYPE)
+    records["ts"] = np.arange(start, start + n)
+    records["price"] = 100.0
+    records["size"] = 1
+    return records
+
+
+@pytest.fixture
+def feed():
+    context = zmq.Context()
+    publisher = MarketDataPublisher("inproc://feed", batch=3, context=context)
+    subscriber = MarketDataSubscriber("inproc://feed", context=context)
+    # Let the subscription reach the publisher.
+    time.sleep(0.1)
+    yield publisher, subscriber
+    subscriber.close()
+    publisher.close()
+    context.term()
+
+
+def test_record_layouts():
+    assert LEVEL_DTYPE.itemsize == 32
+    assert TRADE_DTYPE.itemsize == 32
+    assert topic("AAPL") == b"AAPL\0"
+    assert topic("AAPL", TRADES) == b"AAPL\0T"
+
+
+def test_decode_round_trip():
+    changes = LevelChanges(
+        side=np.array([0, 1], np.uint8),
+        price=np.array([99.5, 100.5]),
+        size=np.array([10, 0]),
+        count=np.array([2, 0]),
+    )
+    levels = encode_levels(changes, ts=42)
+    frames = [topic("ES", LEVELS), HEADER.pack(VERSION, LEVELS, 0, 2, 9), levels]
+    data = decode([bytes(frame) for frame in frames])
+    assert (data.symbol, data.kind, data.seq) == ("ES", LEVELS, 9)
+    assert data.records.tobytes() == levels.tobytes()
+    assert data.records["ts"].tolist() == [42, 42]
+    assert data.records["count"].tolist() == [2, 0]
+
+    ob = OrderBook()
+    ob.process_order(LimitOrder(1, Side.SELL, 5, 100, ts=1))
+    ob.process_order(LimitOrder(2, Side.BUY, 3, 100, ts=2))
+    records = encode_trades(ob.trades.fills())
+    frames = [topic("ES", TRADES), HEADER.pack(VERSION, TRADES, 0, 1, 0), records]
+    data = decode([bytes(frame) for frame in frames])
+    assert data.records[["ts", "price", "size", "side"]].tolist() == [(2, 100.0, 3, 0)]
+
+    with pytest.raises(ValueError):
+        decode([frames[0], HEADER.pack(VERSION + 1, TRADES, 0, 1, 0), records])
+
+
+def test_batches_and_sequence_gaps(feed):
+    publisher, subscriber = feed
+    publisher.send("ES", TRADES, trades(7))
+    messages = [subscriber.recv() for _ in range(3)]
+    assert [(m.symbol, m.kind, m.seq) for m in messages] == [
+        ("ES", TRADES, i) for i in range(3)
+    ]
+    assert [len(m.records) for m in messages] == [3, 3, 1]
+    assert np.concatenate([m.records["ts"] for m in messages]).tolist() == list(
+        range(7)
+    )
+    assert subscriber.gaps == 0
+
+    # Two messages lost: the next one carries sequence number 5.
+    publisher.socket.send_multipart(
+        [topic("ES", TRADES), HEADER.pack(VERSION, TRADES, 0, 1, 5), trades(1)]
+    )
+    assert subscriber.recv().seq == 5
+    assert subscriber.gaps == 2
+    with pytest.raises(zmq.Again):
+        subscriber.recv(zmq.NOBLOCK)
+
+
+def test_publish_book_sends_trades_and_levels(feed):
+    publisher, subscriber = feed
+    ob = OrderBook()
+    ob.process_order(LimitOrder(1, Side.SELL, 5, 101, ts=1))
+    ob.process_order(LimitOrder(2, Side.BUY, 2, 101, ts=2))
+    publisher.publish_book("ES", ob, ts=3)
+    trade, levels = subscriber.recv(), subscriber.recv()
+    assert trade.kind == TRADES and trade.records["size"].tolist() == [2]
+    assert levels.kind == LEVELS
+    assert levels.records[["price", "size", "side"]].tolist() == [(101.0, 3, 1)]
+    # Nothing new since the last call.
+    publisher.publish_book("ES", ob, ts=4)
+    assert not subscriber.poll(50)
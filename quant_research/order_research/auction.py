@@ -0,0 +1,260 @@
+"""Call auctions: collect orders during a call phase, then uncross them in one
+vectorised pass over cumulative supply and demand."""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE, RESTING_DTYPE
+from quant_research.order_research.order import OrderType, Side
+
+
+class AuctionResult(NamedTuple):
+    """Outcome of an uncross. ``price`` is NaN when nothing crossed, and
+    ``imbalance`` is the buy minus sell size executable at ``price``."""
+
+    price: float
+    volume: int
+    imbalance: int
+
+
+class AuctionFills(NamedTuple):
+    """Trades of an uncross, all at the auction price; ``buy_order_id`` and
+    ``sell_order_id`` name the two orders of each trade."""
+
+    size: np.ndarray
+    buy_order_id: np.ndarray
+    sell_order_id: np.ndarray
+
+
+NO_CROSS = AuctionResult(float("nan"), 0, 0)
+
+
+def _distinct(values):
+    """Distinct values of a sorted array, in order."""
+    keep = np.empty(len(values), bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def _merge(a, b):
+    """Sorted distinct values of two ascending arrays; sorting two
+    concatenated runs is linear."""
+    return _distinct(np.sort(np.concatenate((a, b)), kind="stable"))
+
+
+def equilibrium(bid_price, bid_size, ask_price, ask_size, reference=None):
+    """Find the auction price for bids sorted by descending price and asks
+    sorted by ascending price; market orders are priced at +/-inf.
+
+    The price maximises executable volume, then minimises the absolute
+    imbalance. Remaining ties go to the highest price when buyers are left
+    over at all of them, the lowest when sellers are, and otherwise to the
+    price closest to ``reference`` or, without one, the middle candidate.
+    """
+    candidates = _merge(_distinct(bid_price)[::-1], _distinct(ask_price))
+    if reference is not None:
+        candidates = _merge(candidates, [reference])
+    candidates = candidates[np.isfinite(candidates)]
+    if not len(candidates):
+        return NO_CROSS
+    bid_cum = np.concatenate(([0], np.cumsum(bid_size)))
+    ask_cum = np.concatenate(([0], np.cumsum(ask_size)))
+    demand = bid_cum[np.searchsorted(-bid_price, -candidates, "right")]
+    supply = ask_cum[np.searchsorted(ask_price, candidates, "right")]
+    volume = np.minimum(demand, supply)
+    imbalance = demand - supply
+
+    best = np.flatnonzero(volume == volume.max())
+    if volume[best[0]] == 0:
+        return NO_CROSS
+    surplus = np.abs(imbalance[best])
+    best = best[surplus == surplus.min()]
+    if len(best) == 1:
+        i = best[0]
+    elif (imbalance[best] > 0).all():
+        i = best[-1]
+    elif (imbalance[best] < 0).all():
+        i = best[0]
+    elif reference is not None:
+        i = best[np.argmin(np.abs(candidates[best] - reference))]
+    else:
+        i = best[(len(best) - 1) // 2]
+    return AuctionResult(float(candidates[i]), int(volume[i]), int(imbalance[i]))
+
+
+def _allocate(size, volume):
+    """Fill ``volume`` across ``size`` in order; return per-order fills and
+    the cumulative fill boundaries of the orders that fill."""
+    cum = np.minimum(np.cumsum(size), volume)
+    fill = np.diff(cum, prepend=0)
+    n = np.searchsorted(cum, volume) + 1 if volume else 0
+    return fill, cum[:n]
+
+
+class CallAuction:
+    """Order events collected during an auction call phase.
+
+    Events are kept as ``ORDER_DTYPE`` rows in arrival order: batches as
+    array chunks and single orders as tuples. Cancels and amendments are
+    resolved when the auction is uncrossed, against the order's latest add:
+    its events are applied in arrival order as the book would apply them,
+    and it goes to the back of the queue at the last amendment that raised
+    its size or changed its price.
+
+    ``displays`` maps the ids of iceberg orders to their display size. Their
+    rows carry the full open size, and the book rests what is left of them
+    as icebergs again.
+    """
+
+    __slots__ = "_chunks", "_rows", "displays"
+
+    def __init__(self):
+        self._chunks = []
+        self._rows = []
+        self.displays = {}
+
+    def append(self, order_id, kind, side, price, size, ts):
+        self._rows.append((order_id, kind, side, price, size, ts))
+
+    def add(self, batch):
+        """Collect a batch of ``ORDER_DTYPE`` rows."""
+        self._flush()
+        self._chunks.append(np.array(batch, dtype=ORDER_DTYPE))
+
+    def add_resting(self, resting):
+        """Collect the orders of a ``dump_orders`` array as limit orders."""
+        events = np.zeros(len(resting), dtype=ORDER_DTYPE)
+        for name in ("order_id", "side", "price", "ts"):
+            events[name] = resting[name]
+        events["type"] = OrderType.LIMIT
+        events["size"] = resting["remaining"]
+        self.add(events)
+
+    def _flush(self):
+        if self._rows:
+            self._chunks.append(np.array(self._rows, dtype=ORDER_DTYPE))
+            self._rows = []
+
+    def events(self):
+        """All collected events in arrival order."""
+        self._flush()
+        if not self._chunks:
+            return np.empty(0, dtype=ORDER_DTYPE)
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0]
+
+    def orders(self):
+        """Live orders after applying cancels and amendments, in priority
+        order."""
+        events = self.events()
+        kind = events["type"]
+        is_add = (kind == OrderType.LIMIT) | (kind == OrderType.MARKET)
+        if is_add.all():
+            return events
+        events = events[kind != OrderType.TRADE]
+        kind = events["type"]
+        is_add = (kind == OrderType.LIMIT) | (kind == OrderType.MARKET)
+        adds = np.flatnonzero(is_add)
+        if not len(adds):
+            return events[:0]
+        ids = events["order_id"]
+
+        # Latest add of each order id, and the events that follow it.
+        add_ids, latest = np.unique(ids[adds][::-1], return_index=True)
+        add = adds[len(adds) - 1 - latest]
+        other = np.flatnonzero(~is_add)
+        group = np.minimum(np.searchsorted(add_ids, ids[other]), len(add_ids) - 1)
+        mine = (add_ids[group] == ids[other]) & (other > add[group])
+
+        # Each order's add followed by its events in arrival order, so the
+        # amendments fold as the book would apply them one by one.
+        steps = np.concatenate((add, other[mine]))
+        group = np.concatenate((np.arange(len(add)), group[mine]))
+        order = np.lexsort((steps, group))
+        steps, group = steps[order], group[order]
+        first = np.searchsorted(group, np.arange(len(add)))
+        rows = events[steps]
+        step_kind, size = rows["type"], rows["size"]
+        modify = step_kind == OrderType.MODIFY
+        stop = (step_kind == OrderType.CANCEL) | (modify & (size <= 0))
+        stopped = np.cumsum(stop)
+        alive = stopped == stopped[first][group]
+        # An amendment without a price keeps the one before it.
+        position = np.arange(len(steps))
+        price = rows["price"][
+            np.maximum.accumulate(np.where(np.isnan(rows["price"]), 0, position))
+        ]
+        requeue = (
+            alive
+            & modify
+            & ((size > size[position - 1]) | (price != price[position - 1]))
+        )
+
+        final = first + np.add.reduceat(alive, first) - 1
+        cancelled = np.logical_or.reduceat(stop, first)
+        last_requeue = np.maximum.reduceat(np.where(requeue, position, -1), first)
+        requeued = last_requeue >= 0
+        orders = events[add]
+        orders["size"] = size[final]
+        orders["price"] = price[final]
+        orders["ts"] = np.where(requeued, rows["ts"][last_requeue], orders["ts"])
+        priority = np.where(requeued, steps[last_requeue], add)
+
+        live = ~cancelled & (orders["size"] > 0)
+        rank = np.full(len(events), -1)
+        rank[priority[live]] = np.flatnonzero(live)
+        return orders[rank[rank >= 0]]
+
+    def indicative(self, reference=None):
+        """Price, volume and imbalance if the auction uncrossed now."""
+        return self.uncross(reference)[0]
+
+    def uncross(self, reference=None):
+        """Return the ``AuctionResult``, the ``AuctionFills`` and the unfilled
+        limit orders as a ``RESTING_DTYPE`` array in priority order."""
+        orders = self.orders()
+        # Contiguous copies make the gathers below several times faster than
+        # indexing the packed fields directly.
+        side, size, order_id = (
+            np.ascontiguousarray(orders[name]) for name in ("side", "size", "order_id")
+        )
+        is_buy = side == Side.BUY.value
+        market = orders["type"] == OrderType.MARKET
+        price = orders["price"].copy()
+        price[market] = np.where(is_buy[market], np.inf, -np.inf)
+
+        bids = np.flatnonzero(is_buy)
+        bids = bids[np.argsort(-price[bids], kind="stable")]
+        asks = np.flatnonzero(~is_buy)
+        asks = asks[np.argsort(price[asks], kind="stable")]
+        bid_size, ask_size = size[bids], size[asks]
+        result = equilibrium(price[bids], bid_size, price[asks], ask_size, reference)
+
+        bid_fill, bid_cum = _allocate(bid_size, result.volume)
+        ask_fill, ask_cum = _allocate(ask_size, result.volume)
+        edges = _merge(bid_cum, ask_cum)
+        starts = np.concatenate(([0], edges[:-1]))[: len(edges)]
+        fills = AuctionFills(
+            size=edges - starts,
+            buy_order_id=order_id[bids[np.searchsorted(bid_cum, starts, "right")]],
+            sell_order_id=order_id[asks[np.searchsorted(ask_cum, starts, "right")]],
+        )
+
+        book = np.concatenate((bids, asks))
+        remaining = np.concatenate((bid_size - bid_fill, ask_size - ask_fill))
+        keep = (remaining > 0) & ~market[book]
+        rest = book[keep]
+        resting = np.empty(len(rest), dtype=RESTING_DTYPE)
+        resting["order_id"] = order_id[rest]
+        resting["side"] = side[rest]
+        resting["price"] = price[rest]
+        resting["size"] = size[rest]
+        resting["remaining"] = remaining[keep]
+        resting["ts"] = orders["ts"][rest]
+        return result, fills, resting
+
+    def __len__(self):
+        return sum(map(len, self._chunks)) + len(self._rows)
@@ -0,0 +1,302 @@
+"""Event-driven backtesting around order book replay.
+
+Historical ``ORDER_DTYPE`` events are fed to a book in batches, and the
+strategy sees every processed chunk of events together with its fills.
+Orders the strategy submits through its ``Context`` reach the book after a
+latency, interleaved with the market events by timestamp. Strategy orders
+get negative ids, so its fills are picked out of each ``Fills`` with one
+vectorised comparison.
+"""
+
+import heapq
+import multiprocessing
+from typing import NamedTuple
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType, Side
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.replay import open_events
+
+# One row per strategy fill, with ``side`` from the strategy's point of view
+# and the running ``position`` and ``cash`` after the fill.
+OWN_FILL_DTYPE = np.dtype(
+    [
+        ("ts", np.int64),
+        ("side", np.uint8),
+        ("price", np.float64),
+        ("size", np.int64),
+        ("order_id", np.int64),
+        ("position", np.int64),
+        ("cash", np.float64),
+    ]
+)
+
+
+class BacktestResult(NamedTuple):
+    """Strategy fills and final position, cash and PnL marked to the last
+    mid (or last trade price when a side is empty)."""
+
+    fills: np.ndarray
+    position: int
+    cash: float
+    pnl: float
+    events: int
+
+
+class Latency:
+    """Order entry latency of ``base`` plus exponentially distributed
+    ``jitter`` on average, in event timestamp units. Random draws are made
+    in blocks to keep the per-order cost down."""
+
+    __slots__ = "base", "jitter", "block", "_rng", "_draws", "_pos"
+
+    def __init__(self, base=0, jitter=0, seed=0, block=4096):
+        self.base = base
+        self.jitter = jitter
+        self.block = block
+        self._rng = np.random.default_rng(seed)
+        self._draws = []
+        self._pos = 0
+
+    def __call__(self, ts):
+        if not self.jitter:
+            return self.base
+        if self._pos == len(self._draws):
+            draws = self._rng.exponential(self.jitter, self.block)
+            self._draws = draws.astype(np.int64).tolist()
+            self._pos = 0
+        delay = self._draws[self._pos]
+        self._pos += 1
+        return self.base + delay
+
+
+class Strategy:
+    """Base class for backtest strategies; override the callbacks needed.
+
+    ``on_events`` receives each processed chunk of market events with the
+    ``Fills`` it produced, and ``on_fills`` the strategy's own fills as
+    ``OWN_FILL_DTYPE`` rows.
+    """
+
+    def on_start(self, ctx):
+        pass
+
+    def on_events(self, ctx, events, fills):
+        pass
+
+    def on_fills(self, ctx, fills):
+        pass
+
+    def on_finish(self, ctx):
+        pass
+
+
+class Context:
+    """The strategy's handle on a running backtest.
+
+    ``book`` is the simulated book, ``now`` the timestamp of the last
+    processed event, and ``position`` and ``cash`` the strategy's running
+    totals.
+    """
+
+    __slots__ = "book", "now", "position", "cash", "_latency", "_pending", "_seq"
+
+    def __init__(self, book, latency):
+        self.book = book
+        self.now = 0
+        self.position = 0
+        self.cash = 0.0
+        self._latency = latency
+        self._pending = []
+        self._seq = 0
+
+    def _submit(self, kind, order_id, side, price, size):
+        self._seq += 1
+        arrival = self.now + self._latency(self.now)
+        row = (order_id, kind, side, price, size, arrival)
+        heapq.heappush(self._pending, (arrival, self._seq, row))
+
+    def _new_id(self):
+        return -(self._seq + 1)
+
+    def buy(self, size, price=None):
+        """Submit a buy order, a market order without ``price``; returns
+        its order id."""
+        return self._order(Side.BUY, size, price)
+
+    def sell(self, size, price=None):
+        return self._order(Side.SELL, size, price)
+
+    def _order(self, side, size, price):
+        order_id = self._new_id()
+        if price is None:
+            self._submit(OrderType.MARKET, order_id, side.value, 0.0, size)
+        else:
+            self._submit(OrderType.LIMIT, order_id, side.value, price, size)
+        return order_id
+
+    def cancel(self, order_id):
+        self._submit(OrderType.CANCEL, order_id, 0, 0.0, 0)
+
+    def modify(self, order_id, size, price=None):
+        price = float("nan") if price is None else price
+        self._submit(OrderType.MODIFY, order_id, 0, price, size)
+
+    def _due(self, until):
+        """Pop the pending orders arriving before ``until`` as an
+        ``ORDER_DTYPE`` array."""
+        pending, rows = self._pending, []
+        while pending and pending[0][0] < until:
+            rows.append(heapq.heappop(pending)[2])
+        return np.array(rows, dtype=ORDER_DTYPE)
+
+    def _next_arrival(self):
+        return self._pending[0][0] if self._pending else None
+
+
+def _own_fills(fills):
+    """The strategy's fills among ``fills`` as ``OWN_FILL_DTYPE`` rows, with
+    ``position`` and ``cash`` holding the per-fill changes. A trade between
+    two strategy orders gives one row for each, which net out."""
+    taker = np.flatnonzero(fills.order_id < 0)
+    maker = np.flatnonzero(fills.book_order_id < 0)
+    if not len(taker) and not len(maker):
+        return None
+    own = np.concatenate((taker, maker))
+    order = np.argsort(own, kind="stable")
+    own = own[order]
+    aggressor = order < len(taker)
+    # Resting strategy orders trade on the side opposite the aggressor.
+    side = np.where(aggressor, fills.side[own], 1 - fills.side[own])
+    rows = np.empty(len(side), dtype=OWN_FILL_DTYPE)
+    rows["ts"] = fills.ts[own]
+    rows["side"] = side
+    rows["price"] = fills.price[own]
+    rows["size"] = fills.size[own]
+    rows["order_id"] = np.where(
+        aggressor, fills.order_id[own], fills.book_order_id[own]
+    )
+    signed = np.where(side == Side.BUY.value, rows["size"], -rows["size"])
+    rows["position"] = signed
+    rows["cash"] = -signed * rows["price"]
+    return rows
+
+
+class Backtest:
+    """Replays ``events`` (an ``ORDER_DTYPE`` array or a file written by
+    ``write_events``) into a fresh book from ``book_factory`` and drives
+    ``strategy``.
+
+    ``latency`` is a constant delay or a callable ``latency(ts)`` such as
+    ``Latency``. Market events are processed in chunks of up to
+    ``batch_size``, cut at the arrival time of the next strategy order;
+    strategy orders arrive after every market event with the same or an
+    earlier timestamp.
+    """
+
+    def __init__(
+        self, strategy, events, book_factory=OrderBook, latency=0, batch_size=1 << 14
+    ):
+        if isinstance(events, (str, bytes)) or hasattr(events, "__fspath__"):
+            events = open_events(events)
+        self.strategy = strategy
+        self.events = events
+        self.book = book_factory()
+        if not callable(latency):
+            delay = latency
+            latency = lambda ts: delay
+        self.ctx = Context(self.book, latency)
+        self.batch_size = batch_size
+        self._fills = []
+
+    def _record(self, fills):
+        own = _own_fills(fills)
+        if own is None:
+            return
+        ctx = self.ctx
+        position = np.cumsum(own["position"]) + ctx.position
+        cash = np.cumsum(own["cash"]) + ctx.cash
+        own["position"] = position
+        own["cash"] = cash
+        ctx.position = int(position[-1])
+        ctx.cash = float(cash[-1])
+        self._fills.append(own)
+        self.strategy.on_fills(ctx, own)
+
+    def _strategy_orders(self, until):
+        due = self.ctx._due(until)
+        if len(due):
+            self.ctx.now = max(self.ctx.now, int(due["ts"][-1]))
+            self._record(self.book.process_orders(due))
+
+    def run(self):
+        """Run the backtest to the end of the events and return the
+        ``BacktestResult``."""
+        ctx, book, strategy = self.ctx, self.book, self.strategy
+        strategy.on_start(ctx)
+        events = self.events
+        for start in range(0, len(events), self.batch_size):
+            batch = np.asarray(events[start : start + self.batch_size])
+            ts, n, pos = batch["ts"], len(batch), 0
+            while pos < n:
+                arrival = ctx._next_arrival()
+                cut = (
+                    n if arrival is None else int(np.searchsorted(ts, arrival, "right"))
+                )
+                if cut > pos:
+                    chunk = batch[pos:cut]
+                    ctx.now = int(ts[cut - 1])
+                    fills = book.process_orders(chunk)
+                    self._record(fills)
+                    strategy.on_events(ctx, chunk, fills)
+                    pos = cut
+                if pos < n:
+                    self._strategy_orders(ts[pos])
+        self._strategy_orders(float("inf"))
+        strategy.on_finish(ctx)
+        return self.result()
+
+    def result(self):
+        fills = (
+            np.concatenate(self._fills)
+            if self._fills
+            else np.empty(0, dtype=OWN_FILL_DTYPE)
+        )
+        bid_price, _, ask_price, _ = self.book.bbo()
+        mark = (bid_price + ask_price) / 2
+        if mark != mark:
+            mark = self.book.last_price or 0.0
+        ctx = self.ctx
+        return BacktestResult(
+            fills=fills,
+            position=ctx.position,
+            cash=ctx.cash,
+            pnl=ctx.cash + ctx.position * mark,
+            events=len(self.events),
+        )
+
+
+def backtest(strategy, events, **kwargs):
+    """Run ``Backtest(strategy, events, **kwargs)`` and return its result."""
+    return Backtest(strategy, events, **kwargs).run()
+
+
+def _run_one(args):
+    strategy_factory, params, events, kwargs = args
+    return backtest(strategy_factory(**params), events, **kwargs)
+
+
+def run_parallel(strategy_factory, param_sets, events, processes=None, **kwargs):
+    """Backtest ``strategy_factory(**params)`` for every dict in
+    ``param_sets`` in a pool of worker processes and return the results in
+    order.
+
+    Pass ``events`` as a file path so each worker memory-maps it instead of
+    receiving a pickled copy; ``strategy_factory`` and ``kwargs`` must be
+    picklable.
+    """
+    jobs = [(strategy_factory, params, events, kwargs) for params in param_sets]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_run_one, jobs)
@@ -0,0 +1,69 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from quant_research.order_research.order import (
+    CancelOrder,
+    LimitOrder,
+    MarketOrder,
+    ModifyOrder,
+    OrderType,
+    Side,
+)
+
+# One row per order message; ``type`` holds an ``OrderType`` and ``side`` a
+# ``Side`` value. ``price`` is ignored for market orders, ``side`` for
+# modifies (where a NaN price keeps the current one), ``side``, ``price`` and
+# ``size`` for cancels, and trade rows are informational only.
+ORDER_DTYPE = np.dtype(
+    [
+        ("order_id", np.int64),
+        ("type", np.uint8),
+        ("side", np.uint8),
+        ("price", np.float64),
+        ("size", np.int64),
+        ("ts", np.int64),
+    ]
+)
+
+# One row per resting order, as written by ``OrderBook.dump_orders``.
+RESTING_DTYPE = np.dtype(
+    [
+        ("order_id", np.int64),
+        ("side", np.uint8),
+        ("price", np.float64),
+        ("size", np.int64),
+        ("remaining", np.int64),
+        ("ts", np.int64),
+    ]
+)
+
+
+class Fills(NamedTuple):
+    """Columnar fills, one element per trade."""
+
+    ts: np.ndarray
+    side: np.ndarray
+    price: np.ndarray
+    size: np.ndarray
+    order_id: np.ndarray
+    book_order_id: np.ndarray
+    seq: np.ndarray
+
+
+def to_orders(batch):
+    """Build ``Order`` objects from ``ORDER_DTYPE`` rows, skipping trades."""
+    orders = []
+    for order_id, kind, side, price, size, ts in batch.tolist():
+        if kind == OrderType.LIMIT:
+            orders.append(LimitOrder(order_id, Side(side), size, price, ts))
+        elif kind == OrderType.MARKET:
+            orders.append(MarketOrder(order_id, Side(side), size, ts))
+        elif kind == OrderType.CANCEL:
+            orders.append(CancelOrder(order_id, ts))
+        elif kind == OrderType.MODIFY:
+            price = price if price == price else None
+            orders.append(ModifyOrder(order_id, size, price, ts))
+        elif kind != OrderType.TRADE:
+            raise ValueError(f"unknown order type {kind}")
+    return orders
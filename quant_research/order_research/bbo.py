@@ -0,0 +1,168 @@
+"""Top-of-book publication through shared memory.
+
+One process owns a ``BBOPublisher`` and writes a fixed-size record per
+symbol into a ``multiprocessing.shared_memory`` segment; any number of
+``BBOReader`` processes on the host attach to it by name and read records
+straight from the mapped memory, with no system calls or serialisation.
+
+Each record is guarded by a seqlock: the writer makes the record's version
+odd before changing it and even again afterwards, and a reader retries
+until it sees the same even version before and after copying the fields.
+
+Segment layout, in 8-byte words::
+
+    header   MAGIC, capacity, symbol count, 5 unused
+    names    capacity * NAME_BYTES of NUL-padded UTF-8
+    records  capacity * 8 words: version, bid price, bid size, ask price,
+             ask size, ts, 2 unused (one 64-byte cache line per symbol)
+"""
+
+from typing import NamedTuple
+
+from quant_research.order_research import clock, shm as segments
+
+MAGIC = 0x42424F31  # "BBO1"
+NAME_BYTES = 32
+HEADER_WORDS = 8
+RECORD_WORDS = 8
+
+
+class BBO(NamedTuple):
+    """A consistent top-of-book record; ``version`` counts updates."""
+
+    bid_price: float
+    bid_size: int
+    ask_price: float
+    ask_size: int
+    ts: int
+    version: int
+
+
+def _segment_size(capacity):
+    return 8 * (HEADER_WORDS + RECORD_WORDS * capacity) + NAME_BYTES * capacity
+
+
+class _Segment:
+    """Word views over a BBO segment."""
+
+    __slots__ = "shm", "capacity", "_q", "_d", "_records", "_index"
+
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        self.capacity = capacity
+        # Integer and float views of the same words.
+        self._q = shm.buf.cast("q")
+        self._d = shm.buf.cast("d")
+        self._records = HEADER_WORDS + NAME_BYTES * capacity // 8
+        self._index = {}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def symbols(self):
+        return list(self._index)
+
+    def _name_offset(self, index):
+        return 8 * HEADER_WORDS + NAME_BYTES * index
+
+    def close(self):
+        self._q.release()
+        self._d.release()
+        self.shm.close()
+
+
+class BBOPublisher(_Segment):
+    """Creates a segment for up to ``capacity`` symbols and writes their
+    top of book. Only one process may publish to a segment."""
+
+    __slots__ = ()
+
+    def __init__(self, name=None, capacity=1024):
+        super().__init__(segments.create(name, _segment_size(capacity)), capacity)
+        self._q[1] = capacity
+        self._q[2] = 0
+        self._q[0] = MAGIC
+
+    def register(self, symbol):
+        """Index of the record for ``symbol``, adding it if needed."""
+        index = self._index.get(symbol)
+        if index is not None:
+            return index
+        index = len(self._index)
+        if index == self.capacity:
+            raise ValueError(f"segment is full ({self.capacity} symbols)")
+        encoded = symbol.encode()
+        if len(encoded) > NAME_BYTES:
+            raise ValueError(f"symbol {symbol!r} is longer than {NAME_BYTES} bytes")
+        offset = self._name_offset(index)
+        self.shm.buf[offset : offset + len(encoded)] = encoded
+        self._index[symbol] = index
+        # Publish the count last so readers never see a half-written name.
+        self._q[2] = index + 1
+        return index
+
+    def update(self, symbol, bid_price, bid_size, ask_price, ask_size, ts=None):
+        q, d = self._q, self._d
+        base = self._records + RECORD_WORDS * self.register(symbol)
+        version = q[base] + 1
+        q[base] = version
+        d[base + 1] = bid_price
+        q[base + 2] = bid_size
+        d[base + 3] = ask_price
+        q[base + 4] = ask_size
+        q[base + 5] = clock.now() if ts is None else ts
+        q[base] = version + 1
+
+    def publish(self, symbol, book, ts=None):
+        """Write the current ``bbo()`` of ``book`` as the record of
+        ``symbol``."""
+        self.update(symbol, *book.bbo(), ts)
+
+    def unlink(self):
+        segments.unlink(self.shm)
+
+
+class BBOReader(_Segment):
+    """Attaches to a publisher's segment by ``name`` and reads records."""
+
+    __slots__ = ()
+
+    def __init__(self, name):
+        shm = segments.attach(name)
+        q = shm.buf.cast("q")
+        magic, capacity = q[0], q[1]
+        q.release()
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"{name!r} is not a BBO segment")
+        super().__init__(shm, capacity)
+        self.refresh()
+
+    def refresh(self):
+        """Pick up symbols registered since the last call."""
+        buf = self.shm.buf
+        for index in range(len(self._index), self._q[2]):
+            offset = self._name_offset(index)
+            name = bytes(buf[offset : offset + NAME_BYTES]).rstrip(b"\0")
+            self._index[name.decode()] = index
+
+    def read(self, symbol, retries=1_000_000):
+        """Consistent ``BBO`` of ``symbol``, or None if it has never been
+        published."""
+        index = self._index.get(symbol)
+        if index is None:
+            self.refresh()
+            index = self._index.get(symbol)
+            if index is None:
+                return None
+        q, d = self._q, self._d
+        base = self._records + RECORD_WORDS * index
+        for _ in range(retries):
+            version = q[base]
+            if version & 1:
+                continue
+            record = d[base + 1], q[base + 2], d[base + 3], q[base + 4], q[base + 5]
+            if q[base] == version:
+                return BBO(*record, version >> 1)
+        raise TimeoutError(f"record of {symbol!r} stayed locked by the writer")
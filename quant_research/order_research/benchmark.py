@@ -0,0 +1,236 @@
+"""Latency and throughput benchmarks for the order book implementations.
+
+Run ``python -m quant_research.order_research.benchmark --out results.json``
+to benchmark every workload profile against every book and write the results
+as JSON.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from time import perf_counter, perf_counter_ns
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE, to_orders
+from quant_research.order_research.compact import CompactOrderBook
+from quant_research.order_research.flow import order_flow
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.pool import LimitOrderPool
+
+MID = 1000
+MIN_PRICE, MAX_PRICE = 0, 2 * MID
+PERCENTILES = (50, 90, 99, 99.9)
+
+BOOKS = {
+    "sorted": OrderBook,
+    "pooled": lambda: OrderBook(pool=LimitOrderPool()),
+    "ladder": lambda: LadderOrderBook(1, MIN_PRICE, MAX_PRICE),
+    "compact": lambda: CompactOrderBook(1, MIN_PRICE, MAX_PRICE),
+}
+
+
+def _orders(n, start=0):
+    orders = np.zeros(n, dtype=ORDER_DTYPE)
+    orders["order_id"] = np.arange(start, start + n)
+    orders["ts"] = np.arange(start, start + n)
+    return orders
+
+
+def _passive(rng, n, max_distance):
+    """Non-crossing limit orders up to ``max_distance`` ticks away from a
+    fixed mid."""
+    return order_flow(
+        n,
+        rng,
+        mid=MID,
+        max_distance=max_distance,
+        volatility=0,
+        market_share=0,
+        cancel_to_trade=0,
+    )
+
+
+def deep_passive(rng, n):
+    """Passive limit orders building a deep book; nothing ever crosses."""
+    return _orders(0), _passive(rng, n, 500)
+
+
+def cancel_heavy(rng, n):
+    """Market making near the touch: nearly every add is cancelled or
+    amended shortly after, and cancels make up about half of the flow."""
+    setup = _passive(rng, 2000, 50)
+    orders = order_flow(
+        n,
+        rng,
+        mid=MID,
+        max_distance=5,
+        market_share=0.02,
+        cancel_to_trade=45,
+        amend_share=0.15,
+        start_id=len(setup),
+    )
+    return setup, orders
+
+
+def aggressive_sweeps(rng, n):
+    """A deep book hit by market orders large enough to sweep several
+    levels, with passive flow replenishing it."""
+    setup = _passive(rng, 20000, 100)
+    orders = order_flow(
+        n,
+        rng,
+        mid=MID,
+        max_distance=100,
+        market_share=0.1,
+        market_size=2000,
+        cancel_to_trade=2,
+        start_id=len(setup),
+    )
+    return setup, orders
+
+
+def crossing_auction(rng, n):
+    """Limit orders priced on both sides of the mid so most of them cross."""
+    orders = order_flow(
+        n,
+        rng,
+        mid=MID,
+        max_distance=10,
+        volatility=0,
+        market_share=0,
+        marketable=0.5,
+        cancel_to_trade=0,
+    )
+    return _orders(0), orders
+
+
+def hawkes_flow(rng, n):
+    """The default synthetic flow with bursty Hawkes arrivals: power-law
+    prices around a drifting mid and about 20 cancels per market order."""
+    setup = _passive(rng, 5000, 100)
+    orders = order_flow(n, rng, mid=MID, branching=0.8, start_id=len(setup))
+    return setup, orders
+
+
+PROFILES = {
+    "deep_passive": deep_passive,
+    "cancel_heavy": cancel_heavy,
+    "aggressive_sweeps": aggressive_sweeps,
+    "crossing_auction": crossing_auction,
+    "hawkes_flow": hawkes_flow,
+}
+
+
+def latency_summary(latency_ns):
+    """Percentiles and a log2-bucketed histogram of per-operation latency."""
+    buckets = np.bincount(np.log2(np.maximum(latency_ns, 1)).astype(int))
+    return {
+        "mean": float(latency_ns.mean()),
+        "max": int(latency_ns.max()),
+        **{
+            f"p{p:g}": float(v)
+            for p, v in zip(PERCENTILES, np.percentile(latency_ns, PERCENTILES))
+        },
+        "histogram": {
+            f"<{2 ** (i + 1)}": int(c) for i, c in enumerate(buckets.tolist()) if c
+        },
+    }
+
+
+def run(profile, book="sorted", n=100_000, seed=0):
+    """Benchmark one workload profile against one book and return a dict of
+    results.
+
+    Latency is timed per ``process_order`` call, throughput over a single
+    ``process_orders`` call on a fresh book. ``container_allocs_per_order``
+    estimates GC-tracked allocations from generation-0 collections,
+    ``retained_blocks_per_order`` counts memory blocks still alive after
+    the run, and ``peak_memory_kb`` is the peak of Python allocations while
+    a fresh book processes the setup and the workload, traced in a run of
+    its own.
+    """
+    setup, workload = PROFILES[profile](np.random.default_rng(seed), n)
+    orders = to_orders(workload)
+
+    ob = BOOKS[book]()
+    ob.process_orders(setup)
+    process_order = ob.process_order
+    latency = np.empty(len(orders), np.int64)
+    view = memoryview(latency)
+    collections = gc.get_stats()[0]["collections"]
+    blocks = sys.getallocatedblocks()
+    for i, order in enumerate(orders):
+        start = perf_counter_ns()
+        process_order(order)
+        view[i] = perf_counter_ns() - start
+    blocks = sys.getallocatedblocks() - blocks
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    ob = BOOKS[book]()
+    ob.process_orders(setup)
+    start = perf_counter()
+    ob.process_orders(workload)
+    elapsed = perf_counter() - start
+    trades, resting = ob.trades.count, len(ob)
+    del ob
+
+    tracemalloc.start()
+    try:
+        ob = BOOKS[book]()
+        ob.process_orders(setup)
+        ob.process_orders(workload)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "profile": profile,
+        "book": book,
+        "orders": len(workload),
+        "seed": seed,
+        "orders_per_second": len(workload) / elapsed,
+        "latency_ns": latency_summary(latency),
+        "trades": trades,
+        "resting_orders": resting,
+        "peak_memory_kb": peak / 1024,
+        "container_allocs_per_order": collections * gc.get_threshold()[0] / n,
+        "retained_blocks_per_order": blocks / n,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=PROFILES, action="append")
+    parser.add_argument("--book", choices=BOOKS, action="append")
+    parser.add_argument("-n", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON output file; stdout by default")
+    args = parser.parse_args(argv)
+
+    results = []
+    for profile in args.profile or PROFILES:
+        for book in args.book or BOOKS:
+            result = run(profile, book, args.n, args.seed)
+            latency = result["latency_ns"]
+            print(
+                f"{profile:18} {book:8} {result['orders_per_second']:>10.0f}/s "
+                f"p50 {latency['p50']:>7.0f}ns p99 {latency['p99']:>7.0f}ns "
+                f"p99.9 {latency['p99.9']:>7.0f}ns",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
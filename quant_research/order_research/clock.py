@@ -0,0 +1,57 @@
+"""Timestamp source for orders and trades created without a ``ts``.
+
+By default ``now`` is wall-clock time in microseconds. ``set_clock``
+replaces it process-wide with any callable returning an int, such as
+``time.time_ns``, a ``SequenceClock`` for reproducible runs or a
+``BatchClock`` that stamps everything with the timestamp of the batch being
+processed.
+"""
+
+from time import time
+
+
+def wall_clock():
+    """Wall-clock time in integer microseconds."""
+    return int(1e6 * time())
+
+
+class SequenceClock:
+    """Returns ``start``, ``start + 1``, ... on successive calls."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, start=0):
+        self.value = start - 1
+
+    def __call__(self):
+        self.value += 1
+        return self.value
+
+
+class BatchClock:
+    """Returns the last timestamp passed to ``set``."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value=0):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+_clock = wall_clock
+
+
+def now():
+    return _clock()
+
+
+def set_clock(clock):
+    """Make ``clock`` the timestamp source and return the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
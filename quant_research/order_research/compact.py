@@ -0,0 +1,380 @@
+from functools import singledispatchmethod
+
+import numpy as np
+
+from quant_research.order_research.order import (
+    CancelOrder,
+    LimitOrder,
+    MarketOrder,
+    ModifyOrder,
+    OrderType,
+    Side,
+    TimeInForce,
+)
+from quant_research.order_research.level import Depth
+from quant_research.order_research.order_store import NIL, OrderStore
+from quant_research.order_research.trade_log import TradeLog
+
+NAN = float("nan")
+
+LEVEL_COLUMNS = (
+    ("head", np.int32),
+    ("tail", np.int32),
+    ("size", np.int64),
+    ("count", np.int64),
+)
+
+
+class CompactOrderBook:
+    """Tick-ladder order book whose resting orders live in an ``OrderStore``.
+
+    Resting orders are integer slots rather than ``LimitOrder`` objects, and
+    price levels are rows of preallocated arrays indexed by
+    ``side * n_ticks + tick``. Orders passed to ``process_order`` are copied
+    into the store, so the submitted objects are not updated by later fills;
+    ``get_best_bid``/``get_best_ask`` build a ``LimitOrder`` on demand.
+    """
+
+    __slots__ = (
+        "tick_size",
+        "min_price",
+        "n_ticks",
+        "store",
+        "trades",
+        "levels",
+        "_slots",
+        "_best",
+        "_inv",
+    ) + tuple(name for name, _ in LEVEL_COLUMNS)
+
+    def __init__(self, tick_size, min_price, max_price, capacity=1024):
+        if tick_size <= 0:
+            raise ValueError("tick_size must be positive")
+        if max_price < min_price:
+            raise ValueError("max_price must not be below min_price")
+        self.tick_size = tick_size
+        self.min_price = min_price
+        self.n_ticks = round((max_price - min_price) / tick_size) + 1
+        self.store = OrderStore(capacity)
+        self.trades = TradeLog()
+        self.levels = {
+            name: np.full(
+                2 * self.n_ticks, NIL if name in ("head", "tail") else 0, dtype
+            )
+            for name, dtype in LEVEL_COLUMNS
+        }
+        self._bind()
+        self._slots = {}
+        self._best = [NIL, NIL]
+        self._inv = 1 / tick_size
+
+    def _bind(self):
+        for name, _ in LEVEL_COLUMNS:
+            setattr(self, name, memoryview(self.levels[name]))
+
+    def tick(self, price):
+        """Return the tick index of ``price``."""
+        offset = (price - self.min_price) * self._inv
+        idx = round(offset)
+        if abs(offset - idx) > 1e-6:
+            raise ValueError(f"price {price} is not on the {self.tick_size} tick grid")
+        if not 0 <= idx < self.n_ticks:
+            raise ValueError(f"price {price} is outside the ladder band")
+        return idx
+
+    def price(self, tick):
+        return self.min_price + tick * self.tick_size
+
+    @singledispatchmethod
+    def process_order(self, order):
+        raise NotImplementedError
+
+    @process_order.register
+    def _(self, order: MarketOrder):
+        # Market orders are immediate-or-cancel: any unfilled size is dropped.
+        order.remaining = self._match(
+            order.side.value, None, order.remaining, order.order_id, order.ts
+        )
+
+    @process_order.register
+    def _(self, order: LimitOrder):
+        tick = self.tick(order.price)
+        side = order.side.value
+        if (
+            order.tif is TimeInForce.FOK
+            and self.fillable_size(order.side, order.price) < order.remaining
+        ):
+            return
+        order.remaining = self._match(
+            side, tick, order.remaining, order.order_id, order.ts
+        )
+        if order.remaining > 0 and order.tif is TimeInForce.GTC:
+            self._rest(
+                order.order_id, side, tick, order.size, order.remaining, order.ts
+            )
+
+    @process_order.register
+    def _(self, order: CancelOrder):
+        self._cancel(order.order_id)
+
+    @process_order.register
+    def _(self, order: ModifyOrder):
+        tick = None if order.price is None else self.tick(order.price)
+        self._modify(order.order_id, tick, order.size, order.ts)
+
+    def process_orders(self, batch):
+        """Process a structured array of ``ORDER_DTYPE`` rows in order and
+        return the resulting ``Fills``; see ``OrderBook.process_orders``."""
+        start = self.trades.count
+        limit, market, cancel = OrderType.LIMIT, OrderType.MARKET, OrderType.CANCEL
+        modify, trade = OrderType.MODIFY, OrderType.TRADE
+        for order_id, kind, side, price, size, ts in zip(
+            batch["order_id"].tolist(),
+            batch["type"].tolist(),
+            batch["side"].tolist(),
+            batch["price"].tolist(),
+            batch["size"].tolist(),
+            batch["ts"].tolist(),
+        ):
+            if kind == limit:
+                self._add_limit(order_id, side, self.tick(price), size, ts)
+            elif kind == market:
+                self._match(side, None, size, order_id, ts)
+            elif kind == cancel:
+                self._cancel(order_id)
+            elif kind == modify:
+                tick = self.tick(price) if price == price else None
+                self._modify(order_id, tick, size, ts)
+            elif kind != trade:
+                raise ValueError(f"unknown order type {kind}")
+        return self.trades.fills(start)
+
+    def _add_limit(self, order_id, side, tick, size, ts):
+        remaining = self._match(side, tick, size, order_id, ts)
+        if remaining > 0:
+            self._rest(order_id, side, tick, size, remaining, ts)
+
+    def _modify(self, order_id, tick, size, ts):
+        """Amend a resting order; see ``OrderBook._modify``."""
+        slot = self._slots.get(order_id)
+        if slot is None:
+            return
+        store = self.store
+        side = store.side[slot]
+        if size <= 0 or (tick is not None and tick != store.tick[slot]):
+            self._cancel(order_id)
+            if size > 0:
+                self._add_limit(order_id, side, tick, size, ts)
+            return
+        tick = store.tick[slot]
+        delta = size - store.remaining[slot]
+        if delta < 0:
+            store.size[slot] += delta
+            store.remaining[slot] = size
+            self.size[side * self.n_ticks + tick] += delta
+        elif delta > 0:
+            total = store.size[slot] + delta
+            self._cancel(order_id)
+            self._rest(order_id, side, tick, total, size, ts)
+
+    def _rest(self, order_id, side, tick, size, remaining, ts):
+        store = self.store
+        slot = store.alloc(order_id, side, tick, size, remaining, ts)
+        level = side * self.n_ticks + tick
+        tail = self.tail[level]
+        if tail == NIL:
+            self.head[level] = slot
+        else:
+            store.next[tail] = slot
+            store.prev[slot] = tail
+        self.tail[level] = slot
+        self.size[level] += remaining
+        self.count[level] += 1
+        self._slots[order_id] = slot
+
+        best = self._best[side]
+        if best == NIL or (tick > best if side == 0 else tick < best):
+            self._best[side] = tick
+
+    def _cancel(self, order_id):
+        slot = self._slots.pop(order_id, None)
+        if slot is None:
+            return
+        store = self.store
+        side = store.side[slot]
+        tick = store.tick[slot]
+        level = side * self.n_ticks + tick
+        prev, next_ = store.prev[slot], store.next[slot]
+        if prev == NIL:
+            self.head[level] = next_
+        else:
+            store.next[prev] = next_
+        if next_ == NIL:
+            self.tail[level] = prev
+        else:
+            store.prev[next_] = prev
+        self.size[level] -= store.remaining[slot]
+        self.count[level] -= 1
+        store.release(slot)
+        if self.count[level] == 0 and tick == self._best[side]:
+            self._best[side] = self._next_best(side, tick)
+
+    def _next_best(self, side, tick):
+        """Best non-empty tick of ``side`` strictly worse than ``tick``."""
+        count, offset = self.count, side * self.n_ticks
+        if side == 0:
+            ticks = range(tick - 1, -1, -1)
+        else:
+            ticks = range(tick + 1, self.n_ticks)
+        for i in ticks:
+            if count[offset + i]:
+                return i
+        return NIL
+
+    def _match(self, side, limit, remaining, order_id, ts):
+        """Fill ``remaining`` against the opposite side up to tick ``limit``
+        (``None`` for no limit) and return the unfilled size."""
+        opposite = 1 - side
+        offset = opposite * self.n_ticks
+        store, trades = self.store, self.trades
+        head, size, count = self.head, self.size, self.count
+        best = self._best[opposite]
+
+        while remaining > 0 and best != NIL:
+            if limit is not None and (best > limit if side == 0 else best < limit):
+                break
+            level = offset + best
+            price = self.price(best)
+            slot = head[level]
+            while remaining > 0 and slot != NIL:
+                fill = min(remaining, store.remaining[slot])
+                remaining -= fill
+                store.remaining[slot] -= fill
+                size[level] -= fill
+                trades.append(ts, side, price, fill, order_id, store.order_id[slot])
+                if store.remaining[slot] == 0:
+                    next_ = store.next[slot]
+                    del self._slots[store.order_id[slot]]
+                    store.release(slot)
+                    count[level] -= 1
+                    slot = next_
+            head[level] = slot
+            if slot == NIL:
+                self.tail[level] = NIL
+                best = self._next_best(opposite, best)
+            else:
+                store.prev[slot] = NIL
+
+        self._best[opposite] = best
+        return remaining
+
+    def _opposite_sizes(self, side: Side, price):
+        """Level sizes an incoming ``side`` order can reach at ``price`` or
+        better, best first."""
+        opposite = 1 - side.value
+        best = self._best[opposite]
+        if best == NIL:
+            return self.levels["size"][:0]
+        sizes = self.levels["size"][
+            opposite * self.n_ticks : (opposite + 1) * self.n_ticks
+        ]
+        if side is Side.BUY:
+            last = self.n_ticks - 1 if price is None else self.tick(price)
+            return sizes[best : last + 1]
+        last = 0 if price is None else self.tick(price)
+        return sizes[last : best + 1][::-1]
+
+    def fillable_size(self, side: Side, price=None):
+        """Size an incoming ``side`` order could fill immediately at
+        ``price`` or better; see ``OrderBook.fillable_size``."""
+        return int(self._opposite_sizes(side, price).sum())
+
+    def sweep_cost(self, side: Side, size):
+        """Size filled and notional paid by an incoming ``side`` market
+        order of ``size``; see ``OrderBook.sweep_cost``."""
+        sizes = self._opposite_sizes(side, None)
+        taken = np.minimum(sizes, np.maximum(size - (np.cumsum(sizes) - sizes), 0))
+        best = self._best[1 - side.value]
+        step = 1 if side is Side.BUY else -1
+        prices = self.price(best + step * np.arange(len(sizes)))
+        return int(taken.sum()), (taken * prices).sum().item()
+
+    def _order(self, slot):
+        store = self.store
+        order = LimitOrder(
+            store.order_id[slot],
+            Side(store.side[slot]),
+            store.size[slot],
+            self.price(store.tick[slot]),
+            store.ts[slot],
+        )
+        order.remaining = store.remaining[slot]
+        return order
+
+    def _best_order(self, side):
+        best = self._best[side]
+        if best == NIL:
+            return 0
+        return self._order(self.head[side * self.n_ticks + best])
+
+    def bbo(self):
+        """Best bid and ask prices and level sizes; see ``OrderBook.bbo``."""
+        bid, ask = self._best
+        size, n = self.size, self.n_ticks
+        return (
+            self.price(bid) if bid != NIL else NAN,
+            size[bid] if bid != NIL else 0,
+            self.price(ask) if ask != NIL else NAN,
+            size[n + ask] if ask != NIL else 0,
+        )
+
+    def depth(self, n=10):
+        """Best ``n`` levels of each side as a ``Depth``; see
+        ``OrderBook.depth``."""
+        sides = []
+        for side in (0, 1):
+            best = self._best[side]
+            if best == NIL:
+                ticks = np.empty(0, np.int64)
+            else:
+                count = self.levels["count"][
+                    side * self.n_ticks : (side + 1) * self.n_ticks
+                ]
+                if side == 0:
+                    ticks = best - np.flatnonzero(count[best::-1])[:n]
+                else:
+                    ticks = best + np.flatnonzero(count[best:])[:n]
+            level = side * self.n_ticks + ticks
+            sides += [
+                self.price(ticks).astype(np.float64),
+                self.levels["size"][level],
+                self.levels["count"][level],
+            ]
+        return Depth(*sides)
+
+    def get_best_bid(self):
+        return self._best_order(Side.BUY.value)
+
+    def get_best_ask(self):
+        return self._best_order(Side.SELL.value)
+
+    def snapshot(self):
+        """Copy of the resting state as a dict of arrays."""
+        state = self.store.snapshot()
+        for name, array in self.levels.items():
+            state[f"level_{name}"] = array.copy()
+        state["best"] = np.array(self._best)
+        return state
+
+    def restore(self, state):
+        """Load the resting state produced by ``snapshot``."""
+        self.store.restore(state)
+        self.levels = {name: state[f"level_{name}"].copy() for name, _ in LEVEL_COLUMNS}
+        self._bind()
+        self._best = state["best"].tolist()
+        arrays = self.store.arrays
+        live = self.store.live()
+        self._slots = dict(zip(arrays["order_id"][live].tolist(), live.tolist()))
+
+    def __len__(self):
+        return len(self._slots)
@@ -0,0 +1,107 @@
+from quant_research.order_research.order import Side
+
+
+class FenwickTree:
+    """Binary indexed tree over ``n`` slots with O(log n) point updates and
+    prefix sums."""
+
+    __slots__ = "n", "tree", "_top"
+
+    def __init__(self, n):
+        self.n = n
+        self.tree = [0] * (n + 1)
+        self._top = 1 << n.bit_length()
+
+    def add(self, i, delta):
+        """Add ``delta`` to slot ``i``."""
+        tree, n = self.tree, self.n
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of slots ``[0, i)``."""
+        tree, total = self.tree, 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def total(self):
+        return self.prefix(self.n)
+
+    def search(self, target):
+        """Largest ``i`` with ``prefix(i) < target``, assuming non-negative
+        slots, together with ``prefix(i)``."""
+        tree, n = self.tree, self.n
+        pos, total, step = 0, 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and total + tree[nxt] < target:
+                pos = nxt
+                total += tree[nxt]
+            step >>= 1
+        return pos, total
+
+
+class DepthIndex:
+    """Cumulative size and notional per book side over a tick grid.
+
+    Each side keeps one ``FenwickTree`` of resting size and one of
+    ``size * tick`` per tick, ordered best price first, so "how much rests
+    at or better than P" and "what does taking Q cost" are O(log L) in the
+    number of ticks. Keeping notional in integer ticks avoids float drift
+    from the running updates.
+    """
+
+    __slots__ = "tick_size", "min_price", "n", "_inv", "_bids", "_asks"
+
+    def __init__(self, tick_size, min_price, max_price):
+        self.tick_size = tick_size
+        self.min_price = min_price
+        self.n = round((max_price - min_price) / tick_size) + 1
+        self._inv = 1 / tick_size
+        self._bids = FenwickTree(self.n), FenwickTree(self.n)
+        self._asks = FenwickTree(self.n), FenwickTree(self.n)
+
+    def _trees(self, side: Side):
+        return self._bids if side is Side.BUY else self._asks
+
+    def _tick(self, price):
+        return round((price - self.min_price) * self._inv)
+
+    def _slot(self, side: Side, tick):
+        """Position of ``tick`` on ``side``, counted from the best end."""
+        return self.n - 1 - tick if side is Side.BUY else tick
+
+    def _notional(self, size, ticks):
+        return self.min_price * size + self.tick_size * ticks
+
+    def add(self, side: Side, price, delta):
+        """Record a change of ``delta`` in the size resting at ``price`` on
+        book side ``side``."""
+        tick = self._tick(price)
+        slot = self._slot(side, tick)
+        sizes, ticks = self._trees(side)
+        sizes.add(slot, delta)
+        ticks.add(slot, delta * tick)
+
+    def size(self, side: Side, price=None):
+        """Size resting on ``side`` at ``price`` or better."""
+        sizes = self._trees(side)[0]
+        if price is None:
+            return sizes.total()
+        slot = self._slot(side, self._tick(price))
+        if slot < 0:
+            return 0
+        return sizes.prefix(min(slot + 1, self.n))
+
+    def sweep(self, side: Side, size):
+        """Size filled and notional paid for taking ``size`` from ``side``."""
+        sizes, ticks = self._trees(side)
+        slot, filled = sizes.search(size)
+        if slot >= self.n:
+            return filled, self._notional(filled, ticks.total())
+        tick = self._slot(side, slot)
+        return size, self._notional(size, ticks.prefix(slot) + (size - filled) * tick)
@@ -0,0 +1,164 @@
+"""Synthetic order flow for load tests and benchmarks.
+
+``order_flow`` draws a whole stream of ``ORDER_DTYPE`` events in one go:
+
+* New orders arrive as a Poisson process, or a self-exciting Hawkes process
+  when ``branching`` is set, with ``ts`` in nanoseconds.
+* Limit prices sit a power-law distributed number of ticks away from a mid
+  that follows a random walk, so most orders land near the touch and a few
+  far out.
+* Each limit order is cancelled, or amended down, after an exponentially
+  distributed lifetime with the probability that gives ``cancel_to_trade``
+  cancels and amendments per market order.
+
+The same ``seed`` always gives the same stream; passing ``symbol`` mixes the
+symbol into the seed so every symbol of a universe gets its own stream.
+"""
+
+import zlib
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType, Side
+
+
+def symbol_rng(symbol, seed=0):
+    """Random generator for ``symbol``; stable across runs, unlike
+    ``hash``."""
+    return np.random.default_rng([seed, zlib.crc32(symbol.encode())])
+
+
+def poisson_times(rng, n, rate):
+    """First ``n`` event times of a Poisson process with ``rate`` events per
+    second."""
+    return np.cumsum(rng.exponential(1 / rate, n))
+
+
+def hawkes_times(rng, n, rate, branching, decay):
+    """First ``n`` event times of a Hawkes process with baseline ``rate``
+    and an exponential kernel, where each event triggers ``branching`` more
+    on average, ``1 / decay`` seconds later on average.
+
+    Uses the cluster representation: Poisson immigrants, each event with a
+    Poisson number of children, one vectorised step per generation.
+    """
+    if not 0 <= branching < 1:
+        raise ValueError("branching must be in [0, 1) for a stationary process")
+    # Long enough for about 1.25 * n events; doubled until it holds n.
+    horizon = 1.25 * n * (1 - branching) / rate
+    while True:
+        generation = rng.uniform(0, horizon, rng.poisson(rate * horizon))
+        times = [generation]
+        while len(generation):
+            children = rng.poisson(branching, len(generation))
+            generation = np.repeat(generation, children)
+            generation += rng.exponential(1 / decay, len(generation))
+            generation = generation[generation < horizon]
+            times.append(generation)
+        times = np.concatenate(times)
+        if len(times) >= n:
+            # Every event before the horizon is present, so the first n are
+            # exact.
+            return np.sort(times)[:n]
+        horizon *= 2
+
+
+def power_law_ticks(rng, n, tail, max_distance):
+    """Distances of 1 to ``max_distance`` ticks with
+    ``P(d >= k) ~ k ** -tail``."""
+    distance = np.floor(rng.pareto(tail, n) + 1)
+    return np.minimum(distance, max_distance).astype(np.int64)
+
+
+def order_flow(
+    n,
+    seed=0,
+    symbol=None,
+    *,
+    mid=1000,
+    tick=1,
+    rate=100_000,
+    branching=0.0,
+    decay=10_000,
+    tail=1.5,
+    max_distance=500,
+    volatility=0.01,
+    market_share=0.03,
+    marketable=0.0,
+    cancel_to_trade=20,
+    amend_share=0.1,
+    lifetime=0.001,
+    size=50,
+    market_size=None,
+    start_id=0,
+):
+    """Generate ``n`` order events as an ``ORDER_DTYPE`` array sorted by
+    ``ts``.
+
+    ``seed`` is an int or a NumPy ``Generator``. ``rate`` is the baseline
+    rate of new orders per second; ``branching`` and ``decay`` make the
+    arrivals a Hawkes process. Limit prices are ``tail``-power-law
+    distributed up to ``max_distance`` ticks from the mid, which moves a tick
+    with probability ``volatility`` per new order. A ``marketable`` share of
+    limit orders is priced through the mid instead, and ``market_share`` of
+    new orders are market orders.
+
+    ``cancel_to_trade`` cancels (``amend_share`` of them amendments to a
+    smaller size) follow each market order on average, each a mean
+    ``lifetime`` seconds after the order it targets. Sizes are lognormal
+    with median ``size``, or ``market_size`` for market orders.
+    """
+    if symbol is not None:
+        rng = symbol_rng(symbol, seed)
+    else:
+        rng = np.random.default_rng(seed)
+    cancel_share = cancel_to_trade * market_share / max(1 - market_share, 1e-12)
+    if cancel_share > 1:
+        raise ValueError("cancel_to_trade is too high for market_share")
+
+    # Enough new orders for n events once the cancels that follow them are
+    # merged in, with headroom since the number of cancels is random.
+    m = int(1.1 * n / (1 + cancel_share * (1 - market_share))) + 64
+    if branching:
+        times = hawkes_times(rng, m, rate, branching, decay)
+    else:
+        times = poisson_times(rng, m, rate)
+    ts = (times * 1e9).astype(np.int64)
+
+    new = np.zeros(m, dtype=ORDER_DTYPE)
+    new["order_id"] = np.arange(start_id, start_id + m)
+    new["ts"] = ts
+    is_market = rng.random(m) < market_share
+    new["type"] = np.where(is_market, OrderType.MARKET, OrderType.LIMIT)
+    side = rng.integers(0, 2, m)
+    new["side"] = side
+    sizes = np.ceil(rng.lognormal(np.log(size), 1.0, m)).astype(np.int64)
+    if market_size is not None:
+        large = np.ceil(rng.lognormal(np.log(market_size), 1.0, m))
+        sizes = np.where(is_market, large.astype(np.int64), sizes)
+    new["size"] = sizes
+
+    steps = rng.choice(
+        [-1, 0, 1], m, p=[volatility / 2, 1 - volatility, volatility / 2]
+    )
+    path = mid + tick * np.cumsum(steps)
+    distance = power_law_ticks(rng, m, tail, max_distance)
+    distance = np.where(rng.random(m) < marketable, -distance, distance)
+    below = np.where(side == Side.BUY.value, -distance, distance)
+    new["price"] = np.where(is_market, 0.0, path + tick * below)
+
+    # Cancels and amendments of limit orders, each after its own lifetime.
+    cancelled = np.flatnonzero(~is_market & (rng.random(m) < cancel_share))
+    later = np.zeros(len(cancelled), dtype=ORDER_DTYPE)
+    later["order_id"] = new["order_id"][cancelled]
+    life = rng.exponential(lifetime, len(cancelled))
+    later["ts"] = ts[cancelled] + (life * 1e9).astype(np.int64) + 1
+    amend = rng.random(len(cancelled)) < amend_share
+    later["type"] = np.where(amend, OrderType.MODIFY, OrderType.CANCEL)
+    later["price"] = np.where(amend, np.nan, 0.0)
+    later["size"] = np.where(amend, rng.integers(1, sizes[cancelled] + 1), 0)
+
+    events = np.concatenate((new, later))
+    events = events[np.argsort(events["ts"], kind="stable")[:n]]
+    return events
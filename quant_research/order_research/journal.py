@@ -0,0 +1,200 @@
+import os
+import struct
+from functools import singledispatch
+from pathlib import Path
+
+import numpy as np
+
+from quant_research.order_research.order import (
+    CancelOrder,
+    IcebergOrder,
+    LimitOrder,
+    MarketOrder,
+    ModifyOrder,
+    OrderType,
+    TimeInForce,
+)
+from quant_research.order_research.replay import EVENT_DTYPE, replay
+
+JOURNAL_FILE = "journal.bin"
+SNAPSHOT_PATTERN = "snapshot_*.npy"
+
+# Matches the packed little-endian layout of ``EVENT_DTYPE``.
+_RECORD = struct.Struct("<qBBdqq")
+assert _RECORD.size == EVENT_DTYPE.itemsize
+
+
+@singledispatch
+def _record(order):
+    raise TypeError(f"cannot journal {type(order).__name__}")
+
+
+@_record.register
+def _(order: LimitOrder):
+    # Records have no time in force and replay as resting limit orders.
+    if order.tif is not TimeInForce.GTC:
+        raise ValueError(f"cannot journal {order.tif.name} limit orders")
+    return _RECORD.pack(
+        order.order_id,
+        OrderType.LIMIT,
+        order.side.value,
+        order.price,
+        order.size,
+        order.ts,
+    )
+
+
+@_record.register
+def _(order: IcebergOrder):
+    # Records and snapshots have no display size or reserve.
+    raise TypeError("cannot journal iceberg orders")
+
+
+@_record.register
+def _(order: MarketOrder):
+    return _RECORD.pack(
+        order.order_id, OrderType.MARKET, order.side.value, 0.0, order.size, order.ts
+    )
+
+
+@_record.register
+def _(order: CancelOrder):
+    return _RECORD.pack(order.order_id, OrderType.CANCEL, 0, 0.0, 0, order.ts)
+
+
+@_record.register
+def _(order: ModifyOrder):
+    price = float("nan") if order.price is None else order.price
+    return _RECORD.pack(
+        order.order_id, OrderType.MODIFY, 0, price, order.size, order.ts
+    )
+
+
+def _snapshot_seq(path):
+    return int(path.stem.split("_")[1])
+
+
+class JournaledOrderBook:
+    """Wraps an order book with a write-ahead journal and periodic snapshots.
+
+    Every event is appended to ``journal.bin`` in ``directory`` as an
+    ``EVENT_DTYPE`` record before the book applies it, and every
+    ``snapshot_every`` events the book's resting orders are saved to
+    ``snapshot_<seq>.npy``, where ``seq`` is the number of journal records
+    the snapshot covers. ``restore`` loads the latest snapshot and replays
+    only the journal records after it. The trade log is not part of the
+    snapshot, so a restored book only holds trades from the replayed tail.
+
+    Records of events the book raises on are taken back out of the journal.
+    Books validate an order before changing anything, but a batch is
+    taken back as a whole even though the rows before the failing one were
+    applied, so after an error from ``process_orders`` restore the book.
+
+    Auction calls are not journaled: while the book is between
+    ``begin_auction`` and ``uncross`` it refuses orders and snapshots with
+    ``RuntimeError``.
+    """
+
+    def __init__(self, book, directory, snapshot_every=1 << 20, fsync=False):
+        self.book = book
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        path = self.directory / JOURNAL_FILE
+        self.seq = 0
+        if path.exists():
+            self.seq = path.stat().st_size // EVENT_DTYPE.itemsize
+            # Drop a record torn by a crash mid-write.
+            os.truncate(path, self.seq * EVENT_DTYPE.itemsize)
+        self._file = open(path, "ab")
+        self._last_snapshot = self.seq
+
+    @classmethod
+    def restore(cls, book, directory, **kwargs):
+        """Rebuild ``book`` from the latest snapshot and journal tail in
+        ``directory`` and keep journaling to it."""
+        directory = Path(directory)
+        start = 0
+        snapshots = sorted(directory.glob(SNAPSHOT_PATTERN), key=_snapshot_seq)
+        if snapshots:
+            book.load_orders(np.load(snapshots[-1]))
+            start = _snapshot_seq(snapshots[-1])
+        path = directory / JOURNAL_FILE
+        if path.exists():
+            replay(book, path, start=start)
+        journaled = cls(book, directory, **kwargs)
+        journaled._last_snapshot = start
+        return journaled
+
+    def process_order(self, order):
+        self._check_open()
+        self._write(_record(order), 1)
+        try:
+            self.book.process_order(order)
+        except Exception:
+            self._rollback(1)
+            raise
+        self._maybe_snapshot()
+
+    def process_orders(self, batch):
+        self._check_open()
+        self._write(
+            np.ascontiguousarray(batch, dtype=EVENT_DTYPE).tobytes(), len(batch)
+        )
+        try:
+            fills = self.book.process_orders(batch)
+        except Exception:
+            self._rollback(len(batch))
+            raise
+        self._maybe_snapshot()
+        return fills
+
+    def _check_open(self):
+        if getattr(self.book, "auction", None) is not None:
+            raise RuntimeError("cannot journal an auction call")
+
+    def _write(self, data, n):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.seq += n
+
+    def _rollback(self, n):
+        """Take the last ``n`` records back out of the journal."""
+        self.seq -= n
+        self._file.truncate(self.seq * EVENT_DTYPE.itemsize)
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _maybe_snapshot(self):
+        if self.seq - self._last_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Save the book's resting orders as of the current journal
+        position."""
+        self._check_open()
+        path = self.directory / f"snapshot_{self.seq:016d}.npy"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, self.book.dump_orders())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._last_snapshot = self.seq
+        return path
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.book)
@@ -0,0 +1,168 @@
+from quant_research.order_research.fenwick import DepthIndex
+from quant_research.order_research.order import Side
+from quant_research.order_research.orderbook import OrderBook
+
+
+class TickLadder:
+    """Preallocated array of price levels indexed by integer tick offset.
+
+    Implements the subset of the ``SortedDict`` interface that ``OrderBook``
+    uses for a book side, so lookups and level insertion are a direct list
+    index instead of a bisect. ``best`` points at the best non-empty tick
+    and is only rescanned when the best level empties.
+    """
+
+    __slots__ = "side", "tick_size", "min_price", "levels", "best", "count", "_inv"
+
+    def __init__(self, side: Side, tick_size, min_price, max_price):
+        if tick_size <= 0:
+            raise ValueError("tick_size must be positive")
+        if max_price < min_price:
+            raise ValueError("max_price must not be below min_price")
+        self.side = side
+        self.tick_size = tick_size
+        self.min_price = min_price
+        self._inv = 1 / tick_size
+        self.levels = [None] * (round((max_price - min_price) / tick_size) + 1)
+        self.best = -1
+        self.count = 0
+
+    def tick(self, price):
+        """Return the ladder index of ``price``, which must be on the tick
+        grid and inside the band."""
+        idx = round((price - self.min_price) * self._inv)
+        if not 0 <= idx < len(self.levels):
+            raise ValueError(f"price {price} is outside the ladder band")
+        if abs(self.price(idx) - price) > 1e-6 * self.tick_size:
+            raise ValueError(f"price {price} is not on the {self.tick_size} tick grid")
+        return idx
+
+    def price(self, idx):
+        return self.min_price + idx * self.tick_size
+
+    def _is_better(self, idx, other):
+        if self.side is Side.BUY:
+            return idx > other
+        return idx < other
+
+    def _scan(self, start):
+        """Ladder indices from ``start`` towards the worst tick."""
+        if self.side is Side.BUY:
+            return range(start, -1, -1)
+        return range(start, len(self.levels))
+
+    def copy(self):
+        ladder = TickLadder.__new__(TickLadder)
+        for name in self.__slots__:
+            setattr(ladder, name, getattr(self, name))
+        ladder.levels = self.levels.copy()
+        return ladder
+
+    def get(self, price, default=None):
+        level = self.levels[self.tick(price)]
+        return default if level is None else level
+
+    def __getitem__(self, price):
+        level = self.levels[self.tick(price)]
+        if level is None:
+            raise KeyError(price)
+        return level
+
+    def __setitem__(self, price, level):
+        idx = self.tick(price)
+        if self.levels[idx] is None:
+            self.count += 1
+        self.levels[idx] = level
+        if self.best < 0 or self._is_better(idx, self.best):
+            self.best = idx
+
+    def pop(self, price):
+        idx = self.tick(price)
+        level = self.levels[idx]
+        if level is None:
+            raise KeyError(price)
+        self.levels[idx] = None
+        self.count -= 1
+        if idx == self.best:
+            self.best = -1
+            if self.count:
+                for i in self._scan(idx):
+                    if self.levels[i] is not None:
+                        self.best = i
+                        break
+        return level
+
+    def peekitem(self, index=0):
+        if index != 0:
+            raise IndexError("only the best level can be peeked")
+        if self.best < 0:
+            raise IndexError("ladder is empty")
+        level = self.levels[self.best]
+        return level.price, level
+
+    def top(self, n):
+        """The best ``n`` non-empty levels."""
+        levels = []
+        if self.best >= 0:
+            for i in self._scan(self.best):
+                if self.levels[i] is not None:
+                    levels.append(self.levels[i])
+                    if len(levels) == n:
+                        break
+        return levels
+
+    def keys(self):
+        return [level.price for level in self.values()]
+
+    def values(self):
+        if self.best < 0:
+            return []
+        levels = self.levels
+        return [levels[i] for i in self._scan(self.best) if levels[i] is not None]
+
+    def items(self):
+        return [(level.price, level) for level in self.values()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, price):
+        return self.get(price) is not None
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+
+class LadderOrderBook(OrderBook):
+    """``OrderBook`` for instruments with a known tick size and a bounded
+    price band, backed by one ``TickLadder`` per side.
+
+    Prices must lie on the tick grid between ``min_price`` and
+    ``max_price``; anything else raises ``ValueError``. A ``DepthIndex``
+    answers ``fillable_size`` and ``sweep_cost`` in O(log L).
+    """
+
+    __slots__ = ()
+
+    def __init__(self, tick_size, min_price, max_price, pool=None):
+        super().__init__(pool)
+        self.bids = TickLadder(Side.BUY, tick_size, min_price, max_price)
+        self.asks = TickLadder(Side.SELL, tick_size, min_price, max_price)
+        self._index = DepthIndex(tick_size, min_price, max_price)
+
+    def _match(self, side: Side, price, remaining, order_id, ts):
+        # Reject a bad price before it trades, not once the remainder rests.
+        if price is not None:
+            self.bids.tick(price)
+        return super()._match(side, price, remaining, order_id, ts)
+
+    def _modify(self, order_id, price, size, ts):
+        if price is not None:
+            self.bids.tick(price)
+        super()._modify(order_id, price, size, ts)
+
+    def _top(self, levels, n):
+        return levels.top(n)
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from copy import copy
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Depth(NamedTuple):
+    """Aggregated market-by-price depth, best level first on each side."""
+
+    bid_price: np.ndarray
+    bid_size: np.ndarray
+    bid_count: np.ndarray
+    ask_price: np.ndarray
+    ask_size: np.ndarray
+    ask_count: np.ndarray
+
+
+class LevelChanges(NamedTuple):
+    """Current state of the levels that changed; ``size`` and ``count`` are
+    zero for levels that were removed."""
+
+    side: np.ndarray
+    price: np.ndarray
+    size: np.ndarray
+    count: np.ndarray
+
+
+class PriceLevel:
+    """FIFO queue of resting orders at a single price.
+
+    Orders are kept in an ``OrderedDict`` keyed by order id, which gives O(1)
+    append, O(1) pop from the front and O(1) removal from anywhere in the
+    queue. ``size`` is the aggregate remaining quantity of the level and
+    ``hidden`` the aggregate reserve of its icebergs, which is not part of
+    ``size``.
+
+    Each appended order gets an increasing ``seq``. ``tracked`` maps the ids
+    of orders registered with ``track`` to the size queued ahead of them and
+    is adjusted whenever an order ahead of them changes size or leaves.
+
+    ``epoch`` is the book snapshot epoch the level was created in; see
+    ``OrderBook.snapshot``.
+    """
+
+    __slots__ = "price", "orders", "size", "hidden", "tracked", "epoch", "_seq"
+
+    def __init__(self, price, epoch=0):
+        self.price = price
+        self.orders = OrderedDict()
+        self.size = 0
+        self.hidden = 0
+        self.tracked = None
+        self.epoch = epoch
+        self._seq = 0
+
+    def fork(self, epoch):
+        """Copy of the level and its orders for ``epoch``."""
+        level = PriceLevel(self.price, epoch)
+        level.orders = OrderedDict(
+            (order_id, copy(order)) for order_id, order in self.orders.items()
+        )
+        level.size = self.size
+        level.hidden = self.hidden
+        level.tracked = None if self.tracked is None else dict(self.tracked)
+        level._seq = self._seq
+        return level
+
+    def append(self, order):
+        order.seq = self._seq
+        self._seq += 1
+        self.orders[order.order_id] = order
+        self.size += order.remaining
+        self.hidden += order.hidden
+
+    def remove(self, order):
+        del self.orders[order.order_id]
+        self.size -= order.remaining
+        self.hidden -= order.hidden
+        if self.tracked:
+            self.tracked.pop(order.order_id, None)
+            self._shift(order.seq, -order.remaining)
+
+    def resize(self, order, remaining):
+        """Change the remaining size of ``order`` in place, keeping its
+        priority."""
+        delta = remaining - order.remaining
+        order.remaining = remaining
+        self.size += delta
+        if self.tracked:
+            self._shift(order.seq, delta)
+
+    def requeue(self, order, remaining):
+        """Change the remaining size of ``order`` and send it to the back of
+        the queue."""
+        tracked = bool(self.tracked) and order.order_id in self.tracked
+        self.remove(order)
+        order.remaining = remaining
+        self.append(order)
+        if tracked:
+            self.track(order)
+
+    def track(self, order):
+        """Start tracking the size ahead of ``order`` and return it."""
+        if order.seq == self._seq - 1:
+            ahead = self.size - order.remaining
+        else:
+            ahead = 0
+            for other in self.orders.values():
+                if other is order:
+                    break
+                ahead += other.remaining
+        if self.tracked is None:
+            self.tracked = {}
+        self.tracked[order.order_id] = ahead
+        return ahead
+
+    def consume(self, filled):
+        """Account for ``filled`` taken from the front of the queue."""
+        tracked, orders = self.tracked, self.orders
+        for order_id, ahead in list(tracked.items()):
+            if order_id in orders:
+                tracked[order_id] = max(ahead - filled, 0)
+            else:
+                del tracked[order_id]
+
+    def _shift(self, seq, delta):
+        tracked, orders = self.tracked, self.orders
+        for order_id in tracked:
+            if orders[order_id].seq > seq:
+                tracked[order_id] += delta
+
+    def head(self):
+        return next(iter(self.orders.values()))
+
+    def pop_head(self):
+        return self.orders.popitem(last=False)[1]
+
+    def __iter__(self):
+        return iter(self.orders.values())
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __bool__(self):
+        return bool(self.orders)
+
+    def __repr__(self):
+        return f"Level {self.price} {self.size} ({len(self.orders)} orders)"
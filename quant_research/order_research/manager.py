@@ -0,0 +1,218 @@
+"""Multi-symbol matching across worker processes.
+
+Each symbol is owned by one worker, chosen by a CRC32 hash of the symbol so
+the assignment is the same in every run. Workers keep their books for the
+life of the manager and exchange batched ``ORDER_DTYPE`` arrays and results
+with it over pipes; NumPy arrays pickle as raw buffers, so a batch costs one
+copy each way.
+"""
+
+import multiprocessing
+import os
+import traceback
+import zlib
+from multiprocessing.connection import wait
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE, Fills
+from quant_research.order_research.level import LevelChanges
+from quant_research.order_research.orderbook import OrderBook
+
+
+class SymbolResult(NamedTuple):
+    """Fills and changed levels of one symbol's part of a flush.
+
+    ``error`` is the traceback of the exception the symbol's batch raised,
+    or None. The rows before the failing one were applied, and their fills
+    and levels are still reported.
+    """
+
+    symbol: str
+    fills: Fills
+    levels: LevelChanges
+    error: Optional[str] = None
+
+
+def worker_index(symbol, n_workers):
+    """Worker that owns ``symbol``; stable across runs, unlike ``hash``."""
+    return zlib.crc32(symbol.encode()) % n_workers
+
+
+class _Books:
+    """The books owned by one worker."""
+
+    __slots__ = "factory", "books"
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.books = {}
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = self.factory()
+        return book
+
+    def process(self, work):
+        results = []
+        for symbol, batch in work:
+            book = self.book(symbol)
+            start, error = book.trades.count, None
+            try:
+                book.process_orders(batch)
+            except Exception:
+                error = traceback.format_exc()
+            # Copy out of the trade log so the result does not pin its chunk.
+            fills = Fills(*(np.array(column) for column in book.trades.fills(start)))
+            results.append(SymbolResult(symbol, fills, book.changed_levels(), error))
+        return results
+
+    def depth(self, symbol, n):
+        return self.book(symbol).depth(n)
+
+
+def _call(books, op, *args):
+    try:
+        return "ok", getattr(books, op)(*args)
+    except Exception:
+        return "error", traceback.format_exc()
+
+
+def _serve(conn, factory):
+    books = _Books(factory)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        conn.send(_call(books, *message))
+    conn.close()
+
+
+class OrderBookManager:
+    """Routes per-symbol order batches to a pool of worker processes.
+
+    ``submit`` queues a batch for a symbol and ``flush`` sends everything
+    queued to the workers at once, lets them run in parallel and returns a
+    ``SymbolResult`` per symbol. Batches of a symbol are always applied in
+    submission order, since one worker owns it. With ``deterministic`` set
+    the results come back in the order symbols were first submitted;
+    otherwise in the order workers finish.
+
+    A symbol whose batch raises reports the error in its ``SymbolResult``
+    without holding back the others; any other failure in a worker raises
+    ``RuntimeError``.
+
+    ``n_workers=0`` keeps the books in the calling process, which gives the
+    same results without any processes. ``book_factory`` must be picklable
+    to be sent to the workers.
+    """
+
+    __slots__ = (
+        "n_workers",
+        "deterministic",
+        "_local",
+        "_conns",
+        "_processes",
+        "_pending",
+    )
+
+    def __init__(
+        self, n_workers=None, book_factory=OrderBook, deterministic=True, context=None
+    ):
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.deterministic = deterministic
+        self._pending = {}
+        self._conns = []
+        self._processes = []
+        self._local = None
+        if self.n_workers == 0:
+            self._local = _Books(book_factory)
+            return
+        ctx = multiprocessing.get_context(context)
+        for _ in range(self.n_workers):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(
+                target=_serve, args=(child, book_factory), daemon=True
+            )
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+
+    def worker(self, symbol):
+        return worker_index(symbol, self.n_workers) if self.n_workers else 0
+
+    def submit(self, symbol, batch):
+        """Queue an ``ORDER_DTYPE`` batch for ``symbol`` until the next
+        ``flush``."""
+        self._pending.setdefault(symbol, []).append(batch)
+
+    def flush(self):
+        """Process everything queued and return a list of
+        ``SymbolResult``."""
+        pending, self._pending = self._pending, {}
+        work = {}
+        for symbol, batches in pending.items():
+            batch = batches[0] if len(batches) == 1 else np.concatenate(batches)
+            batch = np.asarray(batch, dtype=ORDER_DTYPE)
+            work.setdefault(self.worker(symbol), []).append((symbol, batch))
+        if self._local is not None:
+            return self._check(_call(self._local, "process", work.get(0, [])))
+
+        for index, items in work.items():
+            self._conns[index].send(("process", items))
+        results, errors = [], []
+        waiting = {self._conns[index]: index for index in work}
+        # Read every reply before raising, so no stale reply is left in a
+        # pipe for the next request.
+        while waiting:
+            for conn in wait(list(waiting)):
+                del waiting[conn]
+                try:
+                    results.extend(self._reply(conn))
+                except RuntimeError as exc:
+                    errors.append(exc)
+        if errors:
+            raise errors[0]
+        if self.deterministic:
+            order = {symbol: i for i, symbol in enumerate(pending)}
+            results.sort(key=lambda result: order[result.symbol])
+        return results
+
+    def depth(self, symbol, n=10):
+        """``Depth`` of the book of ``symbol``."""
+        if self._local is not None:
+            return self._check(_call(self._local, "depth", symbol, n))
+        conn = self._conns[self.worker(symbol)]
+        conn.send(("depth", symbol, n))
+        return self._reply(conn)
+
+    @classmethod
+    def _reply(cls, conn):
+        return cls._check(conn.recv())
+
+    @staticmethod
+    def _check(reply):
+        status, value = reply
+        if status == "error":
+            raise RuntimeError(f"order book worker failed:\n{value}")
+        return value
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self._conns, self._processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,5 +1,6 @@
-from enum import Enum
-from time import time
+from enum import Enum, IntEnum
+
+from quant_research.order_research.clock import now
 
 
 class Side(Enum):
@@ -7,26 +8,55 @@ class Side(Enum):
     SELL = 1
 
 
+class TimeInForce(Enum):
+    GTC = 0
+    IOC = 1
+    FOK = 2
+
+
+class OrderType(IntEnum):
+    LIMIT = 0
+    MARKET = 1
+    CANCEL = 2
+    MODIFY = 3
+    TRADE = 4
+
+
 class Order:
     __slots__ = "order_id", "ts"
 
-    def __init__(self, order_id):
+    def __init__(self, order_id, ts=None):
         self.order_id = order_id
-        self.ts = int(1e6 * time())
+        self.ts = now() if ts is None else ts
 
 
 class CancelOrder(Order):
     __slots__ = "order_id", "ts"
 
-    def __init__(self, order_id):
-        super().__init__(order_id)
+    def __init__(self, order_id, ts=None):
+        super().__init__(order_id, ts)
+
+
+class ModifyOrder(Order):
+    """Amend a resting order to a new remaining ``size`` and, unless
+    ``price`` is None, a new price."""
+
+    __slots__ = "order_id", "size", "price", "ts"
+
+    def __init__(self, order_id, size, price=None, ts=None):
+        super().__init__(order_id, ts)
+        self.size = size
+        self.price = price
+
+    def __repr__(self):
+        return f"Modify Order {self.order_id} {self.size} {self.price} {self.ts}"
 
 
 class MarketOrder(Order):
     __slots__ = "order_id", "side", "size", "remaining", "ts"
 
-    def __init__(self, order_id, side, size):
-        super().__init__(order_id)
+    def __init__(self, order_id, side, size, ts=None):
+        super().__init__(order_id, ts)
         self.side = side
         self.size = size
         self.remaining = size
@@ -36,14 +66,19 @@ class MarketOrder(Order):
 
 
 class LimitOrder(Order):
-    __slots__ = "order_id", "side", "size", "remaining", "price", "ts"
+    __slots__ = "order_id", "side", "size", "remaining", "price", "tif", "seq", "ts"
 
-    def __init__(self, order_id, side, size, price):
-        super().__init__(order_id)
+    # Undisplayed reserve behind ``remaining``; only icebergs have one.
+    hidden = 0
+
+    def __init__(self, order_id, side, size, price, ts=None, tif=TimeInForce.GTC):
+        super().__init__(order_id, ts)
         self.side = side
         self.price = price
         self.size = size
         self.remaining = size
+        self.tif = tif
+        self.seq = None
 
     def __lt__(self, other):
         if self.price != other.price:
@@ -59,3 +94,58 @@ class LimitOrder(Order):
 
     def __repr__(self):
         return f"Limit Order {self.side} {self.size} {self.ts}"
+
+
+class IcebergOrder(LimitOrder):
+    """Limit order that displays at most ``display`` of its size.
+
+    While resting, ``remaining`` is the displayed part and ``hidden`` the
+    reserve. Each time the displayed part fills, the next ``display`` is
+    taken from the reserve and queued at the back of the level.
+    """
+
+    __slots__ = "display", "hidden"
+
+    def __init__(self, order_id, side, size, price, display, ts=None):
+        super().__init__(order_id, side, size, price, ts)
+        self.display = display
+        self.hidden = 0
+
+    def __repr__(self):
+        return (
+            f"Iceberg Order {self.side} {self.size} {self.display} "
+            f"{self.hidden} {self.ts}"
+        )
+
+
+class StopOrder(Order):
+    """Market order held back until the last trade price reaches
+    ``stop_price``: at or above it for buys, at or below it for sells."""
+
+    __slots__ = "order_id", "side", "size", "remaining", "stop_price", "ts"
+
+    def __init__(self, order_id, side, size, stop_price, ts=None):
+        super().__init__(order_id, ts)
+        self.side = side
+        self.size = size
+        self.remaining = size
+        self.stop_price = stop_price
+
+    def __repr__(self):
+        return f"Stop Order {self.side} {self.size} {self.stop_price} {self.ts}"
+
+
+class StopLimitOrder(StopOrder):
+    """Stop order that enters the book as a limit order at ``price``."""
+
+    __slots__ = "price"
+
+    def __init__(self, order_id, side, size, stop_price, price, ts=None):
+        super().__init__(order_id, side, size, stop_price, ts)
+        self.price = price
+
+    def __repr__(self):
+        return (
+            f"Stop Limit Order {self.side} {self.size} {self.stop_price} "
+            f"{self.price} {self.ts}"
+        )
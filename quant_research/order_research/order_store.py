@@ -0,0 +1,103 @@
+import numpy as np
+
+NIL = -1
+
+ORDER_COLUMNS = (
+    ("order_id", np.int64),
+    ("tick", np.int32),
+    ("side", np.uint8),
+    ("size", np.int64),
+    ("remaining", np.int64),
+    ("ts", np.int64),
+    ("prev", np.int32),
+    ("next", np.int32),
+)
+
+
+class OrderStore:
+    """Struct-of-arrays storage for resting orders.
+
+    Every order occupies one integer slot across parallel NumPy columns
+    (see ``ORDER_COLUMNS``); ``prev``/``next`` link the slots of a price
+    level into a FIFO queue. Released slots are chained through ``next``
+    into a free list and reused before the arrays grow. The columns are
+    exposed as memoryviews named after each column for fast scalar access
+    and replaced when the store grows, so don't hold on to them.
+    """
+
+    __slots__ = ("capacity", "count", "free", "arrays") + tuple(
+        name for name, _ in ORDER_COLUMNS
+    )
+
+    def __init__(self, capacity=1024):
+        self.capacity = 0
+        self.count = 0
+        self.free = NIL
+        self.arrays = {name: np.empty(0, dtype) for name, dtype in ORDER_COLUMNS}
+        self._grow(max(capacity, 1))
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name, dtype in ORDER_COLUMNS:
+            array = np.zeros(capacity, dtype)
+            array[:old] = self.arrays[name]
+            self.arrays[name] = array
+        links = self.arrays["next"]
+        links[old : capacity - 1] = np.arange(old + 1, capacity)
+        links[capacity - 1] = self.free
+        self.free = old
+        self.capacity = capacity
+        self._bind()
+
+    def _bind(self):
+        for name, _ in ORDER_COLUMNS:
+            setattr(self, name, memoryview(self.arrays[name]))
+
+    def alloc(self, order_id, side, tick, size, remaining, ts):
+        """Store an order in a free slot and return the slot index."""
+        if self.free == NIL:
+            self._grow(2 * self.capacity)
+        slot = self.free
+        self.free = self.next[slot]
+        self.order_id[slot] = order_id
+        self.side[slot] = side
+        self.tick[slot] = tick
+        self.size[slot] = size
+        self.remaining[slot] = remaining
+        self.ts[slot] = ts
+        self.prev[slot] = NIL
+        self.next[slot] = NIL
+        self.count += 1
+        return slot
+
+    def release(self, slot):
+        """Return ``slot`` to the free list."""
+        self.remaining[slot] = 0
+        self.next[slot] = self.free
+        self.free = slot
+        self.count -= 1
+
+    def live(self):
+        """Indices of the occupied slots."""
+        return np.flatnonzero(self.arrays["remaining"])
+
+    def snapshot(self):
+        """Copy of the store's state as a dict of arrays."""
+        state = {name: array.copy() for name, array in self.arrays.items()}
+        state["free"] = np.array(self.free)
+        state["count"] = np.array(self.count)
+        return state
+
+    def restore(self, state):
+        """Load a state produced by ``snapshot``."""
+        self.arrays = {name: state[name].copy() for name, _ in ORDER_COLUMNS}
+        self.capacity = len(self.arrays["next"])
+        self.free = int(state["free"])
+        self.count = int(state["count"])
+        self._bind()
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def __len__(self):
+        return self.count
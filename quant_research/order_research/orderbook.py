@@ -1,18 +1,97 @@
-from quant_research.order_research.order import MarketOrder, LimitOrder, CancelOrder, Order
-from sortedcontainers import SortedList
+from quant_research.order_research.order import (
+    MarketOrder,
+    LimitOrder,
+    CancelOrder,
+    ModifyOrder,
+    IcebergOrder,
+    StopOrder,
+    StopLimitOrder,
+)
+from sortedcontainers import SortedDict
 from functools import singledispatchmethod
-from quant_research.order_research.order import Side
-from quant_research.order_research.trade import Trade
-from typing import Union
+from operator import neg
+import numpy as np
+from quant_research.order_research import clock
+from quant_research.order_research.auction import CallAuction
+from quant_research.order_research.order import OrderType, Side, TimeInForce
+from quant_research.order_research.batch import RESTING_DTYPE
+from quant_research.order_research.level import Depth, LevelChanges, PriceLevel
+from quant_research.order_research.trade_log import TradeLog
+
+NAN = float("nan")
 
 
 class OrderBook:
-    __slots__ = "bids", "asks", "trades"
+    """Price-level limit order book.
+
+    Each side is a sorted mapping ``price -> PriceLevel`` ordered best price
+    first, and every resting order is indexed by id as
+    ``order_id -> (side, level, order)``. Cancels and best bid/ask lookups
+    are O(1); adding a new price level is O(log L) in the number of levels.
+
+    Levels keep their aggregate size and order count up to date, and the
+    prices of levels touched since the last ``changed_levels`` call are
+    remembered per side, so depth queries never walk individual orders.
+    Subclasses with a tick grid can set ``_index`` to a ``DepthIndex`` that
+    is kept in step with every level size change. Iceberg reserves are
+    left out of depth, but ``_reserve`` totals them per side so fill-or-kill
+    checks only walk levels for them when there are any.
+
+    Pending stop orders wait in one sorted trigger index per side, keyed by
+    stop price with the next stop to trigger first, so after a trade only
+    the stops whose trigger ``last_price`` has crossed are looked at.
+
+    Between ``begin_auction`` and ``uncross`` the book is in a call phase:
+    limit, market, cancel and modify orders are collected by ``auction``
+    instead of being matched. Icebergs take part with their full open size,
+    and IOC and FOK orders are refused.
+
+    ``snapshot`` is O(1) and copy-on-write: it starts a new epoch, and the
+    first change after that to a level container or a level copies it (and
+    the level's orders) instead of modifying the one the snapshot shares.
 
-    def __init__(self):
-        self.bids: SortedList[Order] = SortedList()
-        self.asks: SortedList[Order] = SortedList()
-        self.trades = []
+    With a ``LimitOrderPool`` the orders the book creates itself are taken
+    from the pool and returned to it once filled or cancelled, so order
+    objects read from the book (such as ``get_best_bid``) are only valid
+    until it next processes an order.
+    """
+
+    __slots__ = (
+        "bids",
+        "asks",
+        "trades",
+        "_orders",
+        "_changed_bids",
+        "_changed_asks",
+        "_index",
+        "_reserve",
+        "last_price",
+        "_stops",
+        "_stop_orders",
+        "auction",
+        "_epoch",
+        "_side_epochs",
+        "_pool",
+    )
+
+    def __init__(self, pool=None):
+        self.bids = SortedDict(neg)
+        self.asks = SortedDict()
+        self.trades = TradeLog()
+        self._orders = {}
+        self._changed_bids = set()
+        self._changed_asks = set()
+        self._index = None
+        self._reserve = [0, 0]
+        self.last_price = None
+        # Buy stops trigger from the lowest stop price up, sell stops from
+        # the highest down.
+        self._stops = SortedDict(), SortedDict(neg)
+        self._stop_orders = {}
+        self.auction = None
+        self._epoch = 0
+        self._side_epochs = [0, 0]
+        self._pool = pool
 
     @singledispatchmethod
     def process_order(self, order):
@@ -20,115 +99,662 @@ class OrderBook:
 
     @process_order.register
     def _(self, order: MarketOrder):
-        self._process_order(order)
-
-        if order.remaining > 0:
-            if order.side == Side.BUY:
-                self.bids.add(order)
-            else:
-                self.asks.add(order)
+        if self.auction is not None:
+            self.auction.append(
+                order.order_id,
+                OrderType.MARKET,
+                order.side.value,
+                0.0,
+                order.size,
+                order.ts,
+            )
+            return
+        # Market orders are immediate-or-cancel: any unfilled size is dropped.
+        order.remaining = self._match(
+            order.side, None, order.remaining, order.order_id, order.ts
+        )
+        if self._stop_orders:
+            self._trigger_stops()
 
     @process_order.register
     def _(self, order: LimitOrder):
-        self._process_order(order)
-        if order.remaining > 0:
-            if order.side == Side.BUY:
-                self.bids.add(order)
+        if self.auction is not None:
+            if order.tif is not TimeInForce.GTC:
+                raise ValueError(
+                    f"{order.tif.name} orders cannot be entered during an auction call"
+                )
+            self._collect(order)
+            return
+        # Fill-or-kill orders that cannot fill completely are rejected
+        # untouched, before any matching.
+        if (
+            order.tif is TimeInForce.FOK
+            and self.fillable_size(order.side, order.price) < order.remaining
+        ):
+            return
+        order.remaining = self._match(
+            order.side, order.price, order.remaining, order.order_id, order.ts
+        )
+        if order.remaining > 0 and order.tif is TimeInForce.GTC:
+            self._rest(order)
+        if self._stop_orders:
+            self._trigger_stops()
+
+    @process_order.register
+    def _(self, order: IcebergOrder):
+        if self.auction is not None:
+            self.auction.displays[order.order_id] = order.display
+            self._collect(order)
+            return
+        # The full size is available to match on arrival; only the part
+        # that rests is split into displayed size and reserve.
+        remaining = self._match(
+            order.side, order.price, order.remaining, order.order_id, order.ts
+        )
+        order.remaining = min(order.display, remaining)
+        order.hidden = remaining - order.remaining
+        if remaining > 0:
+            self._rest(order)
+        if self._stop_orders:
+            self._trigger_stops()
+
+    @process_order.register
+    def _(self, order: StopOrder):
+        stops = self._stops[order.side.value]
+        queue = stops.get(order.stop_price)
+        if queue is None:
+            queue = stops[order.stop_price] = {}
+        queue[order.order_id] = order
+        self._stop_orders[order.order_id] = order
+        self._trigger_stops()
+
+    @process_order.register
+    def _(self, order: CancelOrder):
+        if self.auction is not None:
+            self.auction.append(order.order_id, OrderType.CANCEL, 0, 0.0, 0, order.ts)
+            return
+        self._cancel(order.order_id)
+
+    @process_order.register
+    def _(self, order: ModifyOrder):
+        if self.auction is not None:
+            price = float("nan") if order.price is None else order.price
+            self.auction.append(
+                order.order_id, OrderType.MODIFY, 0, price, order.size, order.ts
+            )
+            return
+        self._modify(order.order_id, order.price, order.size, order.ts)
+        if self._stop_orders:
+            self._trigger_stops()
+
+    def process_orders(self, batch):
+        """Process a structured array of ``ORDER_DTYPE`` rows in order and
+        return the resulting ``Fills``.
+
+        Only orders that come to rest in the book are turned into
+        ``LimitOrder`` objects. ``MODIFY`` rows amend the order like a
+        ``ModifyOrder``, keeping its price when the row's price is NaN, and
+        ``TRADE`` rows are skipped. During an auction call phase the rows
+        are only collected and no fills are returned.
+        """
+        start = self.trades.count
+        if self.auction is not None:
+            self.auction.add(batch)
+            return self.trades.fills(start)
+        sides = (Side.BUY, Side.SELL)
+        limit, market, cancel = OrderType.LIMIT, OrderType.MARKET, OrderType.CANCEL
+        modify, trade = OrderType.MODIFY, OrderType.TRADE
+        stop_orders = self._stop_orders
+        for order_id, kind, side, price, size, ts in zip(
+            batch["order_id"].tolist(),
+            batch["type"].tolist(),
+            batch["side"].tolist(),
+            batch["price"].tolist(),
+            batch["size"].tolist(),
+            batch["ts"].tolist(),
+        ):
+            if kind == limit:
+                self._add_limit(order_id, sides[side], price, size, ts)
+            elif kind == market:
+                self._match(sides[side], None, size, order_id, ts)
+            elif kind == cancel:
+                self._cancel(order_id)
+                continue
+            elif kind == modify:
+                self._modify(order_id, price if price == price else None, size, ts)
+            elif kind == trade:
+                continue
             else:
-                self.asks.add(order)
+                raise ValueError(f"unknown order type {kind}")
+            if stop_orders:
+                self._trigger_stops()
+        return self.trades.fills(start)
 
-    def _get_condition(self, order: Union[MarketOrder, LimitOrder]):
-        if isinstance(order, LimitOrder):
-            if order.side == Side.BUY:
-                condition = len(self.asks) > 0 and order.price >= self.asks[0].price
+    def _add_limit(self, order_id, side: Side, price, size, ts):
+        remaining = self._match(side, price, size, order_id, ts)
+        if remaining > 0:
+            if self._pool is None:
+                order = LimitOrder(order_id, side, size, price, ts)
+                order.remaining = remaining
             else:
-                condition = len(self.bids) > 0 and order.price <= self.bids[0].price
-        else:
-            if order.side == Side.BUY:
-                condition = len(self.asks) > 0
+                order = self._pool.acquire(order_id, side, size, price, ts, remaining)
+            self._rest(order)
+        return remaining
+
+    def _modify(self, order_id, price, size, ts):
+        """Amend a resting order to ``size`` remaining and, unless ``price``
+        is None, to a new price.
+
+        A size decrease at the same price is applied in place and keeps
+        queue priority; a size increase sends the order to the back of its
+        level, and a price change moves it to the back of the new level,
+        matching first if the new price crosses.
+        """
+        entry = self._orders.get(order_id)
+        if entry is None:
+            return
+        if size <= 0:
+            self._cancel(order_id)
+            return
+        side, level, order = entry
+        self._changed(side).add(level.price)
+        if price is None or price == order.price:
+            if level.epoch != self._epoch:
+                level = self._own(side, level)
+                order = level.orders[order_id]
+            delta = size - order.remaining
+            order.size += delta
+            if delta > 0:
+                level.requeue(order, size)
+                order.ts = ts
             else:
-                condition = len(self.bids) > 0
+                level.resize(order, size)
+            if self._index is not None:
+                self._index.add(side, level.price, delta)
+            return
 
-        return condition
+        tracked = bool(level.tracked) and order_id in level.tracked
+        del self._orders[order_id]
+        order = self._remove(side, level, order)
+        order.size += size - order.remaining
+        order.price = price
+        order.ts = ts
+        order.remaining = self._match(side, price, size, order_id, ts)
+        if order.remaining > 0:
+            self._rest(order)
+            if tracked:
+                self.track(order_id)
+        elif self._pool is not None:
+            self._pool.release(order)
 
-    @process_order.register
-    def _(self, order: CancelOrder):
-        for bid in self.bids:
-            if bid.id == order.id:
-                self.bids.discard(order)
-                return
-        for ask in self.asks:
-            if ask.id == order.id:
-                self.asks.discard(order)
-                return
+    def _cancel(self, order_id):
+        entry = self._orders.pop(order_id, None)
+        if entry is None:
+            if self._stop_orders:
+                self._cancel_stop(order_id)
+            return
+        order = self._remove(*entry)
+        if self._pool is not None:
+            self._pool.release(order)
 
-    def _process_order(self, order: Union[MarketOrder, LimitOrder]):
-        while self._get_condition(order):
-            if order.side == Side.BUY:
-                book_order = self.asks.pop(0)
+    def _cancel_stop(self, order_id):
+        order = self._stop_orders.pop(order_id, None)
+        if order is None:
+            return
+        stops = self._stops[order.side.value]
+        queue = stops[order.stop_price]
+        del queue[order_id]
+        if not queue:
+            del stops[order.stop_price]
+
+    def _trigger_stops(self):
+        """Activate pending stops, oldest first within a stop price, until
+        none has its trigger crossed by ``last_price``."""
+        buy_stops, sell_stops = self._stops
+        while self.last_price is not None and self.auction is None:
+            last = self.last_price
+            if buy_stops and buy_stops.peekitem(0)[0] <= last:
+                stops = buy_stops
+            elif sell_stops and sell_stops.peekitem(0)[0] >= last:
+                stops = sell_stops
             else:
-                book_order = self.bids.pop(0)
-
-            if order.remaining >= book_order.remaining:
-                order.remaining -= book_order.remaining
-                book_order.remaining = 0
-
-                self.trades.append(
-                    Trade(
-                        order.side,
-                        book_order.price,
-                        order.size,
-                        order.order_id,
-                        book_order.order_id,
-                    )
+                return
+            stop_price, queue = stops.peekitem(0)
+            order = queue.pop(next(iter(queue)))
+            if not queue:
+                del stops[stop_price]
+            del self._stop_orders[order.order_id]
+            if isinstance(order, StopLimitOrder):
+                order.remaining = self._add_limit(
+                    order.order_id, order.side, order.price, order.remaining, order.ts
                 )
-                if order.remaining == 0:
-                    break
             else:
-                order.remaining -= book_order.remaining
-                order.remaining = 0
-
-                self.trades.append(
-                    Trade(
-                        order.side,
-                        book_order.price,
-                        order.size,
-                        order.order_id,
-                        book_order.order_id,
-                    )
+                order.remaining = self._match(
+                    order.side, None, order.remaining, order.order_id, order.ts
                 )
 
-                if order.side == Side.SELL:
-                    self.asks.add(order)
-                else:
-                    self.bids.add(order)
+    def _remove(self, side: Side, level: PriceLevel, order: LimitOrder):
+        """Take ``order`` out of ``level`` and return the book's own copy
+        of it."""
+        if level.epoch != self._epoch:
+            level = self._own(side, level)
+            order = level.orders[order.order_id]
+        level.remove(order)
+        self._changed(side).add(level.price)
+        if self._index is not None:
+            self._index.add(side, level.price, -order.remaining)
+        if order.hidden:
+            self._reserve[side.value] -= order.hidden
+        if not level:
+            self._writable(side).pop(level.price)
+        return order
+
+    def _changed(self, side: Side):
+        return self._changed_bids if side is Side.BUY else self._changed_asks
+
+    def _writable(self, side: Side):
+        """Level container of ``side``, first copied if a snapshot shares
+        it."""
+        epochs = self._side_epochs
+        if epochs[side.value] != self._epoch:
+            if side is Side.BUY:
+                self.bids = self.bids.copy()
+            else:
+                self.asks = self.asks.copy()
+            epochs[side.value] = self._epoch
+        return self.bids if side is Side.BUY else self.asks
+
+    def _own(self, side: Side, level: PriceLevel):
+        """Fork ``level``, which a snapshot shares, into the book's own
+        container and order index."""
+        level = level.fork(self._epoch)
+        self._writable(side)[level.price] = level
+        orders = self._orders
+        for order in level:
+            if order.order_id in orders:
+                orders[order.order_id] = (side, level, order)
+        return level
+
+    def _rest(self, order: LimitOrder):
+        levels = self._writable(order.side)
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = PriceLevel(order.price, self._epoch)
+        elif level.epoch != self._epoch:
+            level = self._own(order.side, level)
+        level.append(order)
+        self._changed(order.side).add(order.price)
+        if self._index is not None:
+            self._index.add(order.side, order.price, order.remaining)
+        if order.hidden:
+            self._reserve[order.side.value] += order.hidden
+        self._orders[order.order_id] = (order.side, level, order)
+
+    def _match(self, side: Side, price, remaining, order_id, ts):
+        """Fill ``remaining`` against the opposite side up to ``price``
+        (``None`` for no limit) and return the unfilled size."""
+        if side is Side.BUY:
+            changed, side_code, book_side = self._changed_asks, 0, Side.SELL
+        else:
+            changed, side_code, book_side = self._changed_bids, 1, Side.BUY
+        levels = self._writable(book_side)
+        trades, index, epoch = self.trades, self._index, self._epoch
+        pool = self._pool
+
+        while remaining > 0 and levels:
+            level = levels.peekitem(0)[1]
+            if price is not None:
+                if side is Side.BUY and level.price > price:
+                    break
+                if side is Side.SELL and level.price < price:
+                    break
+            if level.epoch != epoch:
+                level = self._own(book_side, level)
+
+            changed.add(level.price)
+            before = level.size
+            start = remaining
+            while remaining > 0 and level:
+                book_order = level.head()
+                size = min(remaining, book_order.remaining)
+                remaining -= size
+                book_order.remaining -= size
+                level.size -= size
+                trades.append(
+                    ts, side_code, level.price, size, order_id, book_order.order_id
+                )
+                if book_order.remaining == 0:
+                    if book_order.hidden:
+                        self._replenish(book_side, level, book_order)
+                    else:
+                        level.pop_head()
+                        del self._orders[book_order.order_id]
+                        if pool is not None:
+                            pool.release(book_order)
+
+            if index is not None:
+                index.add(book_side, level.price, level.size - before)
+            if level.tracked:
+                level.consume(start - remaining)
+            self.last_price = level.price
+            if not level:
+                levels.pop(level.price)
+
+        return remaining
+
+    def track(self, order_id):
+        """Start maintaining the size queued ahead of resting order
+        ``order_id`` at its level and return it, or None if the order is
+        not resting.
+
+        Tracking survives amendments and ends when the order is filled or
+        cancelled.
+        """
+        entry = self._orders.get(order_id)
+        if entry is None:
+            return None
+        side, level, order = entry
+        if level.epoch != self._epoch:
+            level = self._own(side, level)
+            order = level.orders[order_id]
+        return level.track(order)
+
+    def untrack(self, order_id):
+        entry = self._orders.get(order_id)
+        if entry is not None and entry[1].tracked:
+            side, level, _ = entry
+            if level.epoch != self._epoch:
+                level = self._own(side, level)
+            level.tracked.pop(order_id, None)
+
+    def snapshot(self):
+        """Frozen ``BookSnapshot`` of the resting orders, in O(1).
+
+        The snapshot shares the book's levels, which the book copies before
+        changing them, so it can be read from any thread while the book
+        keeps processing orders. Take it from the thread driving the book.
+        After a snapshot the book works on copies of the resting orders it
+        touches, so order objects passed to ``process_order`` earlier stop
+        reflecting later fills.
+        """
+        self._epoch += 1
+        return BookSnapshot(self.bids, self.asks, self._top, self._epoch)
+
+    def queue_ahead(self, order_id):
+        """Size queued ahead of tracked order ``order_id`` at its level, or
+        None if it is not tracked."""
+        entry = self._orders.get(order_id)
+        if entry is None or not entry[1].tracked:
+            return None
+        return entry[1].tracked.get(order_id)
+
+    def _collect(self, order: LimitOrder):
+        self.auction.append(
+            order.order_id,
+            OrderType.LIMIT,
+            order.side.value,
+            order.price,
+            order.size,
+            order.ts,
+        )
+
+    def begin_auction(self):
+        """Start a call phase and return its ``CallAuction``.
+
+        Resting orders are moved into the auction ahead of anything
+        submitted during the call, so the book is empty until ``uncross``.
+        Icebergs are moved with their reserve.
+        """
+        if self.auction is not None:
+            raise RuntimeError("an auction is already in progress")
+        resting = self.dump_orders()
+        auction = CallAuction()
+        reserve = {}
+        for _, _, order in self._orders.values():
+            if isinstance(order, IcebergOrder):
+                auction.displays[order.order_id] = order.display
+                reserve[order.order_id] = order.hidden
+        if reserve:
+            resting["remaining"] += [
+                reserve.get(order_id, 0) for order_id in resting["order_id"].tolist()
+            ]
+        for order_id in list(self._orders):
+            self._cancel(order_id)
+        self.auction = auction
+        auction.add_resting(resting)
+        return auction
+
+    def uncross(self, reference=None, ts=None):
+        """End the call phase: execute the auction at its equilibrium price,
+        rest the unfilled limit orders and return the ``AuctionResult``.
+
+        Auction trades are logged with the buy order as ``order_id`` and the
+        sell order as ``book_order_id``. Unfilled market orders are dropped.
+        """
+        if self.auction is None:
+            raise RuntimeError("no auction in progress")
+        auction, self.auction = self.auction, None
+        result, fills, resting = auction.uncross(reference)
+        if result.volume:
+            self.trades.extend(
+                clock.now() if ts is None else ts,
+                Side.BUY.value,
+                result.price,
+                fills.size,
+                fills.buy_order_id,
+                fills.sell_order_id,
+            )
+            self.last_price = result.price
+        self.load_orders(resting, auction.displays)
+        if self._stop_orders:
+            self._trigger_stops()
+        return result
+
+    def _replenish(self, side: Side, level: PriceLevel, order: IcebergOrder):
+        """Show the next slice of an iceberg's reserve at the back of its
+        level."""
+        visible = min(order.display, order.hidden)
+        order.hidden -= visible
+        level.hidden -= visible
+        self._reserve[side.value] -= visible
+        level.requeue(order, visible)
+
+    def fillable_size(self, side: Side, price=None):
+        """Size an incoming ``side`` order could fill immediately at
+        ``price`` or better (``None`` for no limit), iceberg reserves
+        included."""
+        if self._index is None:
+            return self._walk(side, price, None)[0] + self._hidden(side, price)
+        book_side = Side.SELL if side is Side.BUY else Side.BUY
+        size = self._index.size(book_side, price)
+        if self._reserve[book_side.value]:
+            size += self._hidden(side, price)
+        return size
+
+    def sweep_cost(self, side: Side, size):
+        """Size filled and notional paid by an incoming ``side`` market
+        order of ``size``."""
+        if self._index is not None:
+            book_side = Side.SELL if side is Side.BUY else Side.BUY
+            return self._index.sweep(book_side, size)
+        return self._walk(side, None, size)
+
+    def _crossed(self, side: Side, price):
+        """Levels an incoming ``side`` order at ``price`` (``None`` for no
+        limit) would trade with, best first."""
+        for level in (self.asks if side is Side.BUY else self.bids).values():
+            if price is not None:
+                if side is Side.BUY and level.price > price:
+                    return
+                if side is Side.SELL and level.price < price:
+                    return
+            yield level
+
+    def _hidden(self, side: Side, price):
+        """Iceberg reserve an incoming ``side`` order could reach at
+        ``price`` or better."""
+        return sum(level.hidden for level in self._crossed(side, price))
+
+    def _walk(self, side: Side, price, size):
+        """Level-by-level fallback for ``fillable_size`` and ``sweep_cost``
+        when there is no depth index."""
+        filled = notional = 0
+        for level in self._crossed(side, price):
+            take = level.size if size is None else min(level.size, size - filled)
+            filled += take
+            notional += take * level.price
+            if size is not None and filled == size:
+                break
+        return filled, notional
+
+    def bbo(self):
+        """Best bid price and size and best ask price and size, where size
+        is the level total; an empty side has a NaN price and zero size."""
+        if self.bids:
+            bid = self.bids.peekitem(0)[1]
+            bid_price, bid_size = bid.price, bid.size
+        else:
+            bid_price, bid_size = NAN, 0
+        if self.asks:
+            ask = self.asks.peekitem(0)[1]
+            ask_price, ask_size = ask.price, ask.size
+        else:
+            ask_price, ask_size = NAN, 0
+        return bid_price, bid_size, ask_price, ask_size
 
     def get_best_bid(self):
-        if len(self.bids):
-            return self.bids[0]
+        if self.bids:
+            return self.bids.peekitem(0)[1].head()
         return 0
 
     def get_best_ask(self):
-        if len(self.asks):
-            return self.asks[0]
+        if self.asks:
+            return self.asks.peekitem(0)[1].head()
         return 0
 
+    def dump_orders(self):
+        """Resting orders as a ``RESTING_DTYPE`` array, bids then asks, each
+        in priority order."""
+        rows = [
+            (o.order_id, o.side.value, o.price, o.size, o.remaining, o.ts)
+            for levels in (self.bids, self.asks)
+            for level in levels.values()
+            for o in level
+        ]
+        return np.array(rows, dtype=RESTING_DTYPE)
+
+    def load_orders(self, orders, displays=None):
+        """Rest the orders of a ``dump_orders`` array without matching.
+
+        ``displays`` maps the ids of iceberg orders to their display size;
+        the ``remaining`` of their rows is the full open size, displayed
+        and reserve.
+        """
+        sides, pool = (Side.BUY, Side.SELL), self._pool
+        for order_id, side, price, size, remaining, ts in zip(
+            orders["order_id"].tolist(),
+            orders["side"].tolist(),
+            orders["price"].tolist(),
+            orders["size"].tolist(),
+            orders["remaining"].tolist(),
+            orders["ts"].tolist(),
+        ):
+            display = displays.get(order_id) if displays else None
+            if display is not None:
+                order = IcebergOrder(order_id, sides[side], size, price, display, ts)
+                order.remaining = min(display, remaining)
+                order.hidden = remaining - order.remaining
+            elif pool is None:
+                order = LimitOrder(order_id, sides[side], size, price, ts)
+                order.remaining = remaining
+            else:
+                order = pool.acquire(order_id, sides[side], size, price, ts, remaining)
+            self._rest(order)
+
+    def _top(self, levels, n):
+        return levels.values()[:n]
+
+    def depth(self, n=10):
+        """Aggregated price, size and order count of the best ``n`` levels
+        on each side."""
+        bids = self._top(self.bids, n)
+        asks = self._top(self.asks, n)
+        return Depth(
+            bid_price=np.array([level.price for level in bids], np.float64),
+            bid_size=np.array([level.size for level in bids], np.int64),
+            bid_count=np.array([len(level) for level in bids], np.int64),
+            ask_price=np.array([level.price for level in asks], np.float64),
+            ask_size=np.array([level.size for level in asks], np.int64),
+            ask_count=np.array([len(level) for level in asks], np.int64),
+        )
+
+    def changed_levels(self):
+        """Return the levels that changed since the previous call, bids
+        first, and start a new delta."""
+        rows = []
+        for side, levels, changed in (
+            (Side.BUY, self.bids, self._changed_bids),
+            (Side.SELL, self.asks, self._changed_asks),
+        ):
+            for price in changed:
+                level = levels.get(price)
+                if level is None:
+                    rows.append((side.value, price, 0, 0))
+                else:
+                    rows.append((side.value, price, level.size, len(level)))
+            changed.clear()
+        side, price, size, count = zip(*rows) if rows else ((), (), (), ())
+        return LevelChanges(
+            side=np.array(side, np.uint8),
+            price=np.array(price, np.float64),
+            size=np.array(size, np.int64),
+            count=np.array(count, np.int64),
+        )
+
     def __repr__(self):
         lines = []
-        lines.append("-" * 5 + "OrderBook" + "-" * 5)
+        lines.append("-" * 5 + type(self).__name__ + "-" * 5)
 
         lines.append("\nAsks:")
-        asks = self.asks.copy()
-        while len(asks) > 0:
-            lines.append(str(asks.pop()))
+        for level in reversed(self.asks.values()):
+            for order in reversed(level.orders.values()):
+                lines.append(str(order))
 
         lines.append("\t" * 3 + "Bids:")
-        bids = list(reversed(self.bids.copy()))
-        while len(bids) > 0:
-            lines.append("\t" * 3 + str(bids.pop()))
+        for level in self.bids.values():
+            for order in level:
+                lines.append("\t" * 3 + str(order))
 
         lines.append("-" * 20)
         return "\n".join(lines)
 
     def __len__(self):
-        return len(self.asks) + len(self.bids)
+        return len(self._orders)
+
+
+class BookSnapshot:
+    """Read-only view of a book's levels at ``OrderBook.snapshot`` time,
+    with the book's read methods; ``version`` is the snapshot epoch."""
+
+    __slots__ = "bids", "asks", "_top", "version"
+
+    def __init__(self, bids, asks, top, version):
+        self.bids = bids
+        self.asks = asks
+        self._top = top
+        self.version = version
+
+    # Snapshots answer depth queries by walking levels.
+    _index = None
+
+    bbo = OrderBook.bbo
+    get_best_bid = OrderBook.get_best_bid
+    get_best_ask = OrderBook.get_best_ask
+    depth = OrderBook.depth
+    dump_orders = OrderBook.dump_orders
+    fillable_size = OrderBook.fillable_size
+    sweep_cost = OrderBook.sweep_cost
+    _walk = OrderBook._walk
+    _crossed = OrderBook._crossed
+    _hidden = OrderBook._hidden
+    __repr__ = OrderBook.__repr__
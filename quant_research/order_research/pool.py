@@ -0,0 +1,82 @@
+"""Recycled ``LimitOrder`` objects for the book's resting orders.
+
+An ``OrderBook`` built with a ``LimitOrderPool`` takes the orders it
+creates itself (from ``process_orders`` rows and ``load_orders``) from the
+pool's free list and returns them when they are filled or cancelled. In
+steady state it then allocates no order objects at all, which keeps the
+garbage collector's generation-0 counter still. Orders passed to
+``process_order`` belong to the caller and are never recycled.
+
+Trades need no pool: ``TradeLog`` stores them in columns and only builds
+``Trade`` objects when they are read back one by one.
+"""
+
+from typing import NamedTuple
+
+from quant_research.order_research.order import LimitOrder, TimeInForce
+
+
+class PoolStats(NamedTuple):
+    """Occupancy of a pool. ``allocated`` counts the objects created beyond
+    the preallocated ones, ``reused`` the acquisitions served from the free
+    list."""
+
+    capacity: int
+    free: int
+    in_use: int
+    allocated: int
+    reused: int
+
+
+class PooledLimitOrder(LimitOrder):
+    """A ``LimitOrder`` owned by a ``LimitOrderPool``."""
+
+    __slots__ = ()
+
+
+class LimitOrderPool:
+    """Free list of up to ``capacity`` preallocated ``PooledLimitOrder``
+    objects. When it runs dry new objects are created, and objects released
+    while the free list is full are left to the garbage collector."""
+
+    __slots__ = "capacity", "in_use", "allocated", "reused", "_free"
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        new = PooledLimitOrder.__new__
+        self._free = [new(PooledLimitOrder) for _ in range(capacity)]
+        self.in_use = 0
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, order_id, side, size, price, ts, remaining):
+        """A GTC limit order with the given fields."""
+        free = self._free
+        if free:
+            order = free.pop()
+            self.reused += 1
+        else:
+            order = PooledLimitOrder.__new__(PooledLimitOrder)
+            self.allocated += 1
+        order.order_id = order_id
+        order.side = side
+        order.size = size
+        order.remaining = remaining
+        order.price = price
+        order.tif = TimeInForce.GTC
+        order.seq = None
+        order.ts = ts
+        self.in_use += 1
+        return order
+
+    def release(self, order):
+        """Return ``order`` to the free list if it came from a pool."""
+        if order.__class__ is PooledLimitOrder:
+            self.in_use -= 1
+            if len(self._free) < self.capacity:
+                self._free.append(order)
+
+    def stats(self):
+        return PoolStats(
+            self.capacity, len(self._free), self.in_use, self.allocated, self.reused
+        )
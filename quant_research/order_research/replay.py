@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType, Side
+
+# On-disk events are headerless, fixed-width ``ORDER_DTYPE`` records.
+EVENT_DTYPE = ORDER_DTYPE
+
+# ITCH-style message codes accepted in CSV input.
+EVENT_CODES = {
+    "A": OrderType.LIMIT,
+    "X": OrderType.CANCEL,
+    "U": OrderType.MODIFY,
+    "M": OrderType.MARKET,
+    "P": OrderType.TRADE,
+}
+SIDE_CODES = {"B": Side.BUY.value, "S": Side.SELL.value}
+
+CSV_COLUMNS = ("ts", "type", "side", "order_id", "price", "size")
+
+
+def write_events(path, events, append=False):
+    """Write an array of events to ``path`` as raw ``EVENT_DTYPE`` records."""
+    with open(path, "ab" if append else "wb") as f:
+        np.ascontiguousarray(events, dtype=EVENT_DTYPE).tofile(f)
+
+
+def open_events(path, start=0):
+    """Memory-map the events in ``path`` from record ``start`` on."""
+    n = os.path.getsize(path) // EVENT_DTYPE.itemsize
+    if start >= n:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return np.memmap(
+        path,
+        dtype=EVENT_DTYPE,
+        mode="r",
+        offset=start * EVENT_DTYPE.itemsize,
+        shape=(n - start,),
+    )
+
+
+def _codes(column, mapping, default=None):
+    """Translate a column of letter or integer code strings."""
+    lookup = {str(int(code)): code for code in mapping.values()}
+    lookup.update(mapping)
+    if default is not None:
+        lookup[""] = default
+    codes = column.str.strip().str.upper().map(lookup)
+    if codes.isna().any():
+        raise ValueError(f"unknown code {column[codes.isna()].iloc[0]!r}")
+    return codes
+
+
+def csv_to_events(csv_path, out_path, chunk_rows=1 << 20):
+    """Convert a CSV of order events to the binary format and return the
+    number of events written.
+
+    The CSV needs a header with ``CSV_COLUMNS``. ``type`` is one of the
+    ``EVENT_CODES`` letters or an ``OrderType`` value and ``side`` is
+    ``B``/``S`` or a ``Side`` value. Empty sides, prices and sizes are read
+    as 0, except that an empty price on a modify is kept as NaN so the
+    order keeps its price.
+    """
+    import pandas as pd
+
+    n = 0
+    with open(out_path, "wb"):
+        pass
+    for chunk in pd.read_csv(
+        csv_path,
+        chunksize=chunk_rows,
+        dtype={"type": str, "side": str},
+        keep_default_na=False,
+        na_values={"price": [""], "size": [""]},
+    ):
+        missing = set(CSV_COLUMNS) - set(chunk.columns)
+        if missing:
+            raise ValueError(f"missing CSV columns: {sorted(missing)}")
+        events = np.zeros(len(chunk), dtype=EVENT_DTYPE)
+        events["ts"] = chunk["ts"]
+        events["type"] = _codes(chunk["type"], EVENT_CODES)
+        events["side"] = _codes(chunk["side"], SIDE_CODES, Side.BUY.value)
+        events["order_id"] = chunk["order_id"]
+        price = chunk["price"].to_numpy(np.float64)
+        missing = np.isnan(price) & (events["type"] != OrderType.MODIFY)
+        events["price"] = np.where(missing, 0.0, price)
+        events["size"] = chunk["size"].fillna(0)
+        write_events(out_path, events, append=True)
+        n += len(events)
+    return n
+
+
+def replay(book, path, batch_size=1 << 16, start=0, on_batch=None):
+    """Feed the events in ``path`` to ``book.process_orders`` in batches of
+    ``batch_size`` and return the number of events replayed.
+
+    ``on_batch(events, fills)`` is called after every batch.
+    """
+    events = open_events(path, start)
+    for i in range(0, len(events), batch_size):
+        batch = events[i : i + batch_size]
+        fills = book.process_orders(batch)
+        if on_batch is not None:
+            on_batch(batch, fills)
+    return len(events)
@@ -0,0 +1,147 @@
+"""Periodic market-by-price snapshots as dense tensors.
+
+A ``DepthSampler`` feeds ``ORDER_DTYPE`` batches to a book, stopping at each
+sample point to copy the book's ``depth`` (its maintained per-level size and
+order count, with no walk over orders) into a preallocated
+``(time, levels, features)`` array. The array can be a ``.npy`` file mapped
+into memory, so a long session is written straight to disk and read back
+with ``np.load(path, mmap_mode="r")``.
+"""
+
+import os
+
+import numpy as np
+
+# Feature axis of the sample tensor; missing levels have a NaN price and
+# zero size and count.
+FEATURES = ("bid_price", "bid_size", "bid_count", "ask_price", "ask_size", "ask_count")
+
+
+class DepthSampler:
+    """Samples the best ``levels`` levels of ``book`` every ``every``
+    events, or every ``interval`` units of event ``ts``.
+
+    Samples taken by event count are stamped with the ``ts`` of the last
+    event processed. Interval samples are taken on the grid of multiples of
+    ``interval`` and show the book after every event with an earlier ``ts``;
+    a gap in the events repeats the last state so the grid stays dense.
+
+    ``capacity`` is the number of samples; with ``path`` the tensor is
+    created as a ``.npy`` memory map there and the sample timestamps next to
+    it with a ``.ts.npy`` suffix.
+    """
+
+    __slots__ = (
+        "book",
+        "levels",
+        "every",
+        "interval",
+        "data",
+        "ts",
+        "count",
+        "_since",
+        "_next",
+        "_empty",
+    )
+
+    def __init__(
+        self,
+        book,
+        capacity,
+        levels=10,
+        every=None,
+        interval=None,
+        path=None,
+        dtype=np.float64,
+    ):
+        if (every is None) == (interval is None):
+            raise ValueError("pass exactly one of every and interval")
+        self.book = book
+        self.levels = levels
+        self.every = every
+        self.interval = interval
+        shape = (capacity, levels, len(FEATURES))
+        if path is None:
+            self.data = np.empty(shape, dtype)
+            self.ts = np.empty(capacity, np.int64)
+        else:
+            path = os.fspath(path)
+            open_memmap = np.lib.format.open_memmap
+            self.data = open_memmap(path, "w+", dtype, shape)
+            ts_path = os.path.splitext(path)[0] + ".ts.npy"
+            self.ts = open_memmap(ts_path, "w+", np.int64, (capacity,))
+        self.count = 0
+        self._since = 0
+        self._next = None
+        self._empty = np.zeros((levels, len(FEATURES)), dtype)
+        self._empty[:, [0, 3]] = np.nan
+
+    def process_orders(self, batch):
+        """Process ``batch`` with the book, sampling at every sample point
+        it passes; return the number of samples taken.
+
+        A batch with more sample points than there is capacity left raises
+        ``IndexError`` without being processed.
+        """
+        n = len(batch)
+        if not n:
+            return 0
+        ts = batch["ts"]
+        since, next_ = self._since, self._next
+        if self.every is not None:
+            cuts = np.arange(self.every - since, n + 1, self.every)
+            stamps = ts[cuts - 1]
+            since = (since + n) % self.every
+        else:
+            interval = self.interval
+            if next_ is None:
+                next_ = (int(ts[0]) // interval + 1) * interval
+            stamps = np.arange(next_, int(ts[-1]) + 1, interval)
+            cuts = np.searchsorted(ts, stamps, "left")
+            if len(stamps):
+                next_ = int(stamps[-1]) + interval
+        # Refuse a batch that would overflow before any of it is processed.
+        self._check(len(stamps))
+        self._since, self._next = since, next_
+
+        book, start, taken = self.book, 0, self.count
+        # Consecutive grid points without events between them share a cut.
+        cuts, first, repeats = np.unique(cuts, return_index=True, return_counts=True)
+        for cut, i, k in zip(cuts.tolist(), first.tolist(), repeats.tolist()):
+            if cut > start:
+                book.process_orders(batch[start:cut])
+                start = cut
+            self._sample(stamps[i : i + k])
+        if start < n:
+            book.process_orders(batch[start:])
+        return self.count - taken
+
+    def sample(self, ts=0):
+        """Take a sample of the book as it is now."""
+        self._sample(np.array([ts]))
+
+    def _check(self, k):
+        if self.count + k > len(self.data):
+            raise IndexError(f"sampler is full ({len(self.data)} samples)")
+
+    def _sample(self, stamps):
+        i, k = self.count, len(stamps)
+        self._check(k)
+        depth = self.book.depth(self.levels)
+        row = self.data[i]
+        row[:] = self._empty
+        for feature, values in enumerate(depth):
+            row[: len(values), feature] = values
+        self.data[i + 1 : i + k] = row
+        self.ts[i : i + k] = stamps
+        self.count = i + k
+
+    def samples(self):
+        """The samples taken so far and their timestamps."""
+        return self.data[: self.count], self.ts[: self.count]
+
+    def flush(self):
+        """Write a memory-mapped tensor out to its files."""
+        for array in (self.data, self.ts):
+            if isinstance(array, np.memmap):
+                array.flush()
@@ -0,0 +1,38 @@
+"""Creating and attaching to ``multiprocessing.shared_memory`` segments.
+
+A segment belongs to the process that creates it, which unlinks it when it
+is done. Processes that only attach must not unlink it, but before Python
+3.13 attaching registers the segment with the resource tracker, which
+unlinks it when the attaching process exits. ``attach`` undoes that
+registration, except in the creating process itself.
+"""
+
+from multiprocessing import resource_tracker, shared_memory
+
+# Segments created by this process; attaching to them must leave their
+# resource tracker registration alone.
+_created = set()
+
+
+def create(name, size):
+    """Create a segment of ``size`` bytes, named ``name`` or at random."""
+    shm = shared_memory.SharedMemory(name, create=True, size=size)
+    _created.add(shm._name)
+    return shm
+
+
+def attach(name):
+    """Map the existing segment ``name`` without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        if shm._name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def unlink(shm):
+    """Remove a segment created by ``create``."""
+    _created.discard(shm._name)
+    shm.unlink()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.order import OrderType
+from quant_research.order_research.orderbook import OrderBook
+
+BOOKS = [OrderBook, lambda: LadderOrderBook(1, 90, 110)]
+
+# Probability of each event type in a ``random_batch``.
+FLOW = {
+    OrderType.LIMIT: 0.5,
+    OrderType.MARKET: 0.1,
+    OrderType.CANCEL: 0.2,
+    OrderType.MODIFY: 0.2,
+}
+LIMITS = {OrderType.LIMIT: 1.0}
+
+
+@pytest.fixture(params=BOOKS, ids=["sorted", "ladder"])
+def book_type(request):
+    return request.param
+
+
+def random_batch(n, start=0, seed=3, flow=FLOW):
+    """``n`` random ``ORDER_DTYPE`` events priced 90 to 110, with order ids
+    and timestamps counting up from ``start``. Cancels and modifies name
+    random ids of the batch."""
+    rng = np.random.default_rng(seed)
+    batch = np.zeros(n, dtype=ORDER_DTYPE)
+    batch["order_id"] = np.arange(start, start + n)
+    batch["type"] = rng.choice(list(flow), n, p=list(flow.values()))
+    batch["side"] = rng.integers(0, 2, n)
+    batch["price"] = rng.integers(90, 111, n)
+    batch["size"] = rng.integers(1, 100, n)
+    batch["ts"] = np.arange(start, start + n)
+    cancels = np.isin(batch["type"], [OrderType.CANCEL, OrderType.MODIFY])
+    batch["order_id"][cancels] = start + rng.integers(0, n, cancels.sum())
+    return batch
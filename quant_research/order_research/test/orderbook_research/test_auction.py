@@ -0,0 +1,167 @@
+from time import perf_counter
+
+import numpy as np
+import pytest
+
+from quant_research.order_research.auction import equilibrium
+from quant_research.order_research.order import (
+    CancelOrder,
+    IcebergOrder,
+    LimitOrder,
+    MarketOrder,
+    ModifyOrder,
+    Side,
+    TimeInForce,
+)
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.test.orderbook_research.conftest import (
+    LIMITS,
+    random_batch,
+)
+
+
+def test_equilibrium_maximises_volume_then_minimises_imbalance():
+    # Bids 10@102, 10@101, 10@100; asks 15@100, 10@101, 10@103.
+    result = equilibrium(
+        np.array([102.0, 101, 100]),
+        np.array([10, 10, 10]),
+        np.array([100.0, 101, 103]),
+        np.array([15, 10, 10]),
+    )
+    assert (result.price, result.volume, result.imbalance) == (101, 20, -5)
+
+    # Equal volume and imbalance at 100 and 101: buyers are left over at
+    # both, so the higher price wins.
+    result = equilibrium(
+        np.array([np.inf, 101]), np.array([10, 5]), np.array([100.0]), np.array([5])
+    )
+    assert (result.price, result.volume, result.imbalance) == (101, 5, 10)
+
+    assert (
+        equilibrium(
+            np.array([99.0]), np.array([5]), np.array([100.0]), np.array([5])
+        ).volume
+        == 0
+    )
+
+
+def max_volume(orders):
+    """Brute-force executable volume over every price, for ``(side, price,
+    size)`` rows with market orders priced at +/-inf."""
+    prices = {price for _, price, _ in orders if np.isfinite(price)}
+    return max(
+        min(
+            sum(size for side, p, size in orders if side == 0 and p >= price),
+            sum(size for side, p, size in orders if side == 1 and p <= price),
+        )
+        for price in prices
+    )
+
+
+def test_uncross_executes_at_equilibrium_and_rests_the_rest(book_type):
+    batch = random_batch(2000, seed=0, flow=LIMITS)
+    ob = book_type()
+    ob.process_orders(batch[:100])
+    resting = ob.dump_orders()
+    start = ob.trades.count
+    ob.begin_auction()
+    assert len(ob) == 0
+    assert len(ob.process_orders(batch[100:]).size) == 0
+    ob.process_order(MarketOrder(5000, Side.BUY, 500))
+    result = ob.uncross()
+
+    orders = list(zip(resting["side"], resting["price"], resting["remaining"]))
+    orders += list(zip(batch["side"][100:], batch["price"][100:], batch["size"][100:]))
+    orders.append((0, np.inf, 500))
+    assert result.volume == max_volume(orders)
+
+    fills = ob.trades.fills(start)
+    assert (fills.price == result.price).all()
+    assert fills.size.sum() == result.volume
+    assert ob.get_best_bid().price < ob.get_best_ask().price
+    assert ob.auction is None
+    assert 5000 not in ob._orders
+
+
+def test_cancels_and_amendments_during_the_call(book_type):
+    ob = book_type()
+    ob.process_order(LimitOrder(1, Side.SELL, 10, 100))
+    ob.begin_auction()
+    ob.process_order(LimitOrder(2, Side.SELL, 10, 100))
+    ob.process_order(LimitOrder(3, Side.BUY, 15, 101))
+    ob.process_order(LimitOrder(4, Side.BUY, 50, 99))
+    ob.process_order(CancelOrder(4))
+    # Raising the size sends order 1 behind order 2.
+    ob.process_order(ModifyOrder(1, 12))
+    result = ob.uncross()
+    assert (result.price, result.volume, result.imbalance) == (100, 15, -7)
+    assert [(t.order_id, t.book_order_id, t.size) for t in ob.trades] == [
+        (3, 2, 10),
+        (3, 1, 5),
+    ]
+    assert ob.asks[100].size == 7
+    assert 4 not in ob._orders
+
+    ob.process_order(MarketOrder(5, Side.BUY, 7))
+    assert not ob.asks
+
+
+def test_amendments_during_the_call_fold_in_order(book_type):
+    ob = book_type()
+    ob.begin_auction()
+    # A later amendment without a price keeps the one set before it.
+    ob.process_order(LimitOrder(1, Side.SELL, 10, 100))
+    ob.process_order(ModifyOrder(1, 10, 101))
+    ob.process_order(ModifyOrder(1, 5))
+    # Raising and then cutting the size still loses priority.
+    ob.process_order(LimitOrder(2, Side.BUY, 10, 99))
+    ob.process_order(LimitOrder(3, Side.BUY, 10, 99))
+    ob.process_order(ModifyOrder(2, 20))
+    ob.process_order(ModifyOrder(2, 8))
+    # Nothing brings back a cancelled order.
+    ob.process_order(LimitOrder(4, Side.BUY, 10, 98))
+    ob.process_order(CancelOrder(4))
+    ob.process_order(ModifyOrder(4, 20))
+    result = ob.uncross()
+    assert result.volume == 0
+    assert [(o.order_id, o.remaining) for o in ob.asks[101]] == [(1, 5)]
+    assert [(o.order_id, o.remaining) for o in ob.bids[99]] == [(3, 10), (2, 8)]
+    assert 4 not in ob._orders
+
+
+def test_icebergs_keep_their_reserve_through_the_call(book_type):
+    ob = book_type()
+    ob.process_order(IcebergOrder(1, Side.BUY, 100, 100, 10))
+    ob.begin_auction()
+    ob.process_order(IcebergOrder(2, Side.SELL, 50, 101, 5))
+    ob.process_order(LimitOrder(3, Side.SELL, 30, 100))
+    result = ob.uncross()
+    # The whole iceberg took part, not just its displayed slice.
+    assert (result.price, result.volume) == (100, 30)
+    bid, ask = ob.get_best_bid(), ob.get_best_ask()
+    assert isinstance(bid, IcebergOrder)
+    assert (bid.order_id, bid.remaining, bid.hidden) == (1, 10, 60)
+    assert isinstance(ask, IcebergOrder)
+    assert (ask.order_id, ask.remaining, ask.hidden) == (2, 5, 45)
+
+
+def test_ioc_and_fok_orders_are_refused_during_the_call(book_type):
+    ob = book_type()
+    ob.begin_auction()
+    for tif in (TimeInForce.IOC, TimeInForce.FOK):
+        with pytest.raises(ValueError):
+            ob.process_order(LimitOrder(1, Side.BUY, 10, 100, tif=tif))
+    assert len(ob.auction) == 0
+
+
+def test_uncross_of_a_large_auction_is_vectorised():
+    ob = OrderBook()
+    ob.begin_auction()
+    ob.process_orders(random_batch(500_000, seed=1, flow=LIMITS))
+    start = perf_counter()
+    result = ob.uncross()
+    load = perf_counter()
+    assert result.volume > 0
+    # Resting the residual goes through the regular per-order path; the
+    # uncross itself is a handful of sorts and cumulative sums.
+    assert load - start < 5
@@ -0,0 +1,131 @@
+import numpy as np
+
+from quant_research.order_research.backtest import (
+    Backtest,
+    Latency,
+    Strategy,
+    backtest,
+    run_parallel,
+)
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType, Side
+from quant_research.order_research.replay import write_events
+from quant_research.order_research.test.orderbook_research.conftest import (
+    random_batch,
+)
+
+
+def events(*rows):
+    return np.array(list(rows), dtype=ORDER_DTYPE)
+
+
+class Passive(Strategy):
+    """Joins the bid once, then pulls the rest and sells its fill back into
+    the bid."""
+
+    def __init__(self, price=99.0, size=5):
+        self.price = price
+        self.size = size
+        self.order_id = None
+
+    def on_events(self, ctx, events, fills):
+        if self.order_id is None:
+            self.order_id = ctx.buy(self.size, self.price)
+
+    def on_fills(self, ctx, fills):
+        if ctx.position > 0 and fills["order_id"][-1] == self.order_id:
+            ctx.cancel(self.order_id)
+            ctx.sell(ctx.position)
+
+
+def test_passive_fill_position_cash_and_pnl():
+    tape = events(
+        (1, OrderType.LIMIT, Side.BUY.value, 99.0, 10, 1),
+        (2, OrderType.LIMIT, Side.SELL.value, 101.0, 10, 2),
+        # The strategy's bid arrives behind order 1.
+        (3, OrderType.MARKET, Side.SELL.value, 0.0, 12, 5),
+        (4, OrderType.LIMIT, Side.BUY.value, 100.0, 10, 6),
+    )
+    result = backtest(Passive(), tape, latency=1, batch_size=1)
+    fills = result.fills
+    assert list(fills["side"]) == [Side.BUY.value, Side.SELL.value]
+    assert list(fills["size"]) == [2, 2]
+    assert list(fills["price"]) == [99.0, 100.0]
+    assert list(fills["position"]) == [2, 0]
+    assert list(fills["cash"]) == [-198.0, 2.0]
+    assert result.position == 0
+    assert result.cash == 2.0
+    assert result.pnl == 2.0
+
+
+def test_self_trade_books_both_legs():
+    tape = events(
+        (1, OrderType.LIMIT, Side.SELL.value, 101.0, 10, 1),
+        (2, OrderType.LIMIT, Side.SELL.value, 102.0, 10, 2),
+    )
+
+    class Cross(Strategy):
+        def on_events(self, ctx, events, fills):
+            if ctx.now == 1:
+                self.bid = ctx.buy(3, 99.0)
+            else:
+                self.ask = ctx.sell(3)
+
+    strategy = Cross()
+    result = backtest(strategy, tape, batch_size=1)
+    fills = result.fills
+    assert list(fills["order_id"]) == [strategy.ask, strategy.bid]
+    assert list(fills["side"]) == [Side.SELL.value, Side.BUY.value]
+    assert list(fills["size"]) == [3, 3]
+    assert list(fills["position"]) == [-3, 0]
+    assert result.position == 0
+    assert result.cash == 0
+
+
+def test_latency_delays_arrival_past_market_events():
+    tape = events(
+        (1, OrderType.LIMIT, Side.SELL.value, 101.0, 10, 1),
+        (2, OrderType.MARKET, Side.BUY.value, 0.0, 5, 5),
+        (3, OrderType.MARKET, Side.BUY.value, 0.0, 5, 11),
+    )
+
+    class Lift(Strategy):
+        def on_events(self, ctx, events, fills):
+            if ctx.now == 1:
+                ctx.buy(5)
+
+    # Submitted at 1 and arriving at 5, after the market order at 5.
+    result = backtest(Lift(), tape, latency=4, batch_size=1)
+    assert list(result.fills["ts"]) == [5]
+    assert result.fills["price"][0] == 101
+    assert Backtest(Lift(), tape, latency=10, batch_size=1).run().position == 0
+
+    latency = Latency(base=3, jitter=2, block=4)
+    delays = [latency(0) for _ in range(10)]
+    assert min(delays) >= 3 and len(set(delays)) > 1
+
+
+class Quoter(Strategy):
+    def __init__(self, offset):
+        self.offset = offset
+
+    def on_events(self, ctx, events, fills):
+        bid, _, ask, _ = ctx.book.bbo()
+        if bid == bid:
+            ctx.buy(1, bid - self.offset)
+            ctx.sell(1, ask + self.offset)
+
+
+def test_run_parallel_matches_serial(tmp_path):
+    tape = random_batch(5000, seed=3)
+    tape["ts"] = np.arange(len(tape))
+    path = tmp_path / "events.bin"
+    write_events(path, tape)
+    params = [{"offset": 0}, {"offset": 1}]
+    results = run_parallel(Quoter, params, str(path), processes=2, batch_size=100)
+    for param, result in zip(params, results):
+        expected = backtest(Quoter(**param), tape, batch_size=100)
+        assert result.events == len(tape)
+        assert len(result.fills)
+        assert result.pnl == expected.pnl
+        np.testing.assert_array_equal(result.fills, expected.fills)
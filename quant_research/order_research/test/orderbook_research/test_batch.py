@@ -0,0 +1,69 @@
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import LimitOrder, OrderType, Side
+from quant_research.order_research.orderbook import OrderBook
+
+
+def make_batch(rows):
+    batch = np.zeros(len(rows), dtype=ORDER_DTYPE)
+    for i, row in enumerate(rows):
+        batch[i] = row
+    return batch
+
+
+def test_process_orders_matches_whole_batch():
+    ob = OrderBook()
+    fills = ob.process_orders(
+        make_batch(
+            [
+                (1, OrderType.LIMIT, Side.SELL.value, 101.0, 10, 1),
+                (2, OrderType.LIMIT, Side.SELL.value, 102.0, 10, 2),
+                (3, OrderType.LIMIT, Side.BUY.value, 99.0, 10, 3),
+                (4, OrderType.CANCEL, 0, 0.0, 0, 4),
+                (5, OrderType.LIMIT, Side.BUY.value, 101.0, 15, 5),
+                (6, OrderType.MARKET, Side.SELL.value, 0.0, 50, 6),
+            ]
+        )
+    )
+
+    assert fills.ts.tolist() == [5, 6, 6]
+    assert fills.side.tolist() == [Side.BUY.value, Side.SELL.value, Side.SELL.value]
+    assert fills.price.tolist() == [101.0, 101.0, 99.0]
+    assert fills.size.tolist() == [10, 5, 10]
+    assert fills.order_id.tolist() == [5, 6, 6]
+    assert fills.book_order_id.tolist() == [1, 5, 3]
+
+    assert len(ob) == 1
+    assert ob.get_best_ask().order_id == 2
+    assert ob.get_best_bid() == 0
+
+
+def test_process_orders_agrees_with_process_order():
+    rng = np.random.default_rng(7)
+    n = 2000
+    batch = np.zeros(n, dtype=ORDER_DTYPE)
+    batch["order_id"] = np.arange(n)
+    batch["side"] = rng.integers(0, 2, n)
+    batch["price"] = rng.integers(95, 106, n)
+    batch["size"] = rng.integers(1, 100, n)
+    batch["ts"] = np.arange(n)
+
+    ob = OrderBook()
+    fills = ob.process_orders(batch)
+
+    reference = OrderBook()
+    for row in batch:
+        reference.process_order(
+            LimitOrder(
+                int(row["order_id"]),
+                Side(int(row["side"])),
+                int(row["size"]),
+                float(row["price"]),
+                int(row["ts"]),
+            )
+        )
+
+    assert fills.size.tolist() == [t.size for t in reference.trades]
+    assert fills.book_order_id.tolist() == [t.book_order_id for t in reference.trades]
+    assert len(ob) == len(reference)
@@ -0,0 +1,67 @@
+import math
+import multiprocessing
+import os
+
+from quant_research.order_research.bbo import BBOPublisher, BBOReader
+from quant_research.order_research.compact import CompactOrderBook
+from quant_research.order_research.order import LimitOrder, Side
+from quant_research.order_research.test.orderbook_research.test_orderbook import (
+    make_book,
+)
+
+
+def test_publish_and_read():
+    publisher = BBOPublisher(capacity=4)
+    try:
+        reader = BBOReader(publisher.name)
+        assert reader.read("ES") is None
+
+        publisher.publish("ES", make_book(), ts=7)
+        bbo = reader.read("ES")
+        assert bbo == (99, 10, 101, 15, 7, 1)
+
+        compact = CompactOrderBook(1, 90, 110)
+        compact.process_order(LimitOrder(1, Side.SELL, 3, 105))
+        publisher.publish("NQ", compact, ts=8)
+        bbo = reader.read("NQ")
+        assert math.isnan(bbo.bid_price)
+        assert bbo[1:] == (0, 105, 3, 8, 1)
+        assert reader.symbols() == ["ES", "NQ"]
+        reader.close()
+    finally:
+        publisher.close()
+        publisher.unlink()
+
+
+def _publish(name, n, ready, done):
+    publisher = BBOPublisher(name, capacity=1)
+    for i in range(n):
+        publisher.update("X", i, i, i + 1, i, i)
+        if i == 0:
+            ready.set()
+    done.wait()
+    publisher.close()
+    publisher.unlink()
+
+
+def test_readers_never_see_torn_records():
+    n = 200_000
+    name = f"bbo_test_{os.getpid()}"
+    ready, done = multiprocessing.Event(), multiprocessing.Event()
+    writer = multiprocessing.Process(target=_publish, args=(name, n, ready, done))
+    writer.start()
+    try:
+        assert ready.wait(30)
+        reader = BBOReader(name)
+        last = 0
+        while last < n - 1 and writer.is_alive():
+            bbo = reader.read("X")
+            assert bbo.bid_size == bbo.ask_size == bbo.bid_price == bbo.ts
+            assert bbo.ask_price == bbo.bid_price + 1
+            assert bbo.bid_size >= last
+            last = bbo.bid_size
+        assert last == n - 1
+        reader.close()
+    finally:
+        done.set()
+        writer.join()
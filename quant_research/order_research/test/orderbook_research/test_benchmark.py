@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from quant_research.order_research.benchmark import BOOKS, PROFILES, main, run
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_books_agree_on_every_profile(profile):
+    results = [run(profile, book, n=2000, seed=1) for book in BOOKS]
+    assert len({(r["trades"], r["resting_orders"]) for r in results}) == 1
+    latency = results[0]["latency_ns"]
+    assert latency["p50"] <= latency["p99"] <= latency["p99.9"] <= latency["max"]
+    assert sum(latency["histogram"].values()) == results[0]["orders"]
+    assert all(r["peak_memory_kb"] > 0 for r in results)
+
+
+def test_main_writes_json(tmp_path):
+    out = tmp_path / "results.json"
+    main(
+        [
+            "--profile",
+            "cancel_heavy",
+            "--book",
+            "sorted",
+            "-n",
+            "500",
+            "--out",
+            str(out),
+        ]
+    )
+    (result,) = json.loads(out.read_text())
+    assert result["profile"] == "cancel_heavy"
+    assert result["orders_per_second"] > 0
@@ -0,0 +1,109 @@
+import numpy as np
+
+from quant_research.order_research.compact import CompactOrderBook
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.order import (
+    CancelOrder,
+    LimitOrder,
+    MarketOrder,
+    Side,
+    TimeInForce,
+)
+from quant_research.order_research.order_store import OrderStore
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.test.orderbook_research.conftest import (
+    random_batch,
+)
+
+
+def test_store_recycles_slots():
+    store = OrderStore(capacity=2)
+    a = store.alloc(1, 0, 5, 10, 10, 0)
+    b = store.alloc(2, 0, 5, 10, 10, 0)
+    store.release(a)
+    assert store.alloc(3, 1, 6, 10, 10, 0) == a
+    c = store.alloc(4, 1, 6, 10, 10, 0)
+    assert store.capacity == 4
+    assert sorted(store.live().tolist()) == sorted([a, b, c])
+    assert len(store) == 3
+
+
+def test_matches_like_order_book():
+    batch = random_batch(5000)
+    compact = CompactOrderBook(1, 80, 120, capacity=16)
+    reference = OrderBook()
+    fills = compact.process_orders(batch)
+    expected = reference.process_orders(batch)
+
+    for name in ("size", "price", "order_id", "book_order_id"):
+        assert getattr(fills, name).tolist() == getattr(expected, name).tolist()
+    assert len(compact) == len(reference)
+    assert compact.get_best_bid().order_id == reference.get_best_bid().order_id
+    assert compact.get_best_ask().remaining == reference.get_best_ask().remaining
+
+
+def test_process_order_objects():
+    ob = CompactOrderBook(0.5, 90, 110)
+    ob.process_order(LimitOrder(1, Side.SELL, 10, 100.5))
+    ob.process_order(LimitOrder(2, Side.SELL, 10, 100.5))
+    ob.process_order(LimitOrder(3, Side.SELL, 10, 101))
+    ob.process_order(CancelOrder(1))
+    order = MarketOrder(4, Side.BUY, 15)
+    ob.process_order(order)
+
+    assert order.remaining == 0
+    assert [(t.book_order_id, t.price, t.size) for t in ob.trades] == [
+        (2, 100.5, 10),
+        (3, 101.0, 5),
+    ]
+    best = ob.get_best_ask()
+    assert (best.order_id, best.price, best.remaining) == (3, 101.0, 5)
+    assert ob.get_best_bid() == 0
+
+
+def test_snapshot_restore():
+    batch = random_batch(2000)
+    ob = CompactOrderBook(1, 80, 120)
+    ob.process_orders(batch[:1000])
+    state = ob.snapshot()
+
+    restored = CompactOrderBook(1, 80, 120)
+    restored.restore(state)
+    assert len(restored) == len(ob)
+
+    tail = batch[1000:]
+    assert (
+        restored.process_orders(tail).size.tolist()
+        == ob.process_orders(tail).size.tolist()
+    )
+
+
+def test_fillable_size_sweep_cost_and_time_in_force():
+    batch = random_batch(2000)
+    compact, ladder = CompactOrderBook(1, 90, 110), LadderOrderBook(1, 90, 110)
+    reference = OrderBook()
+    for chunk in np.array_split(batch, 20):
+        for ob in (compact, ladder, reference):
+            ob.process_orders(chunk)
+        for side in Side:
+            for price in (None, 95, 100, 105):
+                expected = reference.fillable_size(side, price)
+                assert compact.fillable_size(side, price) == expected
+                assert ladder.fillable_size(side, price) == expected
+            for size in (1, 150, 10_000):
+                expected = reference.sweep_cost(side, size)
+                assert compact.sweep_cost(side, size) == expected
+                assert ladder.sweep_cost(side, size) == expected
+
+    ask = compact.get_best_ask()
+    fok = LimitOrder(
+        10_000, Side.BUY, ask.remaining + 10**6, ask.price, tif=TimeInForce.FOK
+    )
+    compact.process_order(fok)
+    assert fok.remaining == fok.size
+    ioc = LimitOrder(
+        10_001, Side.BUY, ask.remaining + 10**6, ask.price, tif=TimeInForce.IOC
+    )
+    compact.process_order(ioc)
+    assert ioc.remaining < ioc.size
+    assert 10_001 not in compact._slots
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from quant_research.order_research.flow import hawkes_times, order_flow, poisson_times
+from quant_research.order_research.order import OrderType, Side
+
+
+def test_flow_is_reproducible_per_symbol():
+    a = order_flow(5000, seed=7, symbol="AAPL")
+    # Compared as bytes since amendments carry NaN prices.
+    assert a.tobytes() == order_flow(5000, seed=7, symbol="AAPL").tobytes()
+    assert a.tobytes() != order_flow(5000, seed=7, symbol="MSFT").tobytes()
+    assert a.tobytes() != order_flow(5000, seed=8, symbol="AAPL").tobytes()
+    assert len(a) == 5000
+    assert (np.diff(a["ts"]) >= 0).all()
+
+
+def test_cancels_follow_their_adds_at_the_requested_ratio():
+    events = order_flow(200_000, cancel_to_trade=20, market_share=0.03)
+    kind = events["type"]
+    adds = events[kind == OrderType.LIMIT]
+    later = events[(kind == OrderType.CANCEL) | (kind == OrderType.MODIFY)]
+    # Every cancel or amendment targets a distinct, earlier limit order.
+    assert len(np.unique(later["order_id"])) == len(later)
+    add_ts = dict(zip(adds["order_id"].tolist(), adds["ts"].tolist()))
+    assert all(add_ts[i] < t for i, t in zip(later["order_id"], later["ts"]))
+    ratio = len(later) / (kind == OrderType.MARKET).sum()
+    assert ratio == pytest.approx(20, rel=0.1)
+
+    # Passive prices: power-law distance from the mid, on the right side.
+    mid_flow = order_flow(100_000, volatility=0, market_share=0, cancel_to_trade=0)
+    distance = np.where(
+        mid_flow["side"] == Side.BUY.value,
+        1000 - mid_flow["price"],
+        mid_flow["price"] - 1000,
+    )
+    assert distance.min() == 1
+    # P(d >= 4) = 4 ** -1.5 = 1/8.
+    assert (distance >= 4).mean() == pytest.approx(1 / 8, rel=0.1)
+
+
+def test_hawkes_arrivals_cluster():
+    rng = np.random.default_rng(0)
+    windows = np.arange(0, 0.9, 0.001)
+
+    def dispersion(times):
+        counts = np.histogram(times, windows)[0]
+        return counts.var() / counts.mean()
+
+    poisson = poisson_times(rng, 100_000, 100_000)
+    hawkes = hawkes_times(rng, 100_000, 20_000, branching=0.8, decay=1000)
+    assert dispersion(poisson) == pytest.approx(1, abs=0.2)
+    assert dispersion(hawkes) > 3
+    assert len(hawkes) == 100_000 and (np.diff(hawkes) >= 0).all()
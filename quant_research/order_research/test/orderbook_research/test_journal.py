@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from quant_research.order_research.journal import JournaledOrderBook
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.order import (
+    CancelOrder,
+    IcebergOrder,
+    LimitOrder,
+    ModifyOrder,
+    Side,
+    StopOrder,
+    TimeInForce,
+)
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.test.orderbook_research.conftest import (
+    LIMITS,
+    random_batch,
+)
+
+
+def test_dump_and_load_orders_round_trip():
+    ob = OrderBook()
+    ob.process_orders(random_batch(500, seed=5, flow=LIMITS))
+    orders = ob.dump_orders()
+    assert len(orders) == len(ob)
+
+    restored = OrderBook()
+    restored.load_orders(orders)
+    assert np.array_equal(restored.dump_orders(), orders)
+    assert restored.depth(5).bid_size.tolist() == ob.depth(5).bid_size.tolist()
+
+
+def test_restore_replays_only_the_journal_tail(tmp_path):
+    with JournaledOrderBook(OrderBook(), tmp_path, snapshot_every=300) as journaled:
+        journaled.process_orders(random_batch(250, 0, seed=5, flow=LIMITS))
+        journaled.process_orders(random_batch(250, 250, seed=6, flow=LIMITS))
+        journaled.process_order(LimitOrder(1000, Side.BUY, 5, 90, ts=1000))
+        journaled.process_order(CancelOrder(1000, ts=1001))
+        journaled.process_order(LimitOrder(1001, Side.SELL, 5, 110, ts=1002))
+        journaled.process_order(ModifyOrder(1001, 3, ts=1003))
+        expected = journaled.book.dump_orders()
+        assert journaled.seq == 504
+
+    assert [p.name for p in sorted(tmp_path.glob("snapshot_*.npy"))] == [
+        "snapshot_0000000000000500.npy"
+    ]
+
+    restored = JournaledOrderBook.restore(OrderBook(), tmp_path)
+    assert restored.seq == 504
+    assert np.array_equal(restored.book.dump_orders(), expected)
+    # Only the records after the snapshot were replayed.
+    assert restored.book.trades.count == 0
+    restored.close()
+
+
+def test_rejected_orders_are_taken_back_out_of_the_journal(tmp_path):
+    book = LadderOrderBook(1, 90, 110)
+    with JournaledOrderBook(book, tmp_path) as journaled:
+        journaled.process_order(LimitOrder(1, Side.SELL, 5, 100, ts=1))
+        with pytest.raises(ValueError):
+            journaled.process_order(LimitOrder(2, Side.BUY, 5, 200, ts=2))
+        journaled.process_order(LimitOrder(3, Side.BUY, 2, 100, ts=3))
+        assert journaled.seq == 2
+        expected = journaled.book.dump_orders()
+
+    restored = JournaledOrderBook.restore(LadderOrderBook(1, 90, 110), tmp_path)
+    assert restored.seq == 2
+    assert np.array_equal(restored.book.dump_orders(), expected)
+    restored.close()
+
+
+def test_orders_the_journal_cannot_represent_are_refused(tmp_path):
+    with JournaledOrderBook(OrderBook(), tmp_path) as journaled:
+        journaled.process_order(LimitOrder(1, Side.SELL, 5, 100, ts=1))
+        for tif in (TimeInForce.IOC, TimeInForce.FOK):
+            with pytest.raises(ValueError, match=f"cannot journal {tif.name}"):
+                journaled.process_order(LimitOrder(2, Side.BUY, 10, 100, ts=2, tif=tif))
+        with pytest.raises(TypeError, match="cannot journal iceberg"):
+            journaled.process_order(IcebergOrder(3, Side.BUY, 100, 99, 10, ts=3))
+        with pytest.raises(TypeError, match="cannot journal StopOrder"):
+            journaled.process_order(StopOrder(4, Side.BUY, 10, 101, ts=4))
+        assert journaled.seq == 1
+        assert len(journaled) == 1
+        expected = journaled.book.dump_orders()
+
+    restored = JournaledOrderBook.restore(OrderBook(), tmp_path)
+    assert np.array_equal(restored.book.dump_orders(), expected)
+    restored.close()
+
+
+def test_auction_calls_are_refused(tmp_path):
+    with JournaledOrderBook(OrderBook(), tmp_path) as journaled:
+        journaled.process_order(LimitOrder(1, Side.SELL, 5, 100, ts=1))
+        journaled.book.begin_auction()
+        with pytest.raises(RuntimeError, match="auction"):
+            journaled.process_order(LimitOrder(2, Side.BUY, 5, 100, ts=2))
+        with pytest.raises(RuntimeError, match="auction"):
+            journaled.process_orders(random_batch(10, 10, flow=LIMITS))
+        with pytest.raises(RuntimeError, match="auction"):
+            journaled.snapshot()
+        assert journaled.seq == 1
+        assert not list(tmp_path.glob("snapshot_*.npy"))
+
+        journaled.book.uncross()
+        journaled.process_order(LimitOrder(2, Side.BUY, 2, 100, ts=2))
+        expected = journaled.book.dump_orders()
+
+    restored = JournaledOrderBook.restore(OrderBook(), tmp_path)
+    assert np.array_equal(restored.book.dump_orders(), expected)
+    restored.close()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from quant_research.order_research.level import Depth
+from quant_research.order_research.manager import OrderBookManager, worker_index
+from quant_research.order_research.test.orderbook_research.conftest import (
+    random_batch,
+)
+
+SYMBOLS = [f"SYM{i}" for i in range(12)]
+
+
+def run(manager, rounds=3):
+    results = []
+    for r in range(rounds):
+        for i, symbol in enumerate(SYMBOLS):
+            batch = random_batch(300, seed=100 * r + i)
+            batch["order_id"] += 1000 * r
+            manager.submit(symbol, batch[:150])
+            manager.submit(symbol, batch[150:])
+        results.extend(manager.flush())
+    return results
+
+
+def test_worker_assignment_is_stable():
+    assert worker_index("ESZ6", 8) == worker_index("ESZ6", 8)
+    assert {worker_index(s, 4) for s in SYMBOLS} == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("deterministic", [True, False])
+def test_workers_match_in_process_books(deterministic):
+    expected = run(OrderBookManager(0))
+    with OrderBookManager(3, deterministic=deterministic) as manager:
+        results = run(manager)
+        depth = manager.depth(SYMBOLS[5], 5)
+
+    if deterministic:
+        assert [r.symbol for r in results] == [r.symbol for r in expected]
+    key = lambda r: r.symbol
+    for ours, theirs in zip(sorted(results, key=key), sorted(expected, key=key)):
+        assert ours.symbol == theirs.symbol
+        for a, b in zip(ours.fills + ours.levels, theirs.fills + theirs.levels):
+            np.testing.assert_array_equal(a, b)
+    local = OrderBookManager(0)
+    run(local)
+    for a, b in zip(depth, local.depth(SYMBOLS[5], 5)):
+        np.testing.assert_array_equal(a, b)
+
+
+def failing_book():
+    raise ValueError("no book today")
+
+
+@pytest.mark.parametrize("n_workers", [0, 1], ids=["local", "worker"])
+def test_batch_errors_are_reported_per_symbol(n_workers):
+    with OrderBookManager(n_workers) as manager:
+        batch = random_batch(10)
+        batch["type"][3] = 99
+        manager.submit("X", batch)
+        manager.submit("Y", batch[:3])
+        bad, good = manager.flush()
+        assert "unknown order type" in bad.error
+        assert good.error is None
+        # Rows before the failing one were applied and keep their fills.
+        for a, b in zip(bad.fills + bad.levels, good.fills + good.levels):
+            np.testing.assert_array_equal(a, b)
+
+    with OrderBookManager(n_workers, book_factory=failing_book) as manager:
+        manager.submit("X", batch)
+        with pytest.raises(RuntimeError, match="no book today"):
+            manager.flush()
+        with pytest.raises(RuntimeError, match="no book today"):
+            manager.depth("X")
+
+
+def test_failed_batch_does_not_hold_back_other_workers():
+    bad, good = SYMBOLS[0], next(
+        s for s in SYMBOLS if worker_index(s, 2) != worker_index(SYMBOLS[0], 2)
+    )
+    with OrderBookManager(2) as manager:
+        batch = random_batch(10)
+        batch["type"][3] = 99
+        manager.submit(bad, batch)
+        # A larger batch makes the failing worker reply first.
+        manager.submit(good, random_batch(20_000))
+        results = manager.flush()
+        assert [result.symbol for result in results] == [bad, good]
+        assert results[0].error is not None
+        assert results[1].error is None
+        assert len(results[1].fills.size) > 0
+        depth = manager.depth(good, 5)
+    assert isinstance(depth, Depth)
+    assert len(depth.bid_price) > 0
@@ -0,0 +1,470 @@
+import pytest
+
+from quant_research.order_research.bbo import BBOPublisher, BBOReader
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.ladder import LadderOrderBook
+from quant_research.order_research.order import (
+    CancelOrder,
+    IcebergOrder,
+    LimitOrder,
+    MarketOrder,
+    ModifyOrder,
+    Side,
+    StopLimitOrder,
+    StopOrder,
+    TimeInForce,
+)
+
+
+def make_book(book_type=OrderBook):
+    ob = book_type()
+    ob.process_order(LimitOrder(1, Side.BUY, 10, 99))
+    ob.process_order(LimitOrder(2, Side.BUY, 20, 98))
+    ob.process_order(LimitOrder(3, Side.SELL, 10, 101))
+    ob.process_order(LimitOrder(4, Side.SELL, 5, 101))
+    ob.process_order(LimitOrder(5, Side.SELL, 20, 102))
+    return ob
+
+
+def test_resting_orders(book_type):
+    ob = make_book(book_type)
+    assert len(ob) == 5
+    assert ob.get_best_bid().order_id == 1
+    assert ob.get_best_ask().order_id == 3
+    assert list(ob.asks) == [101, 102]
+    assert list(ob.bids) == [99, 98]
+    assert ob.asks[101].size == 15
+    assert not ob.trades
+
+
+def test_limit_order_sweeps_levels_in_price_time_priority(book_type):
+    ob = make_book(book_type)
+    order = LimitOrder(6, Side.BUY, 30, 102)
+    ob.process_order(order)
+
+    assert [(t.book_order_id, t.price, t.size) for t in ob.trades] == [
+        (3, 101, 10),
+        (4, 101, 5),
+        (5, 102, 15),
+    ]
+    assert order.remaining == 0
+    assert 101 not in ob.asks
+    assert ob.asks[102].size == 5
+    assert ob.get_best_ask().remaining == 5
+
+
+def test_limit_order_remainder_rests(book_type):
+    ob = make_book(book_type)
+    order = LimitOrder(6, Side.SELL, 15, 99)
+    ob.process_order(order)
+
+    assert [(t.book_order_id, t.size) for t in ob.trades] == [(1, 10)]
+    assert order.remaining == 5
+    assert ob.get_best_ask() is order
+    assert ob.get_best_bid().order_id == 2
+
+
+def test_market_order_does_not_rest(book_type):
+    ob = make_book(book_type)
+    order = MarketOrder(6, Side.SELL, 100)
+    ob.process_order(order)
+
+    assert sum(t.size for t in ob.trades) == 30
+    assert order.remaining == 70
+    assert not ob.bids
+    assert ob.get_best_bid() == 0
+    assert len(ob) == 3
+
+
+def test_cancel(book_type):
+    ob = make_book(book_type)
+    ob.process_order(CancelOrder(3))
+    assert ob.get_best_ask().order_id == 4
+    assert ob.asks[101].size == 5
+
+    ob.process_order(CancelOrder(4))
+    assert 101 not in ob.asks
+    assert ob.get_best_ask().order_id == 5
+
+    ob.process_order(CancelOrder(42))
+    assert len(ob) == 3
+
+
+def test_ladder_rejects_prices_off_the_grid():
+    ob = LadderOrderBook(0.5, 90, 110)
+    ob.process_order(LimitOrder(1, Side.BUY, 10, 99.5))
+    assert ob.get_best_bid().order_id == 1
+    with pytest.raises(ValueError):
+        ob.process_order(LimitOrder(2, Side.BUY, 10, 99.25))
+    with pytest.raises(ValueError):
+        ob.process_order(LimitOrder(3, Side.SELL, 10, 111))
+
+
+def test_ladder_validates_prices_before_matching():
+    ob = LadderOrderBook(0.01, 90, 110)
+    ob.process_order(LimitOrder(1, Side.BUY, 10, 100.00))
+    ob.process_order(LimitOrder(2, Side.SELL, 10, 100.01))
+    # An off-grid price at an existing level is not merged into it.
+    with pytest.raises(ValueError):
+        ob.process_order(LimitOrder(3, Side.BUY, 10, 100.004))
+    # A crossing order with a price outside the band trades nothing.
+    with pytest.raises(ValueError):
+        ob.process_order(LimitOrder(4, Side.BUY, 10, 200.0))
+    with pytest.raises(ValueError):
+        ob.process_order(ModifyOrder(1, 10, 100.015))
+    assert len(ob.trades) == 0
+    assert ob.get_best_bid().order_id == 1
+    assert ob.get_best_bid().remaining == 10
+    assert ob.get_best_ask().remaining == 10
+    assert len(ob) == 2
+
+
+def test_ladder_best_pointer_follows_emptied_levels():
+    ob = LadderOrderBook(1, 90, 110)
+    for n, price in enumerate([105, 103, 108]):
+        ob.process_order(LimitOrder(n, Side.SELL, 10, price))
+    assert ob.get_best_ask().price == 103
+    ob.process_order(MarketOrder(10, Side.BUY, 15))
+    assert ob.get_best_ask().price == 105
+    assert ob.get_best_ask().remaining == 5
+    ob.process_order(CancelOrder(0))
+    assert ob.get_best_ask().price == 108
+    assert list(ob.asks) == [108]
+
+
+def test_depth(book_type):
+    ob = make_book(book_type)
+    depth = ob.depth(1)
+    assert depth.bid_price.tolist() == [99]
+    assert depth.ask_price.tolist() == [101]
+    assert depth.ask_size.tolist() == [15]
+    assert depth.ask_count.tolist() == [2]
+
+    depth = ob.depth(10)
+    assert depth.bid_price.tolist() == [99, 98]
+    assert depth.bid_size.tolist() == [10, 20]
+    assert depth.ask_price.tolist() == [101, 102]
+    assert depth.ask_count.tolist() == [2, 1]
+
+
+def test_changed_levels(book_type):
+    ob = make_book(book_type)
+    changes = ob.changed_levels()
+    assert sorted(zip(changes.side.tolist(), changes.price.tolist())) == [
+        (0, 98),
+        (0, 99),
+        (1, 101),
+        (1, 102),
+    ]
+    assert len(ob.changed_levels().price) == 0
+
+    ob.process_order(LimitOrder(6, Side.BUY, 12, 101))
+    ob.process_order(CancelOrder(2))
+    changes = ob.changed_levels()
+    rows = sorted(
+        zip(
+            changes.side.tolist(),
+            changes.price.tolist(),
+            changes.size.tolist(),
+            changes.count.tolist(),
+        )
+    )
+    assert rows == [(0, 98, 0, 0), (1, 101, 3, 1)]
+
+
+def test_fillable_size_and_sweep_cost(book_type):
+    ob = make_book(book_type)
+    assert ob.fillable_size(Side.BUY) == 35
+    assert ob.fillable_size(Side.BUY, 101) == 15
+    assert ob.fillable_size(Side.BUY, 100) == 0
+    assert ob.fillable_size(Side.SELL, 98) == 30
+    assert ob.sweep_cost(Side.BUY, 20) == (20, 15 * 101 + 5 * 102)
+    assert ob.sweep_cost(Side.SELL, 100) == (30, 10 * 99 + 20 * 98)
+
+
+def test_fill_or_kill_rejects_before_matching(book_type):
+    ob = make_book(book_type)
+    order = LimitOrder(6, Side.BUY, 16, 101, tif=TimeInForce.FOK)
+    ob.process_order(order)
+    assert order.remaining == 16
+    assert not ob.trades
+    assert len(ob) == 5
+
+    ob.process_order(LimitOrder(7, Side.BUY, 15, 101, tif=TimeInForce.FOK))
+    assert [t.size for t in ob.trades] == [10, 5]
+    assert 101 not in ob.asks
+
+
+def test_immediate_or_cancel_never_rests(book_type):
+    ob = make_book(book_type)
+    order = LimitOrder(6, Side.BUY, 20, 101, tif=TimeInForce.IOC)
+    ob.process_order(order)
+    assert order.remaining == 5
+    assert [t.size for t in ob.trades] == [10, 5]
+    assert 6 not in ob._orders
+    assert ob.get_best_bid().order_id == 1
+
+
+def test_modify_size_decrease_keeps_priority(book_type):
+    ob = make_book(book_type)
+    ob.process_order(ModifyOrder(3, 4))
+    assert ob.get_best_ask().order_id == 3
+    assert ob.get_best_ask().remaining == 4
+    assert ob.asks[101].size == 9
+
+    ob.process_order(MarketOrder(6, Side.BUY, 4))
+    assert [t.book_order_id for t in ob.trades] == [3]
+
+
+def test_modify_size_increase_loses_priority(book_type):
+    ob = make_book(book_type)
+    ob.process_order(ModifyOrder(3, 12))
+    assert ob.get_best_ask().order_id == 4
+    assert ob.asks[101].size == 17
+
+    ob.process_order(MarketOrder(6, Side.BUY, 17))
+    assert [(t.book_order_id, t.size) for t in ob.trades] == [(4, 5), (3, 12)]
+
+
+def test_modify_price_moves_level_and_can_cross(book_type):
+    ob = make_book(book_type)
+    ob.process_order(ModifyOrder(2, 20, 97))
+    assert list(ob.bids) == [99, 97]
+
+    ob.process_order(ModifyOrder(1, 30, 101))
+    assert [(t.book_order_id, t.size) for t in ob.trades] == [(3, 10), (4, 5)]
+    assert ob.get_best_bid().order_id == 1
+    assert ob.get_best_bid().remaining == 15
+    assert list(ob.bids) == [101, 97]
+
+    ob.process_order(ModifyOrder(1, 0))
+    ob.process_order(ModifyOrder(42, 10))
+    assert list(ob.bids) == [97]
+    assert len(ob) == 2
+
+
+def _scan_ahead(ob, order_id):
+    side, level, order = ob._orders[order_id]
+    ahead = 0
+    for other in level:
+        if other is order:
+            return ahead
+        ahead += other.remaining
+
+
+def test_queue_ahead(book_type):
+    ob = make_book(book_type)
+    ob.process_order(LimitOrder(6, Side.SELL, 7, 101))
+    assert ob.track(6) == 15
+    assert ob.queue_ahead(6) == 15
+    assert ob.queue_ahead(3) is None
+    ob.process_order(MarketOrder(7, Side.BUY, 12))
+    assert ob.queue_ahead(6) == 3
+    ob.process_order(ModifyOrder(4, 1))
+    assert ob.queue_ahead(6) == 1
+    ob.process_order(ModifyOrder(6, 5))
+    assert ob.queue_ahead(6) == 1
+    ob.process_order(LimitOrder(8, Side.SELL, 4, 101))
+    ob.process_order(ModifyOrder(6, 10))
+    assert ob.queue_ahead(6) == 5
+    ob.process_order(ModifyOrder(6, 10, 102))
+    assert ob.queue_ahead(6) == 20
+    ob.process_order(CancelOrder(6))
+    assert ob.queue_ahead(6) is None
+
+
+def test_queue_ahead_matches_level_scan(book_type):
+    import random
+
+    rng = random.Random(5)
+    ob = book_type()
+    for i in range(1, 3000):
+        kind = rng.random()
+        side = rng.choice(list(Side))
+        if kind < 0.5:
+            ob.process_order(
+                LimitOrder(i, side, rng.randint(1, 50), rng.randint(95, 105))
+            )
+            if i in ob._orders and rng.random() < 0.2:
+                ob.track(i)
+        elif kind < 0.6:
+            ob.process_order(MarketOrder(i, side, rng.randint(1, 100)))
+        elif kind < 0.8:
+            ob.process_order(CancelOrder(rng.randrange(i)))
+        else:
+            price = rng.choice([None, rng.randint(95, 105)])
+            ob.process_order(ModifyOrder(rng.randrange(i), rng.randint(0, 50), price))
+        for level in list(ob.bids.values()) + list(ob.asks.values()):
+            for order_id in level.tracked or ():
+                assert ob.queue_ahead(order_id) == _scan_ahead(ob, order_id)
+
+
+def test_iceberg_replenishes_at_back_of_level(book_type):
+    ob = make_book(book_type)
+    iceberg = IcebergOrder(6, Side.SELL, 25, 101, display=10)
+    ob.process_order(iceberg)
+    assert ob.asks[101].size == 25
+    assert (iceberg.remaining, iceberg.hidden) == (10, 15)
+
+    ob.process_order(MarketOrder(7, Side.BUY, 30))
+    assert [(t.book_order_id, t.size) for t in ob.trades] == [
+        (3, 10),
+        (4, 5),
+        (6, 10),
+        (6, 5),
+    ]
+    assert (iceberg.remaining, iceberg.hidden) == (5, 5)
+    assert ob.asks[101].size == 5
+
+    ob.process_order(LimitOrder(8, Side.SELL, 1, 101))
+    ob.process_order(MarketOrder(9, Side.BUY, 6))
+    assert [(t.book_order_id, t.size) for t in ob.trades][-2:] == [(6, 5), (8, 1)]
+    assert ob.get_best_ask().order_id == 6
+    assert (iceberg.remaining, iceberg.hidden) == (5, 0)
+
+
+def test_fill_or_kill_counts_iceberg_reserve(book_type):
+    ob = book_type()
+    ob.process_order(IcebergOrder(1, Side.SELL, 100, 100, display=10))
+    assert ob.depth().ask_size.tolist() == [10]
+    assert ob.fillable_size(Side.BUY, 100) == 100
+    assert ob.snapshot().fillable_size(Side.BUY, 100) == 100
+    assert ob.fillable_size(Side.BUY, 99) == 0
+
+    ob.process_order(LimitOrder(2, Side.BUY, 101, 100, tif=TimeInForce.FOK))
+    assert not ob.trades
+    ob.process_order(LimitOrder(3, Side.BUY, 50, 100, tif=TimeInForce.FOK))
+    assert sum(t.size for t in ob.trades) == 50
+    assert ob.fillable_size(Side.BUY) == 50
+
+    ob.process_order(CancelOrder(1))
+    assert ob.fillable_size(Side.BUY) == 0
+    assert ob._reserve == [0, 0]
+
+
+def test_stops_trigger_only_when_crossed(book_type):
+    ob = make_book(book_type)
+    ob.process_order(StopOrder(6, Side.BUY, 5, 102))
+    ob.process_order(StopOrder(7, Side.SELL, 5, 98))
+    ob.process_order(StopLimitOrder(8, Side.BUY, 30, 101, 102))
+    assert len(ob) == 5
+    assert not ob.trades
+
+    # A print at 101 triggers the buy stop limit but not the stop at 102;
+    # the stop limit then lifts 102, which cascades into the buy stop.
+    stop = ob._stop_orders[6]
+    ob.process_order(MarketOrder(9, Side.BUY, 1))
+    assert [t.order_id for t in ob.trades] == [9, 8, 8, 8, 6]
+    assert ob.last_price == 102
+    assert not ob.asks
+    assert stop.remaining == 1
+
+    ob.process_order(CancelOrder(7))
+    ob.process_order(MarketOrder(10, Side.SELL, 40))
+    assert 7 not in [t.order_id for t in ob.trades]
+
+
+def test_snapshot_stays_frozen_while_the_book_changes(book_type):
+    import threading
+
+    import numpy as np
+
+    from quant_research.order_research.test.orderbook_research.conftest import (
+        random_batch,
+    )
+
+    ob, reference = book_type(), book_type()
+    snapshots = []
+    stop = threading.Event()
+    torn = []
+
+    def read(snapshot, expected):
+        while not stop.is_set():
+            if not np.array_equal(snapshot.dump_orders(), expected):
+                torn.append(snapshot.version)
+
+    for i, chunk in enumerate(np.array_split(random_batch(3000), 30)):
+        snapshot = ob.snapshot()
+        expected = ob.dump_orders()
+        snapshots.append((snapshot, expected, ob.depth(5), ob.bbo()))
+        if i == 10:
+            reader = threading.Thread(target=read, args=(snapshot, expected))
+            reader.start()
+        ob.process_orders(chunk)
+        reference.process_orders(chunk)
+    stop.set()
+    reader.join()
+
+    assert not torn
+    assert np.array_equal(ob.dump_orders(), reference.dump_orders())
+    assert ob.depth(5).bid_size.tolist() == reference.depth(5).bid_size.tolist()
+    for snapshot, orders, depth, bbo in snapshots:
+        assert np.array_equal(snapshot.dump_orders(), orders)
+        for a, b in zip(snapshot.depth(5), depth):
+            assert np.array_equal(a, b)
+        assert np.array_equal(snapshot.bbo(), bbo, equal_nan=True)
+
+
+def test_snapshot_keeps_queue_tracking(book_type):
+    ob = make_book(book_type)
+    ob.process_order(LimitOrder(6, Side.SELL, 7, 101))
+    ob.track(6)
+    snapshot = ob.snapshot()
+    ob.process_order(MarketOrder(7, Side.BUY, 12))
+    assert ob.queue_ahead(6) == 3
+    assert snapshot.asks[101].size == 22
+    assert snapshot.asks[101].tracked == {6: 15}
+
+
+def test_order_pool_recycles_without_changing_results():
+    import numpy as np
+
+    from quant_research.order_research.flow import order_flow
+    from quant_research.order_research.pool import LimitOrderPool
+
+    events = order_flow(20000, seed=4)
+    pool = LimitOrderPool(capacity=64)
+    pooled, plain = OrderBook(pool=pool), OrderBook()
+    snapshot = None
+    for i, chunk in enumerate(np.array_split(events, 10)):
+        if i == 5:
+            snapshot, frozen = pooled.snapshot(), pooled.dump_orders()
+        a, b = pooled.process_orders(chunk), plain.process_orders(chunk)
+        for x, y in zip(a, b):
+            assert np.array_equal(x, y)
+    assert np.array_equal(pooled.dump_orders(), plain.dump_orders())
+    assert np.array_equal(snapshot.dump_orders(), frozen)
+
+    stats = pool.stats()
+    assert stats.in_use == len(pooled)
+    assert stats.free <= stats.capacity == 64
+    assert stats.reused > stats.allocated
+
+
+def test_injectable_clock():
+    from quant_research.order_research.clock import (
+        BatchClock,
+        SequenceClock,
+        set_clock,
+    )
+
+    previous = set_clock(SequenceClock(100))
+    try:
+        assert [CancelOrder(i).ts for i in range(3)] == [100, 101, 102]
+        clock = BatchClock()
+        set_clock(clock)
+        clock.set(7)
+        ob = make_book()
+        assert ob.get_best_bid().ts == 7
+        publisher = BBOPublisher(capacity=1)
+        try:
+            publisher.update("ES", 99, 10, 101, 15)
+            reader = BBOReader(publisher.name)
+            assert reader.read("ES").ts == 7
+            reader.close()
+        finally:
+            publisher.close()
+            publisher.unlink()
+    finally:
+        set_clock(previous)
+    assert CancelOrder(1).ts > 10**15
@@ -0,0 +1,92 @@
+import numpy as np
+
+from quant_research.order_research.batch import ORDER_DTYPE
+from quant_research.order_research.order import OrderType, Side
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.replay import (
+    csv_to_events,
+    open_events,
+    replay,
+    write_events,
+)
+
+CSV = """ts,type,side,order_id,price,size
+1,A,S,1,101.0,10
+2,A,S,2,102.0,10
+3,A,B,3,99.0,10
+4,U,,1,103.0,10
+5,X,,3,,
+6,P,B,7,102.0,5
+7,M,B,4,,15
+"""
+
+
+def test_csv_to_events_and_replay(tmp_path):
+    csv_path = tmp_path / "events.csv"
+    csv_path.write_text(CSV)
+    path = tmp_path / "events.bin"
+
+    assert csv_to_events(csv_path, path) == 7
+    events = open_events(path)
+    assert isinstance(events, np.memmap)
+    assert events["type"].tolist() == [
+        OrderType.LIMIT,
+        OrderType.LIMIT,
+        OrderType.LIMIT,
+        OrderType.MODIFY,
+        OrderType.CANCEL,
+        OrderType.TRADE,
+        OrderType.MARKET,
+    ]
+    assert events["side"][:3].tolist() == [Side.SELL.value] * 2 + [Side.BUY.value]
+
+    ob = OrderBook()
+    batches = []
+    assert (
+        replay(ob, path, batch_size=3, on_batch=lambda e, f: batches.append(len(e)))
+        == 7
+    )
+    assert batches == [3, 3, 1]
+    assert [(t.book_order_id, t.price, t.size) for t in ob.trades] == [
+        (2, 102.0, 10),
+        (1, 103.0, 5),
+    ]
+    assert len(ob) == 1
+
+
+def test_empty_modify_price_keeps_the_order_price(tmp_path):
+    csv_path = tmp_path / "events.csv"
+    csv_path.write_text(
+        "ts,type,side,order_id,price,size\n1,A,B,1,99.0,10\n2,U,,1,,4\n3,X,,1,,\n"
+    )
+    path = tmp_path / "events.bin"
+    csv_to_events(csv_path, path)
+    events = open_events(path)
+    assert np.isnan(events["price"][1])
+    assert events["price"][2] == 0.0
+
+    ob = OrderBook()
+    ob.process_orders(events[:2])
+    assert ob.get_best_bid().price == 99.0
+    assert ob.get_best_bid().remaining == 4
+
+
+def test_replay_from_offset_matches_full_replay(tmp_path):
+    rng = np.random.default_rng(11)
+    n = 1000
+    events = np.zeros(n, dtype=ORDER_DTYPE)
+    events["order_id"] = np.arange(n)
+    events["side"] = rng.integers(0, 2, n)
+    events["price"] = rng.integers(95, 106, n)
+    events["size"] = rng.integers(1, 50, n)
+    path = tmp_path / "events.bin"
+    write_events(path, events[:400])
+    write_events(path, events[400:], append=True)
+
+    full = OrderBook()
+    replay(full, path)
+
+    split = OrderBook()
+    split.process_orders(events[:400])
+    assert replay(split, path, start=400) == 600
+    assert split.trades.fills().size.tolist() == full.trades.fills().size.tolist()
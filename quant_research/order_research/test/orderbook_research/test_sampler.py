@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from quant_research.order_research.benchmark import BOOKS
+from quant_research.order_research.flow import order_flow
+from quant_research.order_research.orderbook import OrderBook
+from quant_research.order_research.sampler import FEATURES, DepthSampler
+
+
+def test_samples_every_n_events_match_depth():
+    events = order_flow(5000, seed=2)
+    tensors = []
+    for make_book in BOOKS.values():
+        sampler = DepthSampler(make_book(), capacity=100, levels=5, every=300)
+        for start in range(0, len(events), 700):
+            sampler.process_orders(events[start : start + 700])
+        data, ts = sampler.samples()
+        assert data.shape == (5000 // 300, 5, len(FEATURES))
+        np.testing.assert_array_equal(ts, events["ts"][299::300])
+        tensors.append(data)
+    for data in tensors[1:]:
+        np.testing.assert_array_equal(data, tensors[0])
+
+    book = OrderBook()
+    book.process_orders(events[:900])
+    depth = book.depth(5)
+    row = tensors[0][2]
+    np.testing.assert_array_equal(row[: len(depth.bid_price), 0], depth.bid_price)
+    np.testing.assert_array_equal(row[: len(depth.ask_size), 4], depth.ask_size)
+
+
+def test_interval_samples_fill_gaps_into_a_memmap(tmp_path):
+    events = order_flow(1000, seed=3)
+    events["ts"] = np.arange(1000) * 10
+    events["ts"][500:] += 100
+    path = tmp_path / "depth.npy"
+    sampler = DepthSampler(OrderBook(), capacity=250, levels=3, interval=50, path=path)
+    sampler.process_orders(events[:400])
+    sampler.process_orders(events[400:])
+    sampler.flush()
+    n = sampler.count
+    data = np.load(path, mmap_mode="r")[:n]
+    ts = np.load(tmp_path / "depth.ts.npy")[:n]
+    np.testing.assert_array_equal(ts, np.arange(50, events["ts"][-1] + 1, 50))
+    # No events between 4990 and 5100: the grid points in the gap repeat
+    # the book after event 499.
+    gap = (ts > 4990) & (ts <= 5100)
+    assert gap.sum() == 3
+    np.testing.assert_array_equal(data[gap], data[gap][[0, 0, 0]])
+
+    book = OrderBook()
+    book.process_orders(events[events["ts"] < 2000])
+    expected = book.depth(3)
+    sample = data[list(ts).index(2000)]
+    np.testing.assert_array_equal(sample[:, 1], expected.bid_size)
+    np.testing.assert_array_equal(sample[:, 3], expected.ask_price)
+
+
+def test_overflowing_batch_is_refused_before_processing():
+    events = order_flow(1000, seed=4)
+    book = OrderBook()
+    sampler = DepthSampler(book, capacity=3, levels=2, every=100)
+    sampler.process_orders(events[:250])
+    before = book.dump_orders()
+    with pytest.raises(IndexError):
+        sampler.process_orders(events[250:450])
+    np.testing.assert_array_equal(book.dump_orders(), before)
+    assert sampler.count == 2
+
+    # The sampler carries on as if the refused batch never came.
+    assert sampler.process_orders(events[250:350]) == 1
+    np.testing.assert_array_equal(sampler.ts[2], events["ts"][299])
@@ -1,16 +1,11 @@
+from quant_research.order_research.batch import to_orders
+from quant_research.order_research.flow import order_flow
 from quant_research.order_research.orderbook import OrderBook
-from quant_research.order_research.order import LimitOrder, Side
 from time import time
-from random import getrandbits, randint
 
 ob = OrderBook()
 n_orders = 10000
-orders = []
-for n in range(n_orders):
-    if getrandbits(1):
-        orders.append(LimitOrder(n, Side.BUY, randint(1, 200), randint(1, 4)))
-    else:
-        orders.append(LimitOrder(n, Side.SELL, randint(1, 200), randint(1, 4)))
+orders = to_orders(order_flow(n_orders, seed=0))
 
 
 start = time()
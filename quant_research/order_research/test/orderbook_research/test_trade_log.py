@@ -0,0 +1,61 @@
+import numpy as np
+
+from quant_research.order_research.order import Side
+from quant_research.order_research.trade_log import TradeLog
+
+
+def fill(log, n):
+    for i in range(n):
+        log.append(i, i % 2, 100.0 + i, i + 1, 1000 + i, 2000 + i)
+
+
+def test_append_and_materialise():
+    log = TradeLog(chunk_size=4)
+    fill(log, 10)
+
+    assert len(log) == 10
+    assert log.count == 10
+    trade = log[5]
+    assert (trade.ts, trade.side, trade.price, trade.size) == (5, Side.SELL, 105.0, 6)
+    assert (trade.order_id, trade.book_order_id) == (1005, 2005)
+    assert log[-1].ts == 9
+    assert [t.ts for t in log] == list(range(10))
+
+
+def test_fills_are_views_within_a_block():
+    log = TradeLog(chunk_size=8)
+    fill(log, 6)
+    fills = log.fills(2)
+    assert fills.seq.tolist() == [2, 3, 4, 5]
+    assert np.shares_memory(fills.price, log.fills().price)
+
+    fill(log, 6)
+    assert log.fills(4).ts.tolist() == [4, 5, 0, 1, 2, 3, 4, 5]
+
+
+def test_ring_retention_recycles_blocks():
+    log = TradeLog(chunk_size=4, max_trades=6)
+    fill(log, 20)
+
+    assert log.count == 20
+    assert 6 <= len(log) <= 12
+    assert log.first_seq == 20 - len(log)
+    assert log.fills().seq.tolist() == list(range(log.first_seq, 20))
+    assert log[0].ts == log.first_seq
+    assert len(log._chunks) == log.max_chunks
+
+
+def test_to_pandas():
+    log = TradeLog(chunk_size=16)
+    fill(log, 3)
+    df = log.to_pandas()
+    assert df["size"].tolist() == [1, 2, 3]
+    assert list(df.columns) == [
+        "ts",
+        "side",
+        "price",
+        "size",
+        "order_id",
+        "book_order_id",
+        "seq",
+    ]
@@ -1,5 +1,5 @@
 from quant_research.order_research.order import Side
-from time import time
+from quant_research.order_research.clock import now
 
 
 class Trade:
@@ -13,9 +13,15 @@ class Trade:
     )
 
     def __init__(
-        self, size: int, side: Side, price: float, order_id: int, book_order_id: int
+        self,
+        size: int,
+        side: Side,
+        price: float,
+        order_id: int,
+        book_order_id: int,
+        ts: int = None,
     ):
-        self.ts = int(1e6 * time())
+        self.ts = now() if ts is None else ts
         self.size = size
         self.side = side
         self.price = price
@@ -0,0 +1,179 @@
+from collections import deque
+
+import numpy as np
+
+from quant_research.order_research.batch import Fills
+from quant_research.order_research.order import Side
+from quant_research.order_research.trade import Trade
+
+TRADE_COLUMNS = (
+    ("ts", np.int64),
+    ("side", np.uint8),
+    ("price", np.float64),
+    ("size", np.int64),
+    ("order_id", np.int64),
+    ("book_order_id", np.int64),
+    ("seq", np.int64),
+)
+
+
+class TradeLog:
+    """Chunked columnar store of executed trades.
+
+    Trades are written into preallocated NumPy column blocks of
+    ``chunk_size`` rows; a full block is never copied or resized, a new one
+    is started instead. Writes go through memoryviews of the current block,
+    which is far cheaper than NumPy scalar assignment.
+
+    With ``max_trades`` set the log keeps at least the latest ``max_trades``
+    trades and recycles the oldest block once that many are newer, so memory
+    stays bounded. Every trade gets a sequence number ``seq`` that keeps
+    counting across recycled blocks. ``Trade`` objects are only built on
+    indexing or iteration.
+    """
+
+    __slots__ = "chunk_size", "max_chunks", "count", "_chunks", "_views", "_pos"
+
+    def __init__(self, chunk_size=1 << 16, max_trades=None):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.max_chunks = None
+        if max_trades is not None:
+            self.max_chunks = -(-max_trades // chunk_size) + 1
+        self.count = 0
+        self._chunks = deque()
+        self._views = None
+        self._pos = chunk_size
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest retained trade."""
+        return self.count - len(self)
+
+    def append(self, ts, side, price, size, order_id, book_order_id):
+        """Record a trade, with ``side`` given as a ``Side`` value, and
+        return its sequence number."""
+        pos = self._pos
+        if pos == self.chunk_size:
+            self._new_chunk()
+            pos = 0
+        views = self._views
+        seq = self.count
+        views[0][pos] = ts
+        views[1][pos] = side
+        views[2][pos] = price
+        views[3][pos] = size
+        views[4][pos] = order_id
+        views[5][pos] = book_order_id
+        views[6][pos] = seq
+        self._pos = pos + 1
+        self.count = seq + 1
+        return seq
+
+    def extend(self, ts, side, price, size, order_id, book_order_id):
+        """Record trades given as columns, where scalars apply to every
+        trade, and return the sequence number of the first."""
+        n = len(size)
+        columns = [
+            np.broadcast_to(column, n)
+            for column in (ts, side, price, size, order_id, book_order_id)
+        ]
+        first = self.count
+        done = 0
+        while done < n:
+            if self._pos == self.chunk_size:
+                self._new_chunk()
+            chunk, pos = self._chunks[-1], self._pos
+            k = min(n - done, self.chunk_size - pos)
+            for column, values in zip(chunk, columns):
+                column[pos : pos + k] = values[done : done + k]
+            chunk[6][pos : pos + k] = np.arange(self.count, self.count + k)
+            self._pos = pos + k
+            self.count += k
+            done += k
+        return first
+
+    def _new_chunk(self):
+        if self.max_chunks is not None and len(self._chunks) >= self.max_chunks:
+            chunk = self._chunks.popleft()
+        else:
+            chunk = tuple(
+                np.empty(self.chunk_size, dtype) for _, dtype in TRADE_COLUMNS
+            )
+        self._chunks.append(chunk)
+        self._views = tuple(memoryview(column) for column in chunk)
+        self._pos = 0
+
+    def _pieces(self, start):
+        """Yield the filled part of each retained block from ``start`` on."""
+        last = len(self._chunks) - 1
+        for i, chunk in enumerate(self._chunks):
+            stop = self._pos if i == last else self.chunk_size
+            base = int(chunk[6][0])
+            if base + stop <= start:
+                continue
+            lo = max(start - base, 0)
+            yield tuple(column[lo:stop] for column in chunk)
+
+    def fills(self, start=None):
+        """Return retained trades with ``seq >= start`` as ``Fills``.
+
+        The columns are views into the log when they fall in a single block
+        and copies otherwise.
+        """
+        start = self.first_seq if start is None else max(start, self.first_seq)
+        pieces = list(self._pieces(start))
+        if not pieces:
+            return Fills(*(np.empty(0, dtype) for _, dtype in TRADE_COLUMNS))
+        if len(pieces) == 1:
+            return Fills(*pieces[0])
+        return Fills(*(np.concatenate(columns) for columns in zip(*pieces)))
+
+    def to_pandas(self, start=None):
+        """Return retained trades as a ``pandas.DataFrame``, without copying
+        when they fall in a single block."""
+        import pandas as pd
+
+        return pd.DataFrame(self.fills(start)._asdict(), copy=False)
+
+    def __getitem__(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("trade index out of range")
+        chunk = self._chunks[index // self.chunk_size]
+        i = index % self.chunk_size
+        return Trade(
+            size=int(chunk[3][i]),
+            side=Side(int(chunk[1][i])),
+            price=float(chunk[2][i]),
+            order_id=int(chunk[4][i]),
+            book_order_id=int(chunk[5][i]),
+            ts=int(chunk[0][i]),
+        )
+
+    def __iter__(self):
+        sides = (Side.BUY, Side.SELL)
+        for columns in self._pieces(self.first_seq):
+            ts, side, price, size, order_id, book_order_id = (
+                column.tolist() for column in columns[:6]
+            )
+            for i in range(len(ts)):
+                yield Trade(
+                    size[i],
+                    sides[side[i]],
+                    price[i],
+                    order_id[i],
+                    book_order_id[i],
+                    ts[i],
+                )
+
+    def __len__(self):
+        if not self._chunks:
+            return 0
+        return (len(self._chunks) - 1) * self.chunk_size + self._pos
+
+    def __repr__(self):
+        return f"TradeLog({len(self)} trades, {self.count} total)"